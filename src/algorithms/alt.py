@@ -0,0 +1,126 @@
+"""
+Heurística ALT (A*, Landmarks e desigualdade Triangular).
+
+A distância Haversine é um limite inferior fraco em uma malha viária com rios,
+linhas férreas e ruas de mão única. O ALT escolhe alguns nós do grafo como
+marcos (landmarks) e pré-calcula as distâncias de cada marco até todos os nós
+e de todos os nós até cada marco. Pela desigualdade triangular, para qualquer
+marco L:
+
+    d(v, t) >= d(L, t) - d(L, v)    e    d(v, t) >= d(v, L) - d(t, L)
+
+O maior desses valores entre os marcos é um limite inferior admissível e
+consistente, em geral muito mais justo que a Haversine.
+"""
+
+import random
+import numpy as np
+from algorithms.dijkstra import distancias
+from algorithms.heuristicas import HeuristicaEmLote
+
+
+class PreprocessamentoALT:
+    """
+    Marcos escolhidos e tabelas de distâncias de um GrafoCSR.
+
+    Depois de construído, serve de fábrica de heurísticas para as buscas:
+    a_estrela(csr, origem, destinos, heuristica=alt.heuristica).
+    """
+
+    def __init__(self, grafo, n_marcos=8, semente=None):
+        """
+        Escolhe os marcos e calcula as tabelas de distâncias.
+
+        Os marcos são escolhidos pela estratégia do mais distante: cada novo marco
+        é o nó alcançável mais longe (ida e volta) dos marcos já escolhidos.
+
+        Args:
+            grafo: GrafoCSR da cidade
+            n_marcos: Quantidade de marcos (opcional)
+            semente: Semente do sorteio do nó inicial (opcional)
+        """
+        self.grafo = grafo
+        reverso = grafo.transposto()
+        n = len(grafo)
+
+        self.marcos = []
+        de_marco = []    # d(L, v) para cada marco L
+        para_marco = []  # d(v, L) para cada marco L
+
+        # O primeiro marco é o nó mais distante de um nó sorteado
+        inicio = random.Random(semente).randrange(n)
+        proximidade = distancias(grafo, [inicio]) + distancias(reverso, [inicio])
+
+        for _ in range(min(n_marcos, n)):
+            candidatos = np.where(np.isfinite(proximidade), proximidade, -1.0)
+            candidatos[self.marcos] = -1.0
+            marco = int(np.argmax(candidatos))
+            if candidatos[marco] < 0:
+                break
+
+            self.marcos.append(marco)
+            de_marco.append(distancias(grafo, [marco]))
+            para_marco.append(distancias(reverso, [marco]))
+
+            # Distância (ida e volta) de cada nó até o marco mais próximo já escolhido
+            ida_volta = de_marco[-1] + para_marco[-1]
+            proximidade = ida_volta if len(self.marcos) == 1 else np.minimum(proximidade, ida_volta)
+
+        self.de_marco = np.array(de_marco)
+        self.para_marco = np.array(para_marco)
+
+    def heuristica(self, grafo, destinos):
+        """
+        Fábrica de heurísticas compatível com o parâmetro heuristica das buscas.
+
+        Aceita tanto o grafo do pré-processamento quanto o seu transposto (usado
+        pela busca reversa do A* bidirecional), caso em que os papéis das duas
+        tabelas se invertem.
+
+        Args:
+            grafo: GrafoCSR em que a busca será feita
+            destinos: Índices densos dos nós objetivos
+
+        Returns:
+            HeuristicaALT: h(n) para a consulta
+        """
+        if grafo is self.grafo:
+            return HeuristicaALT(self.de_marco, self.para_marco, destinos)
+        if grafo is self.grafo.transposto():
+            return HeuristicaALT(self.para_marco, self.de_marco, destinos)
+        raise ValueError("O pré-processamento ALT não corresponde ao grafo da busca.")
+
+
+class HeuristicaALT(HeuristicaEmLote):
+    """
+    Limite inferior ALT até o destino mais próximo, para uma consulta.
+
+    Como HeuristicaHaversine, herda de HeuristicaEmLote h(no) e h.varios(nos),
+    com os valores memorizados durante a consulta. Nós que não alcançam nenhum
+    destino recebem h = inf.
+    """
+
+    def __init__(self, de_marco, para_marco, destinos):
+        super().__init__()
+        destinos = list(destinos)
+        self._de_marco = de_marco
+        self._para_marco = para_marco
+
+        # Distâncias entre marcos e destinos: (marcos x 1 x destinos)
+        self._de_marco_t = de_marco[:, destinos][:, None, :]
+        self._para_marco_t = para_marco[:, destinos][:, None, :]
+
+    def _calcular(self, nos):
+        # (marcos x nós x 1), comparados contra (marcos x 1 x destinos)
+        de_v = self._de_marco[:, nos][:, :, None]
+        para_v = self._para_marco[:, nos][:, :, None]
+
+        with np.errstate(invalid="ignore"):
+            limites = np.maximum(self._de_marco_t - de_v, para_v - self._para_marco_t)
+
+        # inf - inf (marco que não alcança nenhum dos dois) não traz informação
+        limites = np.nan_to_num(limites, nan=-np.inf, posinf=np.inf, neginf=-np.inf)
+
+        # Melhor marco para cada par (nó, destino), e então o destino mais próximo
+        h = limites.max(axis=0).min(axis=1)
+        return np.maximum(h, 0.0).tolist()
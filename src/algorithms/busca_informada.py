@@ -7,88 +7,284 @@ de nós de destino em um grafo.
 """
 
 import heapq
-from math import radians, sin, cos, sqrt, atan2
+import time
+from utils.grafo_csr import GrafoCSR, funcao_vizinhos
+from algorithms.caminhos import reconstruir_caminho, ranquear_destinos
+from algorithms.heuristicas import HeuristicaHaversine
 
-def __haversine(n1, n2, grafo):
-    """
-    Calcula a distância Haversine entre dois nós com coordenadas geográficas.
-    
-    A distância Haversine é uma fórmula que calcula a distância entre dois pontos
-    na superfície de uma esfera (Terra) dadas suas coordenadas de latitude e longitude.
-    
-    Args:
-        n1: ID do primeiro nó
-        n2: ID do segundo nó
-        grafo: Grafo contendo as coordenadas dos nós
-        
-    Returns:
-        float: Distância em metros entre os nós
-    """
-    R = 6371000  # Raio da Terra em metros
-    lat1, lon1 = radians(grafo.nodes[n1]['y']), radians(grafo.nodes[n1]['x'])
-    lat2, lon2 = radians(grafo.nodes[n2]['y']), radians(grafo.nodes[n2]['x'])
-
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-
-    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
-
-def a_estrela(grafo, origem, destinos):
+def a_estrela(grafo, origem, destinos, apenas_distancia=False, heuristica=HeuristicaHaversine,
+              estatisticas=None, k=None, peso=None, rastreio=None):
     """
     Implementação do algoritmo A* com heurística Haversine para múltiplos destinos.
     
     O algoritmo A* é uma busca informada que utiliza uma função heurística
     para estimar o custo do caminho mais curto entre o nó atual e o destino.
-    Neste caso, a heurística é a distância Haversine.
+    Por padrão, a heurística é a distância Haversine até o destino mais próximo
+    (ver algorithms.heuristicas).
+
+    Com k, a mesma busca continua depois do primeiro destino até alcançar k
+    destinos. Como h(n) é um limite inferior até qualquer um dos destinos,
+    também o é até os que faltam, e cada destino retirado da fila é o mais
+    próximo dos restantes.
     
     Args:
-        grafo: Grafo do NetworkX
+        grafo: Grafo do NetworkX ou GrafoCSR compilado a partir dele
         origem: ID do nó inicial
         destinos: Conjunto de IDs dos nós objetivos
+        apenas_distancia: Se True, não reconstrói o caminho (opcional)
+        heuristica: Fábrica heuristica(grafo, destinos) que devolve h(n) para a
+                    consulta, com suporte a h.varios(nos) (opcional)
+        estatisticas: EstatisticasBusca a ser preenchida (opcional)
+        k: Quantidade de destinos mais próximos a retornar (opcional)
+        peso: Com k, função peso(destino) usada para reordenar os k destinos pela
+              distância dividida pelo peso, como as bolsas disponíveis (opcional)
+        rastreio: Função rastreio(no, g, fronteira) chamada a cada nó expandido, com
+                  o ID do nó, o custo até ele e o tamanho da fila (opcional)
         
     Returns:
-        list: Caminho da origem até o destino mais próximo encontrado
+        list: Caminho da origem até o destino mais próximo encontrado, ou a
+              tupla (distância, destino) se apenas_distancia for True. Com k,
+              lista de até k tuplas (destino, distância, caminho), da mais próxima
+              para a mais distante, com caminho None se apenas_distancia for True,
+              vazia se nenhum destino for alcançável
         
     Raises:
-        ValueError: Se nenhum caminho for encontrado para os destinos fornecidos
+        ValueError: Sem k, se nenhum caminho for encontrado para os destinos fornecidos
     """
 
+    # Instrumentação só é feita quando pedida, sem custo extra no laço caso contrário
+    instrumentada = estatisticas is not None or rastreio is not None
+    if estatisticas is not None:
+        inicio = time.perf_counter()
+
+    # No GrafoCSR a busca trabalha com índices densos, convertidos de volta no final
+    csr = isinstance(grafo, GrafoCSR)
+    if csr:
+        origem = grafo.indice[origem]
+        destinos = grafo.indices(destinos)
+
     destinos = set(destinos)
+    vizinhos = funcao_vizinhos(grafo)
+    h = heuristica(grafo, destinos)  # h(n): heurística até o destino mais próximo
     fila = []
 
     # Inicializa a fila de prioridade com o nó origem
     # f(n) = g(n) + h(n) → custo atual + heurística (distância estimada até o destino mais próximo)
-    heapq.heappush(
-        fila, 
-        (0 + min(__haversine(origem, d, grafo) for d in destinos), 0, origem, [origem])
-    )
+    heapq.heappush(fila, (0 + h(origem), 0, origem))
 
     # g(n): custo real acumulado até cada nó
     custo_ate_agora = {origem: 0}
 
+    # Predecessor de cada nó no melhor caminho conhecido, usado para reconstruir a rota
+    predecessor = {origem: None}
+
+    # Destinos já alcançados, com a distância, no modo dos k mais próximos
+    encontrados = []
+
+    # Destino mais próximo, no modo de um único destino
+    alvo = None
+
+    if estatisticas is not None:
+        estatisticas.insercoes += 1
+        inicio = estatisticas.marcar("preparacao", inicio)
+
     while fila:
-        f, g, atual, caminho = heapq.heappop(fila)
+        f, g, atual = heapq.heappop(fila)
+
+        # Entrada obsoleta: o nó já foi alcançado por um caminho melhor
+        if g > custo_ate_agora[atual]:
+            if estatisticas is not None:
+                estatisticas.obsoletas += 1
+            continue
 
         if atual in destinos:
-            return caminho
+            if k is None:
+                alvo = atual
+                break
 
-        for vizinho in grafo.neighbors(atual):
-            # Calcula o custo da aresta entre atual e vizinho
-            if grafo.is_multigraph():
-                arestas = grafo[atual][vizinho]  # Pega as múltiplas arestas entre os nós
-                custo = min(attr.get('length', 0) for attr in arestas.values())
-            else:
-                custo = grafo[atual][vizinho].get('length', 0)
+            # Um destino pode estar no caminho até outro, então a busca segue por ele
+            encontrados.append((atual, g))
+            if len(encontrados) == k:
+                break
 
+        # Custo da aresta entre atual e vizinho (a menor entre arestas paralelas)
+        melhorados = []
+        for vizinho, custo in vizinhos(atual):
             novo_g = g + custo  # g(n) atualizado
 
             # Só atualiza se for a primeira vez ou se o novo caminho for melhor
             if vizinho not in custo_ate_agora or novo_g < custo_ate_agora[vizinho]:
                 custo_ate_agora[vizinho] = novo_g
-                h = min(__haversine(vizinho, d, grafo) for d in destinos)  # h(n): heurística até o destino mais próximo
-                f_novo = novo_g + h
-                heapq.heappush(fila, (f_novo, novo_g, vizinho, caminho + [vizinho]))
+                predecessor[vizinho] = atual
+                melhorados.append(vizinho)
+
+        # A heurística dos vizinhos melhorados é avaliada em um único lote
+        if melhorados:
+            for vizinho, h_vizinho in zip(melhorados, h.varios(melhorados)):
+                novo_g = custo_ate_agora[vizinho]
+                heapq.heappush(fila, (novo_g + h_vizinho, novo_g, vizinho))
+
+        if instrumentada:
+            if estatisticas is not None:
+                estatisticas.expandidos += 1
+                estatisticas.insercoes += len(melhorados)
+                if len(fila) > estatisticas.fronteira_maxima:
+                    estatisticas.fronteira_maxima = len(fila)
+            if rastreio is not None:
+                rastreio(grafo.nos([atual])[0] if csr else atual, g, len(fila))
+
+    if estatisticas is not None:
+        estatisticas.avaliacoes_heuristica += getattr(h, "avaliacoes", 0)
+        inicio = estatisticas.marcar("busca", inicio)
+
+    if alvo is not None:
+        if apenas_distancia:
+            resultado = custo_ate_agora[alvo], (grafo.nos([alvo])[0] if csr else alvo)
+        else:
+            caminho = reconstruir_caminho(predecessor, alvo)
+            resultado = grafo.nos(caminho) if csr else caminho
+    elif k is not None:
+        # Como no BFS, com k a lista fica vazia se nenhum destino for alcançável
+        resultado = ranquear_destinos(encontrados, predecessor, apenas_distancia, peso, grafo.nos if csr else None)
+    else:
+        raise ValueError("Nenhum caminho encontrado para os destinos fornecidos.")
+
+    if estatisticas is not None:
+        estatisticas.marcar("reconstrucao", inicio)
+    return resultado
+
+
+def a_estrela_bidirecional(grafo, origem, destinos, apenas_distancia=False, heuristica=HeuristicaHaversine,
+                           estatisticas=None, rastreio=None):
+    """
+    Implementação do A* bidirecional para múltiplos destinos.
+
+    Uma busca parte da origem no grafo e outra parte de todos os destinos ao
+    mesmo tempo no grafo transposto, até que as duas fronteiras se encontrem.
+    Ambas usam o potencial médio p(n) = (h_destinos(n) - h_origem(n)) / 2,
+    que mantém os custos reduzidos não negativos nos dois sentidos. A busca
+    termina quando a soma dos topos das duas filas alcança o melhor caminho
+    já encontrado, o que garante o caminho ótimo.
+
+    Com a heurística ALT (algorithms.alt), expande bem menos nós que o A*
+    unidirecional com Haversine.
+
+    Args:
+        grafo: GrafoCSR (um grafo do NetworkX é compilado na hora)
+        origem: ID do nó inicial
+        destinos: Conjunto de IDs dos nós objetivos
+        apenas_distancia: Se True, não reconstrói o caminho (opcional)
+        heuristica: Fábrica heuristica(grafo, destinos), chamada para o grafo e
+                    para o seu transposto (opcional)
+        estatisticas: EstatisticasBusca a ser preenchida (opcional)
+        rastreio: Função rastreio(no, g, fronteira) chamada a cada nó expandido,
+                  nos dois sentidos (opcional)
+
+    Returns:
+        list: Caminho da origem até o destino mais próximo encontrado, ou a
+              tupla (distância, destino) se apenas_distancia for True
+
+    Raises:
+        ValueError: Se nenhum caminho for encontrado para os destinos fornecidos
+    """
+    instrumentada = estatisticas is not None or rastreio is not None
+    if estatisticas is not None:
+        inicio = time.perf_counter()
+
+    if not isinstance(grafo, GrafoCSR):
+        grafo = GrafoCSR.de_networkx(grafo)
+    reverso = grafo.transposto()
+
+    s = grafo.indice[origem]
+    destinos = set(grafo.indices(destinos))
+
+    # Heurística até os destinos (busca direta) e até a origem (busca reversa)
+    h_destinos = heuristica(grafo, destinos)
+    h_origem = heuristica(reverso, [s])
+    potencial = {}
+
+    def p(nos):
+        # Potencial médio de cada nó; None para nós que não podem estar na rota
+        faltando = [n for n in nos if n not in potencial]
+        if faltando:
+            for n, ht, hs in zip(faltando, h_destinos.varios(faltando), h_origem.varios(faltando)):
+                potencial[n] = (ht - hs) / 2 if ht != float("inf") and hs != float("inf") else None
+        return [potencial[n] for n in nos]
+
+    # Estado de cada sentido: distâncias, predecessores e fila de (chave, g, nó)
+    # A chave é g + p(n) na busca direta e g - p(n) na busca reversa
+    dist = ({s: 0}, {t: 0 for t in destinos})
+    pred = ({s: None}, {t: None for t in destinos})
+    filas = ([(p([s])[0] or 0, 0, s)], [])
+    for t, pt in zip(destinos, p(list(destinos))):
+        if pt is not None:
+            filas[1].append((-pt, 0, t))
+    heapq.heapify(filas[1])
+    vizinhos = (grafo.vizinhos, reverso.vizinhos)
+    sinal = (1, -1)
+
+    # Melhor caminho encontrado até agora e o nó onde as buscas se encontram
+    melhor = 0 if s in destinos else float("inf")
+    encontro = s if s in destinos else None
+
+    if estatisticas is not None:
+        estatisticas.insercoes += len(filas[0]) + len(filas[1])
+        inicio = estatisticas.marcar("preparacao", inicio)
+
+    while filas[0] and filas[1] and filas[0][0][0] + filas[1][0][0] < melhor:
+        # Expande o sentido com a menor fronteira
+        lado = 0 if len(filas[0]) <= len(filas[1]) else 1
+        outro = 1 - lado
+        _, g, atual = heapq.heappop(filas[lado])
+        if g > dist[lado][atual]:
+            if estatisticas is not None:
+                estatisticas.obsoletas += 1
+            continue  # Entrada obsoleta
+
+        melhorados = []
+        for vizinho, custo in vizinhos[lado](atual):
+            novo_g = g + custo
+            if novo_g < dist[lado].get(vizinho, float("inf")):
+                dist[lado][vizinho] = novo_g
+                pred[lado][vizinho] = atual
+                melhorados.append(vizinho)
+
+                # As duas buscas se tocam: candidato a melhor caminho
+                if vizinho in dist[outro] and novo_g + dist[outro][vizinho] < melhor:
+                    melhor = novo_g + dist[outro][vizinho]
+                    encontro = vizinho
+
+        if melhorados:
+            for vizinho, p_vizinho in zip(melhorados, p(melhorados)):
+                if p_vizinho is not None:
+                    novo_g = dist[lado][vizinho]
+                    heapq.heappush(filas[lado], (novo_g + sinal[lado] * p_vizinho, novo_g, vizinho))
+
+        if instrumentada:
+            fronteira = len(filas[0]) + len(filas[1])
+            if estatisticas is not None:
+                estatisticas.expandidos += 1
+                estatisticas.insercoes += sum(potencial[v] is not None for v in melhorados)
+                if fronteira > estatisticas.fronteira_maxima:
+                    estatisticas.fronteira_maxima = fronteira
+            if rastreio is not None:
+                rastreio(grafo.nos([atual])[0], g, fronteira)
+
+    if estatisticas is not None:
+        estatisticas.avaliacoes_heuristica += getattr(h_destinos, "avaliacoes", 0) + getattr(h_origem, "avaliacoes", 0)
+        inicio = estatisticas.marcar("busca", inicio)
+
+    if encontro is None:
+        raise ValueError("Nenhum caminho encontrado para os destinos fornecidos.")
+
+    # Da origem ao encontro pela busca direta; do encontro ao destino pela reversa
+    caminho = reconstruir_caminho(pred[0], encontro)
+    no = pred[1][encontro]
+    while no is not None:
+        caminho.append(no)
+        no = pred[1][no]
 
-    raise ValueError("Nenhum caminho encontrado para os destinos fornecidos.")
\ No newline at end of file
+    resultado = (melhor, grafo.nos([caminho[-1]])[0]) if apenas_distancia else grafo.nos(caminho)
+    if estatisticas is not None:
+        estatisticas.marcar("reconstrucao", inicio)
+    return resultado
@@ -15,11 +15,14 @@ de nós de destino em um grafo.
 # - Retornará o primeiro caminho mais curto (que será o mais curto tbm)
 
 # busca_nao_informada.py
+import time
 from collections import deque
+from utils.grafo_csr import GrafoCSR, funcao_vizinhos
+from algorithms.caminhos import reconstruir_caminho, ranquear_destinos
 
 # Deque é só uma fila dupla da biblioteca padrão de Python chamada collections, usada aqui, pois o BFS funciona a partir de uma estrutura baseada em FIFO (First In First Out).
 
-def bfs(grafo, origem, destinos):
+def bfs(grafo, origem, destinos, apenas_distancia=False, estatisticas=None, k=None, peso=None, rastreio=None):
     """
     Implementação do algoritmo de busca em largura (BFS) para encontrar
     o caminho mais curto entre um nó de origem e um conjunto de destinos.
@@ -27,43 +30,107 @@ def bfs(grafo, origem, destinos):
     O BFS explora todos os nós vizinhos do nó atual antes de avançar para
     os nós do próximo nível, garantindo que o primeiro caminho encontrado
     seja o mais curto em termos de número de arestas.
+
+    Com k, a busca continua depois do primeiro destino e retorna os k
+    primeiros destinos alcançados, em número de arestas.
     
     Args:
-        grafo: Grafo do NetworkX
+        grafo: Grafo do NetworkX ou GrafoCSR compilado a partir dele
         origem: ID do nó inicial (localização do usuário)
         destinos: Lista de IDs dos nós objetivos (hemocentros válidos)
+        apenas_distancia: Se True, não reconstrói o caminho (opcional)
+        estatisticas: EstatisticasBusca a ser preenchida (opcional)
+        k: Quantidade de destinos a retornar (opcional)
+        peso: Com k, função peso(destino) usada para reordenar os destinos pela
+              distância dividida pelo peso, como as bolsas disponíveis (opcional)
+        rastreio: Função rastreio(no, distancia, fronteira) chamada a cada nó expandido,
+                  com o ID do nó, a distância percorrida até ele e o tamanho da fila (opcional)
         
     Returns:
-        list: Caminho da origem até o destino mais próximo encontrado, ou
-              None se não houver caminho
+        list: Caminho da origem até o destino mais próximo encontrado, ou a
+              tupla (distância em metros, destino) se apenas_distancia for
+              True, ou None se não houver caminho. Com k, lista de até k tuplas
+              (destino, distância em metros, caminho), vazia se não houver caminho
     """
-    # Conjunto para armazenar nós já visitados, evitando ciclos
-    visitado = set()
+    # Instrumentação só é feita quando pedida, sem custo extra no laço caso contrário
+    instrumentada = estatisticas is not None or rastreio is not None
+    if estatisticas is not None:
+        inicio = time.perf_counter()
+
+    # No GrafoCSR a busca trabalha com índices densos, convertidos de volta no final
+    csr = isinstance(grafo, GrafoCSR)
+    if csr:
+        origem = grafo.indice[origem]
+        destinos = set(grafo.indices(destinos))
+
+    vizinhos = funcao_vizinhos(grafo)
+
+    # Predecessor de cada nó já descoberto; também serve como conjunto de
+    # visitados, evitando ciclos e nós repetidos na fila
+    predecessor = {origem: None}
+
+    # Distância percorrida (em metros) até cada nó descoberto
+    distancia = {origem: 0}
     
     # Fila FIFO (First In First Out) para gerenciar a ordem de exploração
-    # Cada elemento da fila é uma tupla (nó_atual, caminho_até_nó)
-    fila = deque([(origem, [origem])])
+    fila = deque([origem])
+
+    # Destinos já alcançados, com a distância, no modo dos k mais próximos
+    encontrados = []
+
+    # Primeiro destino alcançado, no modo de um único destino
+    alvo = None
+
+    if estatisticas is not None:
+        inicio = estatisticas.marcar("preparacao", inicio)
 
     while fila:
         # Remove o primeiro elemento da fila (FIFO)
-        atual, caminho = fila.popleft()
-        
-        # Se o nó já foi visitado, pula para o próximo
-        if atual in visitado:
-            continue
-            
-        # Marca o nó atual como visitado
-        visitado.add(atual)
-
-        # Se encontramos um destino, retorna o caminho
+        atual = fila.popleft()
+
+        # Se encontramos um destino, encerra a busca
         if atual in destinos:
-            return caminho
+            if k is None:
+                alvo = atual
+                break
+
+            # No modo dos k mais próximos, guarda o destino e continua a busca
+            encontrados.append((atual, distancia[atual]))
+            if len(encontrados) == k:
+                break
 
         # Explora todos os vizinhos do nó atual
-        for vizinho in grafo.neighbors(atual):
-            if vizinho not in visitado:
-                # Adiciona o vizinho na fila com o caminho atualizado
-                fila.append((vizinho, caminho + [vizinho]))
+        for vizinho, custo in vizinhos(atual):
+            if vizinho not in predecessor:
+                # Marca o vizinho como descoberto e o adiciona na fila
+                predecessor[vizinho] = atual
+                distancia[vizinho] = distancia[atual] + custo
+                fila.append(vizinho)
+
+        if instrumentada:
+            if estatisticas is not None:
+                estatisticas.expandidos += 1
+                if len(fila) > estatisticas.fronteira_maxima:
+                    estatisticas.fronteira_maxima = len(fila)
+            if rastreio is not None:
+                rastreio(grafo.nos([atual])[0] if csr else atual, distancia[atual], len(fila))
+
+    if estatisticas is not None:
+        # Cada nó descoberto entra na fila exatamente uma vez
+        estatisticas.insercoes += len(predecessor)
+        inicio = estatisticas.marcar("busca", inicio)
+
+    if k is not None:
+        resultado = ranquear_destinos(encontrados, predecessor, apenas_distancia, peso, grafo.nos if csr else None)
+    elif alvo is None:
+        # Se a fila ficou vazia e não encontramos um destino
+        resultado = None
+    elif apenas_distancia:
+        resultado = distancia[alvo], (grafo.nos([alvo])[0] if csr else alvo)
+    else:
+        caminho = reconstruir_caminho(predecessor, alvo)
+        resultado = grafo.nos(caminho) if csr else caminho
 
-    # Se a fila ficou vazia e não encontramos um destino
-    return None
+    if estatisticas is not None:
+        estatisticas.marcar("reconstrucao", inicio)
+    return resultado
@@ -0,0 +1,59 @@
+"""
+Funções auxiliares compartilhadas pelos algoritmos de busca.
+
+As buscas não guardam o caminho completo em cada entrada da fronteira; em vez
+disso, mantêm um mapa de predecessores e reconstroem o caminho apenas quando
+o destino é alcançado.
+"""
+
+def reconstruir_caminho(predecessor, destino):
+    """
+    Reconstrói o caminho até um destino a partir do mapa de predecessores.
+
+    Args:
+        predecessor: Dicionário nó -> nó anterior no caminho (a origem aponta para None)
+        destino: Nó final do caminho
+
+    Returns:
+        list: Caminho da origem até o destino
+    """
+    caminho = []
+    no = destino
+    while no is not None:
+        caminho.append(no)
+        no = predecessor[no]
+    caminho.reverse()
+    return caminho
+
+
+def ranquear_destinos(encontrados, predecessor, apenas_distancia=False, peso=None, nos=None):
+    """
+    Monta o resultado dos k destinos mais próximos de uma busca.
+
+    Args:
+        encontrados: Lista de (destino, distância) na ordem em que a busca os alcançou
+        predecessor: Mapa de predecessores da busca
+        apenas_distancia: Se True, não reconstrói os caminhos (opcional)
+        peso: Função peso(destino) >= 0, por exemplo as bolsas disponíveis no
+              hemocentro; se passada, os destinos são reordenados pela distância
+              dividida pelo peso, e os de peso zero vão para o fim (opcional)
+        nos: Função que converte uma lista de índices densos em IDs de nós,
+             quando a busca foi feita em um GrafoCSR (opcional)
+
+    Returns:
+        list: Tuplas (destino, distância, caminho), com caminho None se apenas_distancia
+    """
+    resultado = []
+    for destino, distancia in encontrados:
+        caminho = None if apenas_distancia else reconstruir_caminho(predecessor, destino)
+        if nos is not None:
+            destino = nos([destino])[0]
+            caminho = caminho if caminho is None else nos(caminho)
+        resultado.append((destino, distancia, caminho))
+
+    if peso is not None:
+        def distancia_ponderada(item):
+            p = peso(item[0])
+            return item[1] / p if p > 0 else float("inf")
+        resultado.sort(key=distancia_ponderada)
+    return resultado
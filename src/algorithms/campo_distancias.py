@@ -0,0 +1,228 @@
+"""
+Campo de distâncias reverso por tipo sanguíneo.
+
+Este módulo contém a classe CampoDeDistancias, que roda um Dijkstra de
+múltiplas fontes a partir de todos os hemocentros válidos de cada tipo
+sanguíneo, percorrendo o grafo transposto. Para cada nó ficam guardados a
+distância até o hemocentro compatível mais próximo, o próximo nó do caminho
+até ele e o hemocentro de origem. Assim, qualquer origem obtém o destino e a
+rota seguindo ponteiros, sem precisar de uma nova busca.
+
+Quando um hemocentro passa a ser (ou deixa de ser) válido para um tipo, só o
+campo desse tipo é atualizado, e apenas na região afetada.
+"""
+
+import heapq
+from array import array
+import numpy as np
+
+INFINITO = float("inf")
+
+
+class CampoDeDistancias:
+    """
+    Distância, próximo passo e hemocentro mais próximo de cada nó, por tipo sanguíneo.
+    """
+
+    def __init__(self, grafo, banco):
+        """
+        Constrói os campos de todos os tipos sanguíneos.
+
+        Args:
+            grafo: GrafoCSR da cidade
+            banco: BancoDeHemocentros com os estoques atuais
+        """
+        self.grafo = grafo
+        self.reverso = grafo.transposto()
+
+        # Para cada tipo: índices dos hemocentros válidos e arrays do campo
+        self.validos = {}
+        self.distancia = {}
+        self.proximo = {}
+        self.fonte = {}
+
+        for tipo in banco.TIPOS_SANGUINEOS:
+            self.__construir(tipo, set(grafo.indices(banco.hemocentros_validos(tipo))))
+
+    def __construir(self, tipo, fontes):
+        # Constrói do zero o campo de um tipo a partir dos hemocentros válidos
+        n = len(self.grafo)
+        self.validos[tipo] = set()
+        self.distancia[tipo] = array("d", [INFINITO]) * n
+        self.proximo[tipo] = array("q", [-1]) * n
+        self.fonte[tipo] = array("q", [-1]) * n
+        for h in fontes:
+            self.__adicionar_fonte(tipo, h)
+
+    def __propagar(self, tipo, fila):
+        # Dijkstra no grafo transposto a partir das entradas (distância, nó) da fila,
+        # aceitando apenas melhorias sobre as distâncias atuais
+        distancia = self.distancia[tipo]
+        proximo = self.proximo[tipo]
+        fonte = self.fonte[tipo]
+        vizinhos = self.reverso.vizinhos
+
+        heapq.heapify(fila)
+        while fila:
+            d, u = heapq.heappop(fila)
+            if d > distancia[u]:
+                continue  # Entrada obsoleta
+
+            # Cada vizinho w no grafo transposto é uma aresta w -> u no grafo original
+            for w, custo in vizinhos(u):
+                nova = d + custo
+                if nova < distancia[w]:
+                    distancia[w] = nova
+                    proximo[w] = u
+                    fonte[w] = fonte[u]
+                    heapq.heappush(fila, (nova, w))
+
+    def __adicionar_fonte(self, tipo, h):
+        # Um novo hemocentro válido só pode diminuir distâncias: propaga a partir dele
+        self.validos[tipo].add(h)
+        distancia = self.distancia[tipo]
+        empate = distancia[h] == 0
+        distancia[h] = 0.0
+        self.proximo[tipo][h] = -1
+        self.fonte[tipo][h] = h
+        if empate:
+            # h já estava a 0 m de outro hemocentro (arestas de comprimento zero): nenhuma
+            # distância melhora, mas os nós que passam por h agora terminam nele
+            self.__reatribuir(tipo, h)
+        else:
+            self.__propagar(tipo, [(0.0, h)])
+
+    def __reatribuir(self, tipo, h):
+        # Faz de h o hemocentro de todos os nós cujos ponteiros de próximo passo passam por ele
+        proximo = self.proximo[tipo]
+        fonte = self.fonte[tipo]
+        pilha = [h]
+        while pilha:
+            u = pilha.pop()
+            for w, _ in self.reverso.vizinhos(u):
+                if proximo[w] == u and fonte[w] != h:
+                    fonte[w] = h
+                    pilha.append(w)
+
+    def __remover_fonte(self, tipo, h):
+        # Só os nós cujo hemocentro mais próximo era h precisam ser recalculados
+        self.validos[tipo].discard(h)
+        distancia = self.distancia[tipo]
+        proximo = self.proximo[tipo]
+        fonte = self.fonte[tipo]
+
+        regiao = np.flatnonzero(np.frombuffer(fonte, dtype=np.int64) == h).tolist()
+        for v in regiao:
+            distancia[v] = INFINITO
+            proximo[v] = -1
+            fonte[v] = -1
+
+        # Hemocentros ainda válidos dentro da região voltam a ser fontes
+        fila = []
+        validos = self.validos[tipo]
+        for v in regiao:
+            if v in validos:
+                distancia[v] = 0.0
+                fonte[v] = v
+                fila.append((0.0, v))
+
+        # Semeia o resto da região com o melhor vizinho de fora dela (aresta v -> u no grafo original)
+        for v in regiao:
+            for u, custo in self.grafo.vizinhos(v):
+                if fonte[u] != -1 and distancia[u] + custo < distancia[v]:
+                    distancia[v] = distancia[u] + custo
+                    proximo[v] = u
+                    fonte[v] = fonte[u]
+            if proximo[v] != -1:
+                fila.append((distancia[v], v))
+
+        self.__propagar(tipo, fila)
+
+    def atualizar(self, banco, tipos=None):
+        """
+        Atualiza os campos após mudanças de estoque, refazendo apenas os tipos
+        cujo conjunto de hemocentros válidos mudou e, neles, só a região afetada.
+
+        Args:
+            banco: BancoDeHemocentros com os estoques atuais
+            tipos: Tipos sanguíneos a verificar (opcional, padrão: todos)
+
+        Returns:
+            list: Tipos sanguíneos cujos campos foram alterados
+        """
+        alterados = []
+        for tipo in tipos or banco.TIPOS_SANGUINEOS:
+            novos = set(self.grafo.indices(banco.hemocentros_validos(tipo)))
+            atuais = self.validos[tipo]
+            if novos == atuais:
+                continue
+
+            for h in atuais - novos:
+                self.__remover_fonte(tipo, h)
+            for h in novos - atuais:
+                self.__adicionar_fonte(tipo, h)
+            alterados.append(tipo)
+        return alterados
+
+    def aplicar_eventos(self, eventos):
+        """
+        Atualiza os campos a partir das mudanças de validade emitidas pelo
+        BancoDeHemocentros, sem consultar os estoques.
+
+        Args:
+            eventos: Lista de MudancaValidade (hemocentro, tipo, valido)
+
+        Returns:
+            list: Tipos sanguíneos cujos campos foram alterados
+        """
+        alterados = []
+        for hemocentro, tipo, valido in eventos:
+            h = self.grafo.indice[hemocentro]
+            if valido and h not in self.validos[tipo]:
+                self.__adicionar_fonte(tipo, h)
+            elif not valido and h in self.validos[tipo]:
+                self.__remover_fonte(tipo, h)
+            else:
+                continue
+            if tipo not in alterados:
+                alterados.append(tipo)
+        return alterados
+
+    def acompanhar(self, banco):
+        """
+        Inscreve o campo no banco, para que cada mudança de validade o atualize na hora.
+
+        Args:
+            banco: BancoDeHemocentros usado na construção do campo
+        """
+        banco.inscrever(self.aplicar_eventos)
+
+    def consultar(self, origem, tipo, apenas_distancia=False):
+        """
+        Retorna o hemocentro compatível mais próximo de uma origem e a rota até ele.
+
+        Args:
+            origem: ID do nó de origem
+            tipo: Tipo sanguíneo do usuário
+            apenas_distancia: Se True, não reconstrói a rota (opcional)
+
+        Returns:
+            tuple: (distância, destino, rota) ou (distância, destino) se
+                   apenas_distancia for True; None se nenhum hemocentro for alcançável
+        """
+        i = self.grafo.indice[origem]
+        fonte = self.fonte[tipo][i]
+        if fonte == -1:
+            return None
+
+        distancia = self.distancia[tipo][i]
+        destino = self.grafo.nos([fonte])[0]
+        if apenas_distancia:
+            return distancia, destino
+
+        # Segue os ponteiros de próximo passo até o hemocentro
+        proximo = self.proximo[tipo]
+        rota = [i]
+        while proximo[rota[-1]] != -1:
+            rota.append(proximo[rota[-1]])
+        return distancia, destino, self.grafo.nos(rota)
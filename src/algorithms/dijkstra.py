@@ -0,0 +1,93 @@
+"""
+Implementação do algoritmo de Dijkstra sobre o GrafoCSR.
+
+Este módulo contém o Dijkstra de múltiplas fontes usado nas etapas de
+pré-processamento (tabelas de marcos do ALT, por exemplo), que precisam das
+distâncias de uma ou mais fontes até todos os nós do grafo, e o Dijkstra de
+múltiplos alvos usado pelo modo "Ideal", que para no primeiro destino fixado.
+"""
+
+import heapq
+from array import array
+import numpy as np
+
+INFINITO = float("inf")
+
+
+def distancias(grafo, fontes):
+    """
+    Calcula a menor distância das fontes até todos os nós do grafo.
+
+    Para obter as distâncias de todos os nós até as fontes, basta passar o
+    grafo transposto (GrafoCSR.transposto()).
+
+    Args:
+        grafo: GrafoCSR
+        fontes: Índices densos dos nós de partida (distância 0)
+
+    Returns:
+        numpy.ndarray: Distância de cada nó (inf para os não alcançáveis)
+    """
+    dist = array("d", [INFINITO]) * len(grafo)
+    vizinhos = grafo.vizinhos
+
+    fila = []
+    for f in fontes:
+        dist[f] = 0.0
+        fila.append((0.0, f))
+
+    while fila:
+        d, u = heapq.heappop(fila)
+        if d > dist[u]:
+            continue  # Entrada obsoleta
+        for v, custo in vizinhos(u):
+            nova = d + custo
+            if nova < dist[v]:
+                dist[v] = nova
+                heapq.heappush(fila, (nova, v))
+
+    return np.frombuffer(dist, dtype=np.float64)
+
+
+def dijkstra_multi_alvo(grafo, origem, destinos, k=1):
+    """
+    Dijkstra a partir da origem que para assim que k destinos forem fixados.
+
+    Como o Dijkstra fixa os nós em ordem crescente de distância, os destinos
+    saem exatamente do mais próximo para o mais distante, com uma única busca
+    em vez de uma busca por destino.
+
+    Args:
+        grafo: GrafoCSR
+        origem: Índice denso do nó de partida
+        destinos: Índices densos dos nós objetivos
+        k: Quantidade de destinos a fixar antes de parar; None para todos (opcional)
+
+    Returns:
+        tuple: (ranking, predecessor), onde ranking é a lista de (distância, destino)
+               dos destinos fixados, do mais próximo para o mais distante, e
+               predecessor é o mapa usado para reconstruir os caminhos
+    """
+    destinos = set(destinos)
+    k = len(destinos) if k is None else min(k, len(destinos))
+    vizinhos = grafo.vizinhos
+
+    dist = {origem: 0}
+    predecessor = {origem: None}
+    ranking = []
+    fila = [(0, origem)]
+
+    while fila and len(ranking) < k:
+        d, u = heapq.heappop(fila)
+        if d > dist[u]:
+            continue  # Entrada obsoleta
+        if u in destinos:
+            ranking.append((d, u))
+        for v, custo in vizinhos(u):
+            nova = d + custo
+            if nova < dist.get(v, INFINITO):
+                dist[v] = nova
+                predecessor[v] = u
+                heapq.heappush(fila, (nova, v))
+
+    return ranking, predecessor
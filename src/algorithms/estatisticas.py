@@ -0,0 +1,69 @@
+"""
+Estatísticas de execução das buscas.
+
+As buscas recebem opcionalmente um objeto EstatisticasBusca e o preenchem com
+o trabalho realizado, permitindo comparar quantos nós cada algoritmo expande
+para responder a mesma consulta e diagnosticar consultas lentas.
+
+As buscas também aceitam uma função de rastreio, chamada a cada expansão. Sem
+estatísticas e sem rastreio, o laço principal das buscas não faz nenhum
+trabalho extra.
+"""
+
+import time
+
+
+class EstatisticasBusca:
+    """
+    Contadores preenchidos por uma busca.
+
+    Attributes:
+        expandidos: Quantidade de nós expandidos (retirados da fronteira e explorados)
+        insercoes: Quantidade de entradas inseridas na fila de prioridade (ou na fila FIFO do BFS)
+        obsoletas: Entradas retiradas da fila e descartadas por já existir um caminho melhor
+        fronteira_maxima: Maior tamanho alcançado pela fronteira (soma das duas filas na busca bidirecional)
+        avaliacoes_heuristica: Quantidade de nós para os quais h(n) foi calculada
+        tempos: Tempo de relógio, em segundos, de cada fase da busca
+                ("preparacao", "busca" e "reconstrucao")
+    """
+
+    def __init__(self):
+        self.expandidos = 0
+        self.insercoes = 0
+        self.obsoletas = 0
+        self.fronteira_maxima = 0
+        self.avaliacoes_heuristica = 0
+        self.tempos = {}
+
+    def marcar(self, fase, inicio):
+        """
+        Soma ao tempo da fase o intervalo desde inicio e retorna o instante atual,
+        que serve de início da próxima fase.
+        """
+        agora = time.perf_counter()
+        self.tempos[fase] = self.tempos.get(fase, 0.0) + agora - inicio
+        return agora
+
+    def tempo_total(self):
+        return sum(self.tempos.values())
+
+    def como_dict(self):
+        """
+        Retorna os contadores em um dicionário (por exemplo, para logs em JSON).
+        """
+        return {
+            "expandidos": self.expandidos,
+            "insercoes": self.insercoes,
+            "obsoletas": self.obsoletas,
+            "fronteira_maxima": self.fronteira_maxima,
+            "avaliacoes_heuristica": self.avaliacoes_heuristica,
+            "tempos": dict(self.tempos),
+        }
+
+    def __repr__(self):
+        return (
+            f"EstatisticasBusca(expandidos={self.expandidos}, insercoes={self.insercoes}, "
+            f"obsoletas={self.obsoletas}, fronteira_maxima={self.fronteira_maxima}, "
+            f"avaliacoes_heuristica={self.avaliacoes_heuristica}, "
+            f"tempo={self.tempo_total() * 1000:.2f} ms)"
+        )
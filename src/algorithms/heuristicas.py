@@ -0,0 +1,118 @@
+"""
+Heurísticas para a busca informada.
+
+Este módulo contém a base comum das heurísticas avaliadas em lote e a
+heurística Haversine para múltiplos destinos usada pelo A*. As coordenadas
+em radianos dos nós são pré-calculadas uma vez por grafo
+(GrafoCSR.radianos), e o limite inferior até o destino mais próximo é
+avaliado em lote com NumPy para vários nós de uma vez. Com muitos destinos,
+uma BallTree (scikit-learn) sobre o conjunto de destinos substitui a
+comparação contra todos eles. Os valores já calculados ficam memorizados
+durante a consulta.
+"""
+
+import numpy as np
+from utils.grafo_csr import GrafoCSR
+
+R = 6371000  # Raio da Terra em metros
+
+# A partir desta quantidade de destinos, usa uma árvore espacial
+LIMITE_ARVORE = 512
+
+
+class HeuristicaEmLote:
+    """
+    Base das heurísticas de uma consulta, avaliadas em lote e memorizadas.
+
+    Uma subclasse implementa _calcular(nos), que retorna h(n) para uma lista de
+    nós ainda não avaliados; esta classe oferece h(no) e h.varios(nos), guarda
+    os valores já calculados e conta as avaliações (usadas pelas estatísticas
+    das buscas).
+    """
+
+    def __init__(self):
+        self.avaliacoes = 0  # Quantidade de nós para os quais h(n) foi calculada
+        self._memo = {}
+
+    def _calcular(self, nos):
+        raise NotImplementedError
+
+    def varios(self, nos):
+        """
+        Retorna h(n) para cada nó da lista, calculando em lote os que faltam.
+        """
+        memo = self._memo
+        faltando = [n for n in nos if n not in memo]
+        if faltando:
+            self.avaliacoes += len(faltando)
+            memo.update(zip(faltando, self._calcular(faltando)))
+        return [memo[n] for n in nos]
+
+    def __call__(self, no):
+        h = self._memo.get(no)
+        if h is None:
+            h = self.varios([no])[0]
+        return h
+
+
+class HeuristicaHaversine(HeuristicaEmLote):
+    """
+    Distância Haversine até o destino mais próximo, para uma consulta.
+
+    A distância Haversine é uma fórmula que calcula a distância entre dois pontos
+    na superfície de uma esfera (Terra) dadas suas coordenadas de latitude e longitude.
+    Como o comprimento de uma rua nunca é menor que a distância em linha reta entre
+    suas pontas, a heurística é admissível e consistente.
+
+    Uma instância é criada por consulta com HeuristicaHaversine(grafo, destinos)
+    e pode ser chamada com um nó (h(no)) ou com vários nós (h.varios(nos)).
+    """
+
+    def __init__(self, grafo, destinos):
+        """
+        Args:
+            grafo: GrafoCSR (nós como índices densos) ou grafo do NetworkX
+            destinos: Nós objetivos da consulta
+        """
+        super().__init__()
+        self.grafo = grafo
+        self._arvore = None
+
+        lat_d, lon_d, cos_d = self.__coordenadas(list(destinos))
+        if len(lat_d) > LIMITE_ARVORE:
+            try:
+                from sklearn.neighbors import BallTree
+                self._arvore = BallTree(np.column_stack([lat_d, lon_d]), metric="haversine")
+            except ImportError:
+                pass
+
+        self._lat_d = lat_d
+        self._lon_d = lon_d
+        self._cos_d = cos_d
+
+    def __coordenadas(self, nos):
+        # Latitudes, longitudes (em radianos) e cossenos das latitudes de uma lista de nós;
+        # no GrafoCSR, os três já vêm pré-calculados
+        if isinstance(self.grafo, GrafoCSR):
+            lat, lon, cos_lat = self.grafo.radianos()
+            return lat[nos], lon[nos], cos_lat[nos]
+        nodes = self.grafo.nodes
+        lat = np.radians([nodes[n]['y'] for n in nos])
+        lon = np.radians([nodes[n]['x'] for n in nos])
+        return lat, lon, np.cos(lat)
+
+    def _calcular(self, nos):
+        # Distância de cada nó até o destino mais próximo, em um único lote
+        lat, lon, cos_lat = self.__coordenadas(nos)
+
+        if self._arvore is not None:
+            dist, _ = self._arvore.query(np.column_stack([lat, lon]), k=1)
+            return (R * dist[:, 0]).tolist()
+
+        dlat = self._lat_d[None, :] - lat[:, None]
+        dlon = self._lon_d[None, :] - lon[:, None]
+        a = np.sin(dlat / 2)**2 + cos_lat[:, None] * self._cos_d[None, :] * np.sin(dlon / 2)**2
+
+        # A distância cresce com a, então basta o menor a de cada nó
+        a = np.minimum(a.min(axis=1), 1.0)
+        return (R * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))).tolist()
@@ -0,0 +1,361 @@
+"""
+Contraction Hierarchies (hierarquias de contração) para o modo "Ideal".
+
+Este módulo contém a classe HierarquiaDeContracao. No pré-processamento, os
+nós do GrafoCSR são contraídos um a um, em ordem de importância: ao remover
+um nó v, cada caminho u -> v -> w que seja o único caminho mínimo entre u e w
+vira um atalho u -> w (que lembra o nó do meio v). Cada nó recebe o seu nível
+(a ordem de contração).
+
+Numa consulta, uma busca sobe a hierarquia a partir da origem e outra a partir
+do destino (no sentido inverso), e as duas se encontram no nó mais alto do
+caminho mínimo. Como cada busca só percorre arestas "para cima", elas visitam
+poucas centenas de nós mesmo em grafos grandes. Os atalhos do caminho
+encontrado são então desempacotados recursivamente nas arestas originais.
+
+A hierarquia pode ser salva em disco com salvar() e recarregada com carregar().
+"""
+
+import heapq
+import os
+import numpy as np
+
+INFINITO = float("inf")
+
+# Arrays que compõem a hierarquia, salvos um por arquivo .npy
+ARRAYS = (
+    "nivel",
+    "sobe_offsets", "sobe_alvos", "sobe_pesos", "sobe_meios",
+    "desce_offsets", "desce_alvos", "desce_pesos", "desce_meios",
+)
+
+
+def _csr(listas, n):
+    # Monta arrays CSR (offsets, alvos, pesos, meios) a partir de listas por nó
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(lista) for lista in listas], out=offsets[1:])
+    alvos = np.array([a for lista in listas for a, _, _ in lista], dtype=np.int64)
+    pesos = np.array([p for lista in listas for _, p, _ in lista], dtype=np.float64)
+    meios = np.array([m for lista in listas for _, _, m in lista], dtype=np.int64)
+    return offsets, alvos, pesos, meios
+
+
+class HierarquiaDeContracao:
+    """
+    Hierarquia de contração de um GrafoCSR, com consultas ponto a ponto e de
+    uma origem para vários destinos.
+
+    O grafo "sobe" guarda, em cada nó u, as arestas u -> w com nível de w maior
+    que o de u. O grafo "desce" guarda, em cada nó w, as arestas u -> w com nível
+    de u maior que o de w (ou seja, percorridas ao contrário pela busca reversa).
+    Em ambos, o meio de um atalho é o nó contraído que ele substitui (-1 para
+    arestas originais).
+    """
+
+    def __init__(self, grafo, nivel, sobe_offsets, sobe_alvos, sobe_pesos, sobe_meios,
+                 desce_offsets, desce_alvos, desce_pesos, desce_meios):
+        self.grafo = grafo
+        self.nivel = nivel
+        self.sobe = (sobe_offsets, sobe_alvos, sobe_pesos, sobe_meios)
+        self.desce = (desce_offsets, desce_alvos, desce_pesos, desce_meios)
+
+    @classmethod
+    def construir(cls, grafo, limite_testemunha=64):
+        """
+        Contrai todos os nós do grafo e monta a hierarquia.
+
+        Args:
+            grafo: GrafoCSR da cidade
+            limite_testemunha: Máximo de nós fixados em cada busca por caminho
+                               alternativo; limites menores aceleram a construção
+                               ao custo de alguns atalhos desnecessários (opcional)
+
+        Returns:
+            HierarquiaDeContracao: Hierarquia construída
+        """
+        n = len(grafo)
+
+        # Grafo restante (apenas nós ainda não contraídos) e todas as arestas já criadas
+        saida = [{} for _ in range(n)]
+        entrada = [{} for _ in range(n)]
+        arestas = {}  # (u, w) -> (peso, meio)
+        for u in range(n):
+            for w, custo in grafo.vizinhos(u):
+                if u != w and custo < saida[u].get(w, INFINITO):
+                    saida[u][w] = custo
+                    entrada[w][u] = custo
+                    arestas[(u, w)] = (custo, -1)
+
+        def testemunha(u, v, limite):
+            # Dijkstra limitado a partir de u no grafo restante, sem passar por v
+            dist = {u: 0}
+            fila = [(0, u)]
+            fixados = 0
+            while fila and fixados < limite_testemunha:
+                d, x = heapq.heappop(fila)
+                if d > dist[x]:
+                    continue
+                if d > limite:
+                    break
+                fixados += 1
+                for y, custo in saida[x].items():
+                    nova = d + custo
+                    if y != v and nova < dist.get(y, INFINITO):
+                        dist[y] = nova
+                        heapq.heappush(fila, (nova, y))
+            return dist
+
+        def simular(v):
+            # Atalhos necessários para contrair v
+            atalhos = []
+            for u, custo_uv in entrada[v].items():
+                alvos = {w: custo_uv + custo_vw for w, custo_vw in saida[v].items() if w != u}
+                if not alvos:
+                    continue
+                dist = testemunha(u, v, max(alvos.values()))
+                atalhos.extend((u, w, c) for w, c in alvos.items() if dist.get(w, INFINITO) > c)
+            return atalhos
+
+        vizinhos_contraidos = [0] * n
+
+        def prioridade(v, atalhos):
+            # Diferença de arestas mais vizinhos já contraídos (espalha a contração pelo grafo)
+            return len(atalhos) - len(entrada[v]) - len(saida[v]) + vizinhos_contraidos[v]
+
+        fila = [(prioridade(v, simular(v)), v) for v in range(n)]
+        heapq.heapify(fila)
+        nivel = np.zeros(n, dtype=np.int64)
+        ordem = 0
+
+        while fila:
+            _, v = heapq.heappop(fila)
+
+            # Atualização preguiçosa: a prioridade pode ter mudado desde que entrou na fila
+            atalhos = simular(v)
+            p = prioridade(v, atalhos)
+            if fila and p > fila[0][0]:
+                heapq.heappush(fila, (p, v))
+                continue
+
+            # Contrai v: remove-o do grafo restante e adiciona os atalhos
+            for u in entrada[v]:
+                del saida[u][v]
+                vizinhos_contraidos[u] += 1
+            for w in saida[v]:
+                del entrada[w][v]
+                vizinhos_contraidos[w] += 1
+            entrada[v] = {}
+            saida[v] = {}
+
+            for u, w, custo in atalhos:
+                if custo < saida[u].get(w, INFINITO):
+                    saida[u][w] = custo
+                    entrada[w][u] = custo
+                    arestas[(u, w)] = (custo, v)
+
+            nivel[v] = ordem
+            ordem += 1
+
+        sobe = [[] for _ in range(n)]
+        desce = [[] for _ in range(n)]
+        for (u, w), (custo, meio) in arestas.items():
+            if nivel[u] < nivel[w]:
+                sobe[u].append((w, custo, meio))
+            else:
+                desce[w].append((u, custo, meio))
+
+        return cls(grafo, nivel, *_csr(sobe, n), *_csr(desce, n))
+
+    def salvar(self, diretorio):
+        """
+        Salva a hierarquia em arquivos .npy (um por array) no diretório.
+        """
+        os.makedirs(diretorio, exist_ok=True)
+        for nome, array in zip(ARRAYS, (self.nivel, *self.sobe, *self.desce)):
+            np.save(os.path.join(diretorio, nome + ".npy"), array)
+
+    @classmethod
+    def carregar(cls, diretorio, grafo, mmap=True):
+        """
+        Carrega uma hierarquia salva com salvar().
+
+        Args:
+            diretorio: Diretório com os arquivos .npy
+            grafo: GrafoCSR a partir do qual a hierarquia foi construída
+            mmap: Se True, mapeia os arquivos em memória (opcional)
+
+        Returns:
+            HierarquiaDeContracao: Hierarquia carregada
+        """
+        modo = "r" if mmap else None
+        arrays = [np.load(os.path.join(diretorio, nome + ".npy"), mmap_mode=modo) for nome in ARRAYS]
+        return cls(grafo, *arrays)
+
+    def __arestas(self, csr, x):
+        # Arestas (vizinho, custo, meio) de x em um dos grafos da hierarquia
+        offsets, alvos, pesos, meios = csr
+        ini, fim = offsets[x:x + 2].tolist()
+        return zip(alvos[ini:fim].tolist(), pesos[ini:fim].tolist(), meios[ini:fim].tolist())
+
+    def __subir(self, csr, inicio):
+        # Dijkstra completo "para cima" a partir de inicio
+        # Retorna distâncias e predecessores (nó anterior, meio da aresta)
+        dist = {inicio: 0}
+        pred = {inicio: None}
+        fila = [(0, inicio)]
+        while fila:
+            d, x = heapq.heappop(fila)
+            if d > dist[x]:
+                continue
+            for y, custo, meio in self.__arestas(csr, x):
+                nova = d + custo
+                if nova < dist.get(y, INFINITO):
+                    dist[y] = nova
+                    pred[y] = (x, meio)
+                    heapq.heappush(fila, (nova, y))
+        return dist, pred
+
+    def __meio(self, csr, x, y):
+        # Meio da aresta guardada em x com vizinho y
+        for vizinho, _, meio in self.__arestas(csr, x):
+            if vizinho == y:
+                return meio
+        raise KeyError((x, y))
+
+    def __desempacotar(self, a, b, meio, caminho):
+        # Acrescenta ao caminho os nós da aresta a -> b, expandindo os atalhos
+        pilha = [(a, b, meio)]
+        while pilha:
+            a, b, meio = pilha.pop()
+            if meio == -1:
+                caminho.append(b)
+                continue
+            # O meio tem nível menor que a e b: a -> meio está em "desce", meio -> b em "sobe"
+            pilha.append((meio, b, self.__meio(self.sobe, meio, b)))
+            pilha.append((a, meio, self.__meio(self.desce, meio, a)))
+
+    def __caminho(self, pred_sobe, pred_desce, encontro):
+        # Caminho completo (em índices densos) passando pelo nó de encontro
+        arestas = []
+        x = encontro
+        while pred_sobe[x] is not None:
+            anterior, meio = pred_sobe[x]
+            arestas.append((anterior, x, meio))
+            x = anterior
+        arestas.reverse()
+        x = encontro
+        while pred_desce[x] is not None:
+            seguinte, meio = pred_desce[x]
+            arestas.append((x, seguinte, meio))
+            x = seguinte
+
+        caminho = [arestas[0][0] if arestas else encontro]
+        for a, b, meio in arestas:
+            self.__desempacotar(a, b, meio, caminho)
+        return caminho
+
+    def __distancia(self, caminho):
+        # Soma os custos das arestas originais da esquerda para a direita, como o NetworkX
+        return self.grafo.custo_caminho(caminho)
+
+    def consultar(self, origem, destino, apenas_distancia=False):
+        """
+        Calcula o caminho mínimo entre dois nós.
+
+        Args:
+            origem: ID do nó de origem
+            destino: ID do nó de destino
+            apenas_distancia: Se True, não desempacota o caminho (opcional)
+
+        Returns:
+            tuple: (distância, caminho), ou apenas a distância se apenas_distancia
+                   for True; None se o destino não for alcançável
+        """
+        s = self.grafo.indice[origem]
+        t = self.grafo.indice[destino]
+
+        # Busca bidirecional: as duas buscas param quando o topo das filas passa do melhor encontro
+        melhor = [INFINITO, None]
+        dist = ({s: 0}, {t: 0})
+        pred = ({s: None}, {t: None})
+        filas = ([(0, s)], [(0, t)])
+        grafos = (self.sobe, self.desce)
+
+        while True:
+            topos = [fila[0][0] if fila else INFINITO for fila in filas]
+            if min(topos) >= melhor[0]:
+                break
+            lado = 0 if topos[0] <= topos[1] else 1
+            d, x = heapq.heappop(filas[lado])
+            if d > dist[lado][x]:
+                continue
+            if x in dist[1 - lado] and d + dist[1 - lado][x] < melhor[0]:
+                melhor = [d + dist[1 - lado][x], x]
+            for y, custo, meio in self.__arestas(grafos[lado], x):
+                nova = d + custo
+                if nova < dist[lado].get(y, INFINITO):
+                    dist[lado][y] = nova
+                    pred[lado][y] = (x, meio)
+                    heapq.heappush(filas[lado], (nova, y))
+
+        distancia, encontro = melhor
+        if encontro is None:
+            return None
+        if apenas_distancia:
+            return distancia
+
+        caminho = self.__caminho(pred[0], pred[1], encontro)
+        return self.__distancia(caminho), self.grafo.nos(caminho)
+
+    def consultar_varios(self, origem, destinos, apenas_distancia=False):
+        """
+        Calcula o caminho mínimo da origem até cada um dos destinos (por exemplo,
+        até todos os hemocentros válidos) com uma única busca a partir da origem.
+
+        Args:
+            origem: ID do nó de origem
+            destinos: IDs dos nós de destino
+            apenas_distancia: Se True, não desempacota os caminhos (opcional)
+
+        Returns:
+            list: Tuplas (distância, destino, caminho) ordenadas pela distância, ou
+                  (distância, destino) se apenas_distancia for True; destinos não
+                  alcançáveis ficam de fora
+        """
+        s = self.grafo.indice[origem]
+        dist_sobe, pred_sobe = self.__subir(self.sobe, s)
+
+        resultados = []
+        for destino in destinos:
+            melhor = [INFINITO, None]
+
+            # Busca reversa a partir do destino, parando quando não puder mais melhorar
+            t = self.grafo.indice[destino]
+            dist_desce, pred_desce = {t: 0}, {t: None}
+            fila = [(0, t)]
+            while fila:
+                d, x = heapq.heappop(fila)
+                if d > dist_desce[x]:
+                    continue
+                if d >= melhor[0]:
+                    break
+                if x in dist_sobe and d + dist_sobe[x] < melhor[0]:
+                    melhor = [d + dist_sobe[x], x]
+                for y, custo, meio in self.__arestas(self.desce, x):
+                    nova = d + custo
+                    if nova < dist_desce.get(y, INFINITO):
+                        dist_desce[y] = nova
+                        pred_desce[y] = (x, meio)
+                        heapq.heappush(fila, (nova, y))
+
+            distancia, encontro = melhor
+            if encontro is None:
+                continue
+            if apenas_distancia:
+                resultados.append((distancia, destino))
+            else:
+                caminho = self.__caminho(pred_sobe, pred_desce, encontro)
+                resultados.append((self.__distancia(caminho), destino, self.grafo.nos(caminho)))
+
+        resultados.sort(key=lambda r: r[0])
+        return resultados
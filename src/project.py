@@ -7,12 +7,35 @@ e não informada para encontrar o caminho mais eficiente.
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
-from utils.helper_functions import Graph, BancoDeHemocentros
-from algorithms.busca_informada import a_estrela
+from tkinter import ttk, messagebox, simpledialog
+from concurrent.futures import ThreadPoolExecutor
+import matplotlib
+matplotlib.use("Agg")  # As figuras são desenhadas fora da thread do Tk, sem janelas próprias
+from utils.helper_functions import BancoDeHemocentros
+from algorithms.busca_informada import a_estrela, a_estrela_bidirecional
 from algorithms.busca_nao_informada import bfs
+from algorithms.campo_distancias import CampoDeDistancias
+from algorithms.alt import PreprocessamentoALT
+from algorithms.estatisticas import EstatisticasBusca
 from utils.helper_functions import plotar_com_zoom
-from PIL import Image, ImageTk
+from utils.registro_grafos import RegistroDeGrafos
+from utils.cache_rotas import CacheDeRotas
+from PIL import ImageTk
+
+
+# Cidades atendidas (nome -> GraphML) e a cidade aberta pelo botão de carregar
+CIDADES = {"sao_carlos": "../data/sao_carlos.graphml"}
+CIDADE_PADRAO = "sao_carlos"
+
+# Nó usado como localização sugerida do usuário, quando existir no grafo
+ORIGEM_PADRAO = 5156294301
+
+
+class TarefaCancelada(Exception):
+    """
+    Lançada dentro de uma tarefa em segundo plano que foi substituída por outra mais recente.
+    """
+
 
 class BloodDonationApp:
     """
@@ -34,10 +57,29 @@ class BloodDonationApp:
         # Variáveis de estado
         self.grafo = None
         self.banco_hemocentros = None
+        self.campo_distancias = None
+        self.alt = None
+        self.cache_rotas = None
         self.origem = None
         self.tipo_sanguineo = tk.StringVar()
         self.tipo_sanguineo.trace_add("write", self.filtrar_hemocentros)
         self.algoritmo = tk.StringVar(value="A*")
+
+        # Grafos das cidades, carregados sob demanda e mantidos dentro de um limite de memória
+        self.registro = RegistroDeGrafos()
+        for nome, arquivo in CIDADES.items():
+            self.registro.registrar(nome, arquivo)
+
+        # Carregamento, buscas e desenhos rodam em uma thread separada, para não travar
+        # a janela; apenas a tarefa mais recente tem o seu resultado exibido
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.tarefa_atual = 0
+        self.mensagem_progresso = ""
+        self.root.protocol("WM_DELETE_WINDOW", self.fechar)
+
+        # Área da imagem, criada na primeira exibição e reaproveitada depois
+        self.canvas_imagem = None
+        self.tk_image = None
         
         # Criar interface
         self.create_widgets()
@@ -102,13 +144,19 @@ class BloodDonationApp:
             variable=self.algoritmo, 
             value="Ideal"
         ).grid(row=0, column=7, padx=5, pady=5)
+        ttk.Radiobutton(
+            control_frame, 
+            text="A* Bidirecional", 
+            variable=self.algoritmo, 
+            value="A* Bidirecional"
+        ).grid(row=0, column=8, padx=5, pady=5)
         
         # Botão para executar busca
         ttk.Button(
             control_frame, 
             text="Encontrar Rota", 
             command=self.encontrar_rota
-        ).grid(row=0, column=8, padx=5, pady=5)
+        ).grid(row=0, column=9, padx=5, pady=5)
         
         # Frame para informações
         self.info_frame = ttk.LabelFrame(main_frame, text="Informações", padding="5")
@@ -126,93 +174,211 @@ class BloodDonationApp:
         
         self.nos_label = ttk.Label(self.info_frame, text="Nós percorridos: Não calculado")
         self.nos_label.grid(row=0, column=3, padx=5, pady=5)
+
+        self.expandidos_label = ttk.Label(self.info_frame, text="Nós expandidos: Não calculado")
+        self.expandidos_label.grid(row=0, column=4, padx=5, pady=5)
+
+        # Progresso das tarefas em segundo plano
+        self.status_label = ttk.Label(self.info_frame, text="Pronto")
+        self.status_label.grid(row=1, column=0, columnspan=3, sticky=tk.W, padx=5, pady=5)
+
+        self.barra_progresso = ttk.Progressbar(self.info_frame, mode="indeterminate", length=200)
+        self.barra_progresso.grid(row=1, column=3, columnspan=2, sticky=tk.E, padx=5, pady=5)
+
+    def executar_em_segundo_plano(self, trabalho, ao_concluir, erro):
+        """
+        Executa um trabalho na thread de segundo plano e entrega o resultado à thread do Tk.
+
+        Uma nova tarefa substitui a anterior: se a anterior ainda não começou, é
+        cancelada; se já está rodando, é interrompida no próximo ponto de progresso
+        e o seu resultado é descartado.
+
+        Args:
+            trabalho: Função trabalho(progresso) executada em segundo plano; deve chamar
+                      progresso(mensagem) entre as etapas e retornar o resultado
+            ao_concluir: Função chamada na thread do Tk com o resultado
+            erro: Prefixo da mensagem exibida se o trabalho falhar
+        """
+        self.tarefa_atual += 1
+        tarefa = self.tarefa_atual
+
+        if hasattr(self, 'futuro') and not self.futuro.done():
+            self.futuro.cancel()
+
+        def progresso(mensagem):
+            # Chamado pela thread de segundo plano
+            if tarefa != self.tarefa_atual:
+                raise TarefaCancelada()
+            self.mensagem_progresso = mensagem
+
+        self.mensagem_progresso = "Processando..."
+        self.barra_progresso.start(10)
+        self.futuro = self.executor.submit(trabalho, progresso)
+        self.root.after(50, self.verificar_tarefa, tarefa, self.futuro, ao_concluir, erro)
+
+    def verificar_tarefa(self, tarefa, futuro, ao_concluir, erro):
+        """
+        Acompanha, pela thread do Tk, uma tarefa em segundo plano até ela terminar.
+        """
+        # Tarefa substituída por outra: o resultado é descartado
+        if tarefa != self.tarefa_atual:
+            return
+
+        if not futuro.done():
+            self.status_label.config(text=self.mensagem_progresso)
+            self.root.after(50, self.verificar_tarefa, tarefa, futuro, ao_concluir, erro)
+            return
+
+        self.barra_progresso.stop()
+        self.status_label.config(text="Pronto")
+        try:
+            resultado = futuro.result()
+        except TarefaCancelada:
+            return
+        except Exception as e:
+            messagebox.showerror("Erro", f"{erro}: {str(e)}")
+            return
+        ao_concluir(resultado)
+
+    def fechar(self):
+        """
+        Cancela as tarefas pendentes e fecha a janela.
+        """
+        self.tarefa_atual += 1
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
     
 
-    def mostrar_imagem(self, pathname: str):
+    def mostrar_imagem(self, imagem):
+        """
+        Exibe uma imagem já desenhada em memória na área rolável da janela.
+
+        O canvas, as barras de rolagem e a PhotoImage são criados uma única vez;
+        nas trocas seguintes, a imagem nova é copiada para a PhotoImage existente
+        (ou substitui apenas ela, se o tamanho mudou).
+
+        Args:
+            imagem: Imagem PIL devolvida pelas funções de plot
+        """
         try:
-            # Remove imagem/canvas anterior, se existir
-            if hasattr(self, 'frame_imagem') and self.frame_imagem.winfo_exists():
-                self.frame_imagem.destroy()
-            if hasattr(self, 'canvas_imagem') and self.canvas_imagem.winfo_exists():
-                self.canvas_imagem.destroy()
-            if hasattr(self, 'scrollbar_y') and self.scrollbar_y.winfo_exists():
-                self.scrollbar_y.destroy()
-            if hasattr(self, 'scrollbar_x') and self.scrollbar_x.winfo_exists():
-                self.scrollbar_x.destroy()
-
-            # Carrega a imagem
-            imagem = Image.open("../images/app_images/" + pathname)
-            max_size = (1100, 1100)
-            imagem.thumbnail(max_size)  # Redimensiona mantendo proporção
-            self.tk_image = ImageTk.PhotoImage(imagem)
-
-            # Canvas com scroll
-            self.canvas_imagem = tk.Canvas(self.root, width=1000, height=700)
-            self.scrollbar_y = ttk.Scrollbar(self.root, orient="vertical", command=self.canvas_imagem.yview)
-            self.scrollbar_x = ttk.Scrollbar(self.root, orient="horizontal", command=self.canvas_imagem.xview)
-            self.canvas_imagem.configure(yscrollcommand=self.scrollbar_y.set, xscrollcommand=self.scrollbar_x.set)
-
-            # Posicionamento
-            self.canvas_imagem.grid(row=2, column=0, sticky="nsew", columnspan=2)
-            self.scrollbar_y.grid(row=2, column=2, sticky="ns")
-            self.scrollbar_x.grid(row=3, column=0, sticky="ew", columnspan=2)
-
-            # Frame onde a imagem será colocada
-            self.frame_imagem = tk.Frame(self.canvas_imagem)
-            self.label_imagem = tk.Label(self.frame_imagem, image=self.tk_image)
-            self.label_imagem.pack()
-
-            # Adiciona o frame ao canvas
-            self.canvas_imagem.create_window((0, 0), window=self.frame_imagem, anchor="nw")
+            # Canvas com scroll, criado na primeira exibição
+            if self.canvas_imagem is None:
+                self.canvas_imagem = tk.Canvas(self.root, width=1000, height=700)
+                self.scrollbar_y = ttk.Scrollbar(self.root, orient="vertical", command=self.canvas_imagem.yview)
+                self.scrollbar_x = ttk.Scrollbar(self.root, orient="horizontal", command=self.canvas_imagem.xview)
+                self.canvas_imagem.configure(yscrollcommand=self.scrollbar_y.set, xscrollcommand=self.scrollbar_x.set)
+
+                # Posicionamento
+                self.canvas_imagem.grid(row=2, column=0, sticky="nsew", columnspan=2)
+                self.scrollbar_y.grid(row=2, column=2, sticky="ns")
+                self.scrollbar_x.grid(row=3, column=0, sticky="ew", columnspan=2)
+
+                self.item_imagem = self.canvas_imagem.create_image(0, 0, anchor="nw")
+
+            # Reaproveita a PhotoImage quando o tamanho é o mesmo
+            if self.tk_image is not None and (self.tk_image.width(), self.tk_image.height()) == imagem.size:
+                self.tk_image.paste(imagem)
+            else:
+                self.tk_image = ImageTk.PhotoImage(imagem)
+                self.canvas_imagem.itemconfigure(self.item_imagem, image=self.tk_image)
 
             # Atualiza limites de scroll
-            self.frame_imagem.update_idletasks()
-            self.canvas_imagem.config(scrollregion=self.canvas_imagem.bbox("all"))
+            self.canvas_imagem.config(scrollregion=(0, 0, *imagem.size))
 
         except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao carregar grafo: {str(e)}")
+            messagebox.showerror("Erro", f"Erro ao exibir imagem: {str(e)}")
 
 
     def carregar_grafo(self):
         """
         Carrega o grafo a partir do arquivo e inicializa o banco de hemocentros.
         """
-        try:
-            self.grafo = Graph("../data/sao_carlos.graphml")
+        registro = self.registro
+
+        def trabalho(progresso):
+            progresso("Carregando grafo...")
+            grafo = registro.grafo(CIDADE_PADRAO)
             # Criar banco de hemocentros com 5 hemocentros aleatórios
-            hemocentros = self.grafo.get_random_nodes(5)
-            self.banco_hemocentros = BancoDeHemocentros(hemocentros, self.grafo.graph)
-            self.gdf_hcs = self.grafo.get_gdf_nodes(hemocentros)
-            plotar_com_zoom(gdf_user=None, gdf_hcs=self.gdf_hcs, gdf_edges=self.grafo.edges_gdf, name="mapa_com_hemocentros.png", app=True)
+            hemocentros = grafo.get_random_nodes(5)
+            banco_hemocentros = BancoDeHemocentros(hemocentros, grafo.graph)
+
+            # Pré-calcula, para cada tipo sanguíneo, o hemocentro válido mais próximo de todo nó
+            progresso("Pré-calculando distâncias até os hemocentros...")
+            campo_distancias = CampoDeDistancias(grafo.compilar(), banco_hemocentros)
+            campo_distancias.acompanhar(banco_hemocentros)
+
+            # Pré-processamento ALT (marcos e tabelas de distâncias) para o A* bidirecional
+            progresso("Pré-processando marcos do ALT...")
+            alt = PreprocessamentoALT(grafo.compilar())
+
+            # Rotas já calculadas, invalidadas pelas mudanças de validade do banco
+            cache_rotas = CacheDeRotas(banco_hemocentros)
+
+            # Índice espacial, para ajustar as coordenadas do usuário ao grafo
+            progresso("Indexando ruas...")
+            grafo.indice_espacial()
+
+            progresso("Desenhando mapa...")
+            gdf_hcs = grafo.get_gdf_nodes(hemocentros)
+            imagem = plotar_com_zoom(gdf_user=None, gdf_hcs=gdf_hcs, gdf_edges=None, camada=grafo.camada_base(), app=True)
+            return grafo, banco_hemocentros, campo_distancias, alt, cache_rotas, gdf_hcs, imagem
+
+        def concluir(resultado):
+            (self.grafo, self.banco_hemocentros, self.campo_distancias, self.alt,
+             self.cache_rotas, self.gdf_hcs, imagem) = resultado
 
             # Mostrando o grafo
-            self.mostrar_imagem("mapa_com_hemocentros.png")
+            self.mostrar_imagem(imagem)
             messagebox.showinfo("Sucesso", "Grafo carregado com sucesso!")
 
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao carregar grafo: {str(e)}")
+        self.executar_em_segundo_plano(trabalho, concluir, "Erro ao carregar grafo")
     
     def origem_usuario(self):
         """
-        Seleciona um nó aleatório do grafo como origem.
+        Lê a localização do usuário (latitude e longitude) e usa como origem
+        o nó do grafo mais próximo dela.
         """
         if self.grafo is None:
             messagebox.showerror("Erro", "Carregue o grafo primeiro!")
             return
-        
-        # self.origem = self.grafo.get_random_nodes(1)[0]
-        self.origem = 5156294301
-        self.origem_label.config(text=f"Origem: Nó {self.origem}")
 
+        # Sugere a localização do nó padrão ou, se ele não existir, o centro do grafo
+        csr = self.grafo.compilar()
+        if ORIGEM_PADRAO in csr.indice:
+            i = csr.indice[ORIGEM_PADRAO]
+            sugestao = (csr.y[i], csr.x[i])
+        else:
+            sugestao = (csr.y.mean(), csr.x.mean())
+
+        texto = simpledialog.askstring(
+            "Origem", "Sua localização (latitude, longitude):",
+            initialvalue=f"{sugestao[0]:.6f}, {sugestao[1]:.6f}", parent=self.root,
+        )
+        if texto is None:
+            return
         try:
-            self.gdf_user = self.grafo.get_gdf_nodes([self.origem])
-            plotar_com_zoom(gdf_user=self.gdf_user, gdf_hcs=self.gdf_hcs, gdf_edges=self.grafo.edges_gdf, map=False, name="mapa_hcs_usuario.png", app=True)
+            lat, lon = (float(valor) for valor in texto.replace(";", ",").split(","))
+        except ValueError:
+            messagebox.showerror("Erro", "Informe a latitude e a longitude separadas por vírgula!")
+            return
 
-            self.mostrar_imagem("mapa_hcs_usuario.png")
+        self.origem, distancia = self.grafo.indice_espacial().no_mais_proximo(lon, lat)
+        self.origem_label.config(text=f"Origem: Nó {self.origem} (a {distancia:.0f} m)")
+
+        grafo, origem, gdf_hcs = self.grafo, self.origem, self.gdf_hcs
+
+        def trabalho(progresso):
+            progresso("Desenhando localização do usuário...")
+            gdf_user = grafo.get_gdf_nodes([origem])
+            imagem = plotar_com_zoom(gdf_user=gdf_user, gdf_hcs=gdf_hcs, gdf_edges=None, camada=grafo.camada_base(), map=False, app=True)
+            return gdf_user, imagem
+
+        def concluir(resultado):
+            self.gdf_user, imagem = resultado
+            self.mostrar_imagem(imagem)
             messagebox.showinfo("Sucesso", "Localização do usuário adquirida!")
 
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao localizar o usuário: {str(e)}")
+        self.executar_em_segundo_plano(trabalho, concluir, "Erro ao localizar o usuário")
 
 
     # Escolhido o tipo sanguíneo, mostra somente os hemocentros válidos
@@ -223,16 +389,23 @@ class BloodDonationApp:
             messagebox.showerror("Erro", "Carregue o grafo primeiro!")
             return
     
-        if self.origem is None:
+        if self.origem is None or not hasattr(self, 'gdf_user'):
             messagebox.showerror("Erro", "Compartilhe sua localização primeiro!")
             return
         
-        hcs_validos = self.banco_hemocentros.hemocentros_validos(self.tipo_sanguineo.get())
-        self.gdf_hcs_validos = self.grafo.get_gdf_nodes(hcs_validos)
+        grafo, banco, gdf_user, tipo = self.grafo, self.banco_hemocentros, self.gdf_user, self.tipo_sanguineo.get()
 
-        try:
-            plotar_com_zoom(gdf_user=self.gdf_user, gdf_hcs=self.gdf_hcs_validos, gdf_edges=self.grafo.edges_gdf, map=False, valid=True, name="hemocentros_validos.png", app=True)
-            self.mostrar_imagem("hemocentros_validos.png")
+        def trabalho(progresso):
+            progresso("Filtrando hemocentros...")
+            hcs_validos = banco.hemocentros_validos(tipo)
+            gdf_hcs_validos = grafo.get_gdf_nodes(hcs_validos)
+            progresso("Desenhando hemocentros válidos...")
+            imagem = plotar_com_zoom(gdf_user=gdf_user, gdf_hcs=gdf_hcs_validos, gdf_edges=None, camada=grafo.camada_base(), map=False, valid=True, app=True)
+            return hcs_validos, gdf_hcs_validos, imagem
+
+        def concluir(resultado):
+            hcs_validos, self.gdf_hcs_validos, imagem = resultado
+            self.mostrar_imagem(imagem)
 
             if len(hcs_validos) < 5 and len(hcs_validos) > 1:
                 messagebox.showinfo("Sucesso", f"De 5 hemocentros, apenas {len(hcs_validos)} possuem doadores compatíveis.")
@@ -242,9 +415,8 @@ class BloodDonationApp:
                 messagebox.showinfo("Sucesso", f"Nenhum dos hemocentros possui doadores compatíveis.")
             else:
                 messagebox.showinfo("Sucesso", f"Todos os hemocentros possuem doadores compatíveis.")
-    
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao filtrar hemocentros: {str(e)}")
+
+        self.executar_em_segundo_plano(trabalho, concluir, "Erro ao filtrar hemocentros")
 
     def somar_distancia_rota(self, rota):
         """
@@ -259,14 +431,11 @@ class BloodDonationApp:
         distancia = 0
         for i in range(len(rota) - 1):
             u, v = rota[i], rota[i + 1]
-            
-            # Verifica se a aresta existe no grafo
-            if self.grafo.graph.has_edge(u, v):
-                edge_data = self.grafo.graph[u][v]  # Pega os dados da aresta
-                # Acessa o comprimento da aresta
-                length = edge_data[0].get('length', 0)  # Caso não tenha 'length', assume 0
-                distancia += length
-            else:
+
+            # Soma o comprimento da aresta percorrida pela busca (a mais curta entre as paralelas)
+            try:
+                distancia += self.grafo.aresta_minima(u, v)[1]
+            except KeyError:
                 print(f"Aresta entre {u} e {v} não encontrada no grafo.")
         return distancia
     
@@ -294,36 +463,79 @@ class BloodDonationApp:
             messagebox.showerror("Erro", "Não há hemocentros com estoque disponível para este tipo sanguíneo!")
             return
         
-        # Executar algoritmo selecionado
         algoritmo = self.algoritmo.get()
-        if algoritmo == "A*":
-            rota = a_estrela(self.grafo.graph, self.origem, hemocentros_validos)
-        elif algoritmo == "BFS":
-            rota = bfs(self.grafo.graph, self.origem, hemocentros_validos)
-        elif algoritmo == "Ideal":
-            distancias = {
-                destino: self.grafo.calcular_distancia(self.origem, destino)
-                for destino in hemocentros_validos
-            }
-            destino_mais_proximo = min(distancias.items(), key=lambda x: x[1])[0]
-            rota = self.grafo.calcular_rota(self.origem, destino_mais_proximo)
-        else:
+        if algoritmo not in ("A*", "A* Bidirecional", "BFS", "Ideal"):
             messagebox.showerror("Erro", "Algoritmo inválido!")
             return
-        
-        if rota is None:
-            messagebox.showerror("Erro", "Não foi possível encontrar uma rota!")
-            return
-        
-        # Atualizar informações
-        self.destino_label.config(text=f"Destino: Nó {rota[-1]}")
-        distancia = self.somar_distancia_rota(rota)
-        self.distancia_label.config(text=f"Distância: {distancia:.2f} metros")
-        self.nos_label.config(text=f"Nós percorridos: {len(rota)}")
-        
-        # Plotar rota
-        self.grafo.plotar_rota(rota, name="rota_app.png", app=True)
-        self.mostrar_imagem("rota_app.png")
+
+        grafo, origem, campo_distancias, alt = self.grafo, self.origem, self.campo_distancias, self.alt
+
+        # Rota já calculada para a mesma origem, tipo e algoritmo, com os mesmos hemocentros válidos
+        cache = self.cache_rotas
+        versao_validade = self.banco_hemocentros.versoes_validade[tipo]
+        guardada = cache.obter(grafo, origem, tipo, algoritmo)
+
+        def trabalho(progresso):
+            if guardada is not None:
+                rota, distancia, estatisticas = guardada.rota, guardada.distancia, None
+            else:
+                # Executar algoritmo selecionado
+                progresso(f"Buscando rota ({algoritmo})...")
+                estatisticas = EstatisticasBusca()
+                if algoritmo == "A*":
+                    rota = a_estrela(grafo.compilar(), origem, hemocentros_validos, estatisticas=estatisticas)
+                elif algoritmo == "A* Bidirecional":
+                    rota = a_estrela_bidirecional(
+                        grafo.compilar(), origem, hemocentros_validos,
+                        heuristica=alt.heuristica, estatisticas=estatisticas
+                    )
+                elif algoritmo == "BFS":
+                    rota = bfs(grafo.compilar(), origem, hemocentros_validos, estatisticas=estatisticas)
+                else:
+                    # A rota ótima já está pré-calculada no campo de distâncias do tipo,
+                    # montado junto com o grafo em carregar_grafo; não há busca a medir
+                    estatisticas = None
+                    resultado = campo_distancias.consultar(origem, tipo)
+                    rota = resultado[2] if resultado is not None else None
+
+                if rota is None:
+                    return None
+
+                distancia = self.somar_distancia_rota(rota)
+
+            # Plotar rota
+            progresso("Desenhando rota...")
+            imagem = grafo.plotar_rota(rota, app=True)
+            return rota, distancia, estatisticas, imagem
+
+        def concluir(resultado):
+            if resultado is None:
+                messagebox.showerror("Erro", "Não foi possível encontrar uma rota!")
+                return
+
+            # Atualizar informações
+            rota, distancia, estatisticas, imagem = resultado
+            self.destino_label.config(text=f"Destino: Nó {rota[-1]}")
+            self.distancia_label.config(text=f"Distância: {distancia:.2f} metros")
+            self.nos_label.config(text=f"Nós percorridos: {len(rota)}")
+            if guardada is not None:
+                self.expandidos_label.config(text="Nós expandidos: 0 (rota em cache)")
+            else:
+                # Guarda com a versão lida antes da busca: se o banco mudou no meio, a rota não é guardada
+                cache.guardar(grafo, origem, tipo, algoritmo, rota, distancia, versao_validade)
+                if estatisticas is None:
+                    # No modo Ideal, a rota é lida seguindo os ponteiros do campo de distâncias
+                    self.expandidos_label.config(
+                        text=f"Nós expandidos: nenhum ({len(rota) - 1} passos no campo pré-calculado)"
+                    )
+                else:
+                    self.expandidos_label.config(
+                        text=f"Nós expandidos: {estatisticas.expandidos} "
+                             f"(fronteira máx.: {estatisticas.fronteira_maxima}, {estatisticas.tempo_total() * 1000:.1f} ms)"
+                    )
+            self.mostrar_imagem(imagem)
+
+        self.executar_em_segundo_plano(trabalho, concluir, "Erro ao encontrar rota")
 
 if __name__ == "__main__":
     root = tk.Tk()
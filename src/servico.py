@@ -0,0 +1,421 @@
+"""
+Sistema de Doação de Sangue - Serviço HTTP de roteamento
+
+Este módulo expõe o roteamento entre doadores e hemocentros como um serviço
+HTTP/JSON local, para uso por outros sistemas sem a interface gráfica. O
+serviço roda em um único laço asyncio, que interpreta as requisições e
+mantém o banco de hemocentros; as buscas, que ocupam a CPU, são executadas
+em um pool de processos (ou de threads), cada um com o grafo carregado do
+snapshot.
+
+Rotas já calculadas são devolvidas por um CacheDeRotas, invalidado pelas
+mudanças de validade do banco. Pedidos idênticos em andamento (mesma
+origem, tipo sanguíneo, algoritmo e versão dos hemocentros válidos do tipo)
+são atendidos por um único cálculo.
+A quantidade de cálculos em andamento é limitada: acima do limite, o
+serviço responde 503 com Retry-After em vez de acumular uma fila sem fim.
+
+Uso (a partir de src/):
+
+    python3 servico.py --graphml ../data/sao_carlos.graphml --porta 8080
+
+Rotas:
+
+    GET  /rota?origem=<ID>&tipo=<tipo>[&algoritmo=A*]   (ou lat=..&lon=.. no lugar de origem)
+    POST /estoque     corpo JSON: [[hemocentro, tipo, variacao], ...]
+    GET  /metricas    contadores e histogramas de latência
+    GET  /saude       estado do serviço e caixa de coordenadas do grafo
+
+O gerador de carga em utils/gerador_carga.py testa o serviço localmente.
+"""
+
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+from utils.helper_functions import Graph, BancoDeHemocentros
+from utils.cache_rotas import CacheDeRotas, CAPACIDADE_PADRAO, TTL_PADRAO
+from utils.roteamento_lote import ALGORITMOS, inicializar_processo, rotear_no_processo
+
+# Limites superiores (em ms) das faixas dos histogramas de latência
+FAIXAS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# Cálculos distintos em andamento a partir dos quais novos pedidos são recusados
+LIMITE_FILA_PADRAO = 64
+
+# Tamanho máximo do corpo de uma requisição, em bytes
+CORPO_MAXIMO = 1 << 20
+
+
+class ErroHTTP(Exception):
+    """
+    Lançada ao atender uma requisição que deve ser respondida com um código de erro.
+    """
+
+    def __init__(self, status, mensagem, cabecalhos=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.cabecalhos = cabecalhos or {}
+
+
+class Histograma:
+    """
+    Histograma de latências com faixas fixas, em milissegundos.
+    """
+
+    def __init__(self, faixas=FAIXAS_MS):
+        self.faixas = faixas
+        self.contagens = [0] * (len(faixas) + 1)
+        self.total = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, ms):
+        self.contagens[bisect.bisect_left(self.faixas, ms)] += 1
+        self.total += 1
+        self.soma += ms
+        self.maximo = max(self.maximo, ms)
+
+    def percentil(self, p):
+        """
+        Retorna o limite superior da faixa que contém o percentil p (de 0 a 100),
+        ou o máximo observado se ele cair na última faixa. None se não houver amostras.
+        """
+        if not self.total:
+            return None
+        posicao = p / 100 * self.total
+        acumulado = 0
+        for faixa, contagem in zip(self.faixas, self.contagens):
+            acumulado += contagem
+            if acumulado >= posicao:
+                return min(faixa, self.maximo)
+        return self.maximo
+
+    def como_dict(self):
+        return {
+            "total": self.total,
+            "media_ms": self.soma / self.total if self.total else None,
+            "p50_ms": self.percentil(50),
+            "p90_ms": self.percentil(90),
+            "p99_ms": self.percentil(99),
+            "maximo_ms": self.maximo,
+            "faixas_ms": {str(faixa): contagem for faixa, contagem in zip(self.faixas, self.contagens)} | {
+                "inf": self.contagens[-1]
+            },
+        }
+
+
+class ServicoDeRotas:
+    """
+    Serviço HTTP/JSON de rotas até o hemocentro mais próximo.
+
+    Attributes:
+        pendentes: Cálculos em andamento, por (origem, tipo, algoritmo, versão dos válidos do tipo)
+        histogramas: Latência de cada rota HTTP e dos cálculos no executor
+        cache: CacheDeRotas consultado antes de calcular, ou None
+        contadores: Pedidos recebidos, coalescidos, recusados por sobrecarga e com erro
+    """
+
+    def __init__(self, grafo, banco, executor, limite_fila=LIMITE_FILA_PADRAO, cache=None):
+        """
+        Args:
+            grafo: Graph da cidade (usado no laço para ajustar coordenadas e validar origens)
+            banco: BancoDeHemocentros com os estoques, alterado só pelo laço
+            executor: Executor onde as buscas rodam, inicializado com inicializar_processo
+            limite_fila: Máximo de cálculos distintos em andamento (opcional)
+            cache: CacheDeRotas do banco, ou None para sempre calcular (opcional)
+        """
+        self.grafo = grafo
+        self.csr = grafo.compilar()
+        self.banco = banco
+        self.executor = executor
+        self.limite_fila = limite_fila
+        self.cache = cache
+
+        self.pendentes = {}
+        self.histogramas = {}
+        self.contadores = {"pedidos": 0, "calculos": 0, "coalescidos": 0, "recusados": 0, "erros": 0}
+        self.inicio = time.time()
+
+        self.rotas = {
+            ("GET", "/rota"): self.__rota,
+            ("POST", "/estoque"): self.__estoque,
+            ("GET", "/metricas"): self.__metricas,
+            ("GET", "/saude"): self.__saude,
+        }
+
+    async def rotear(self, origem, tipo, algoritmo="A*"):
+        """
+        Calcula a rota de uma origem até o hemocentro válido mais próximo.
+
+        Uma rota no cache é devolvida sem calcular; se um cálculo idêntico já
+        estiver em andamento, aguarda o resultado dele.
+
+        Args:
+            origem: ID do nó de origem
+            tipo: Tipo sanguíneo do receptor
+            algoritmo: Um de ALGORITMOS (opcional)
+
+        Returns:
+            dict: origem, tipo, algoritmo, destino, distancia (metros), rota, versao_validade
+                  e em_cache; destino e rota são None quando não há rota
+
+        Raises:
+            ErroHTTP: 503 se o limite de cálculos em andamento foi atingido
+        """
+        chave = (origem, tipo, algoritmo, self.banco.versoes_validade[tipo])
+        if self.cache is not None:
+            guardada = self.cache.obter(self.grafo, origem, tipo, algoritmo)
+            if guardada is not None:
+                return self.__resposta(chave, guardada.rota, guardada.distancia, em_cache=True)
+
+        tarefa = self.pendentes.get(chave)
+        if tarefa is not None:
+            self.contadores["coalescidos"] += 1
+        else:
+            if len(self.pendentes) >= self.limite_fila:
+                self.contadores["recusados"] += 1
+                raise ErroHTTP(HTTPStatus.SERVICE_UNAVAILABLE, "Serviço sobrecarregado.", {"Retry-After": "1"})
+            tarefa = asyncio.ensure_future(self.__calcular(chave, self.banco.hemocentros_validos(tipo)))
+            self.pendentes[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self.pendentes.pop(chave, None))
+
+        # shield: um cliente que desconecta não cancela o cálculo dos demais
+        return await asyncio.shield(tarefa)
+
+    async def atender(self, leitor, escritor):
+        """
+        Atende uma conexão, com várias requisições em sequência (keep-alive).
+        """
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha.strip():
+                    break
+                try:
+                    metodo, alvo, versao = linha.decode("latin-1").split()
+                except ValueError:
+                    await self.__responder(escritor, HTTPStatus.BAD_REQUEST, {"erro": "Requisição inválida."}, {})
+                    break
+
+                cabecalhos = {}
+                while True:
+                    linha = await leitor.readline()
+                    if linha in (b"\r\n", b"\n", b""):
+                        break
+                    nome, _, valor = linha.decode("latin-1").partition(":")
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+
+                try:
+                    tamanho = int(cabecalhos.get("content-length") or 0)
+                except ValueError:
+                    tamanho = -1
+                if tamanho < 0:
+                    await self.__responder(escritor, HTTPStatus.BAD_REQUEST, {"erro": "Content-Length inválido."}, {})
+                    break
+                if tamanho > CORPO_MAXIMO:
+                    await self.__responder(escritor, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"erro": "Corpo grande demais."}, {})
+                    break
+                corpo = await leitor.readexactly(tamanho) if tamanho else b""
+
+                status, resposta, extras = await self.despachar(metodo, alvo, corpo)
+                manter = versao == "HTTP/1.1" and cabecalhos.get("connection", "").lower() != "close"
+                await self.__responder(escritor, status, resposta, extras, manter)
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+    async def despachar(self, metodo, alvo, corpo=b""):
+        """
+        Encaminha uma requisição à rota correspondente e mede a sua latência.
+
+        Returns:
+            tuple: (status HTTP, resposta JSON, cabeçalhos extras)
+        """
+        inicio = time.perf_counter()
+        url = urlsplit(alvo)
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(url.query).items()}
+        funcao = self.rotas.get((metodo, url.path))
+        self.contadores["pedidos"] += 1
+
+        try:
+            if funcao is None:
+                raise ErroHTTP(HTTPStatus.NOT_FOUND, f"Rota desconhecida: {metodo} {url.path}")
+            status, resposta, extras = HTTPStatus.OK, await funcao(parametros, corpo), {}
+        except ErroHTTP as erro:
+            status, resposta, extras = erro.status, {"erro": str(erro)}, erro.cabecalhos
+        except Exception as erro:
+            status, resposta, extras = HTTPStatus.INTERNAL_SERVER_ERROR, {"erro": repr(erro)}, {}
+        if status >= 400 and status != HTTPStatus.SERVICE_UNAVAILABLE:
+            self.contadores["erros"] += 1
+
+        nome = url.path if funcao is not None else "desconhecida"
+        self.__histograma(nome).registrar((time.perf_counter() - inicio) * 1000)
+        return status, resposta, extras
+
+    def metricas(self):
+        return {
+            "tempo_ativo": time.time() - self.inicio,
+            "em_andamento": len(self.pendentes),
+            "limite_fila": self.limite_fila,
+            **self.contadores,
+            "versao_estoque": self.banco.versao,
+            "cache": self.cache.metricas() if self.cache is not None else None,
+            "latencias": {nome: histograma.como_dict() for nome, histograma in self.histogramas.items()},
+        }
+
+    def __histograma(self, nome):
+        if nome not in self.histogramas:
+            self.histogramas[nome] = Histograma()
+        return self.histogramas[nome]
+
+    async def __calcular(self, chave, destinos):
+        # Roda a busca no executor; os destinos válidos são lidos no laço, que é o dono do banco
+        origem, tipo, algoritmo, versao = chave
+        self.contadores["calculos"] += 1
+        inicio = time.perf_counter()
+        laco = asyncio.get_running_loop()
+        rota, distancia = await laco.run_in_executor(self.executor, rotear_no_processo, origem, destinos, algoritmo)
+        self.__histograma("calculo").registrar((time.perf_counter() - inicio) * 1000)
+
+        # Com a versão lida antes do cálculo: se os válidos mudaram no meio, a rota não é guardada
+        if self.cache is not None and rota is not None:
+            self.cache.guardar(self.grafo, origem, tipo, algoritmo, rota, distancia, versao)
+        return self.__resposta(chave, rota, distancia)
+
+    def __resposta(self, chave, rota, distancia, em_cache=False):
+        origem, tipo, algoritmo, versao = chave
+        return {
+            "origem": origem,
+            "tipo": tipo,
+            "algoritmo": algoritmo,
+            "destino": rota[-1] if rota else None,
+            "distancia": distancia,
+            "rota": rota,
+            "versao_validade": versao,
+            "em_cache": em_cache,
+        }
+
+    async def __rota(self, parametros, corpo):
+        tipo = parametros.get("tipo")
+        if tipo not in self.banco.TIPOS_SANGUINEOS:
+            raise ErroHTTP(HTTPStatus.BAD_REQUEST, f"Tipo sanguíneo inválido: {tipo}")
+        algoritmo = parametros.get("algoritmo", "A*")
+        if algoritmo not in ALGORITMOS:
+            raise ErroHTTP(HTTPStatus.BAD_REQUEST, f"Algoritmo inválido: {algoritmo}")
+
+        ajuste = None
+        try:
+            if "origem" in parametros:
+                origem = int(parametros["origem"])
+            else:
+                lat, lon = float(parametros["lat"]), float(parametros["lon"])
+                origem, ajuste = self.grafo.indice_espacial().no_mais_proximo(lon, lat)
+        except (KeyError, ValueError):
+            raise ErroHTTP(HTTPStatus.BAD_REQUEST, "Informe origem=<ID> ou lat=..&lon=..")
+        if origem not in self.csr.indice:
+            raise ErroHTTP(HTTPStatus.NOT_FOUND, f"Nó de origem não encontrado: {origem}")
+
+        resultado = await self.rotear(origem, tipo, algoritmo)
+        if ajuste is not None:
+            resultado = {**resultado, "ajuste": ajuste}
+        return resultado
+
+    async def __estoque(self, parametros, corpo):
+        try:
+            mudancas = [(int(h_id), tipo, int(variacao)) for h_id, tipo, variacao in json.loads(corpo or b"[]")]
+        except (ValueError, TypeError):
+            raise ErroHTTP(HTTPStatus.BAD_REQUEST, "O corpo deve ser uma lista JSON de [hemocentro, tipo, variacao].")
+        try:
+            eventos = self.banco.aplicar_lote(mudancas)
+        except ValueError as erro:
+            raise ErroHTTP(HTTPStatus.BAD_REQUEST, str(erro))
+        return {
+            "versao": self.banco.versao,
+            "mudancas": [evento._asdict() for evento in eventos],
+        }
+
+    async def __metricas(self, parametros, corpo):
+        return self.metricas()
+
+    async def __saude(self, parametros, corpo):
+        return {
+            "estado": "ok",
+            "nos": len(self.csr),
+            "caixa": [float(self.csr.x.min()), float(self.csr.y.min()), float(self.csr.x.max()), float(self.csr.y.max())],
+            "hemocentros": self.banco.ids.tolist(),
+            "versao_grafo": self.grafo.versao,
+            "versao_estoque": self.banco.versao,
+        }
+
+    async def __responder(self, escritor, status, resposta, extras, manter=False):
+        dados = json.dumps(resposta, ensure_ascii=False).encode()
+        cabecalhos = {
+            "Content-Type": "application/json; charset=utf-8",
+            "Content-Length": str(len(dados)),
+            "Connection": "keep-alive" if manter else "close",
+            **extras,
+        }
+        status = HTTPStatus(status)
+        cabecalho = f"HTTP/1.1 {status.value} {status.phrase}\r\n" + "".join(
+            f"{nome}: {valor}\r\n" for nome, valor in cabecalhos.items()
+        )
+        escritor.write(cabecalho.encode("latin-1") + b"\r\n" + dados)
+        await escritor.drain()
+
+
+async def servir(args):
+    grafo = Graph(args.graphml)
+    banco = BancoDeHemocentros(grafo.get_random_nodes(args.hemocentros), grafo.compilar())
+
+    # Monta o índice espacial antes de aceitar conexões, para não travar o laço no primeiro pedido
+    grafo.indice_espacial()
+
+    if args.processos == 0:
+        executor = ThreadPoolExecutor(1, initializer=inicializar_processo, initargs=(args.graphml,))
+    else:
+        executor = ProcessPoolExecutor(
+            args.processos or os.cpu_count(), initializer=inicializar_processo, initargs=(args.graphml,)
+        )
+
+    cache = CacheDeRotas(banco, capacidade=args.cache, ttl=args.ttl) if args.cache > 0 else None
+    servico = ServicoDeRotas(grafo, banco, executor, limite_fila=args.limite_fila, cache=cache)
+    servidor = await asyncio.start_server(servico.atender, args.host, args.porta)
+    print(f"Servindo em http://{args.host}:{args.porta} ({len(servico.csr)} nós, hemocentros {banco.ids.tolist()})")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço HTTP/JSON de rotas até o hemocentro mais próximo.")
+    parser.add_argument("--graphml", default="../data/sao_carlos.graphml")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8080)
+    parser.add_argument("--hemocentros", type=int, default=5, help="quantidade de hemocentros aleatórios")
+    parser.add_argument("--processos", type=int, default=None, help="processos do pool; 0 usa uma thread")
+    parser.add_argument("--limite-fila", type=int, default=LIMITE_FILA_PADRAO,
+                        help="cálculos distintos em andamento antes de responder 503")
+    parser.add_argument("--cache", type=int, default=CAPACIDADE_PADRAO, help="rotas guardadas; 0 desliga o cache")
+    parser.add_argument("--ttl", type=float, default=TTL_PADRAO, help="validade das rotas guardadas, em segundos")
+    parser.add_argument("--semente", type=int, default=None, help="semente dos hemocentros e estoques aleatórios")
+    args = parser.parse_args()
+
+    if args.semente is not None:
+        random.seed(args.semente)
+    try:
+        asyncio.run(servir(args))
+    except KeyboardInterrupt:
+        pass
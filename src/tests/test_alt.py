@@ -0,0 +1,84 @@
+"""
+Testes da heurística ALT e do A* bidirecional: admissibilidade dos limites
+dos marcos e otimalidade da regra de parada em um grafo com ruas de mão
+única.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from algorithms import dijkstra
+from algorithms.alt import PreprocessamentoALT
+from algorithms.busca_informada import a_estrela, a_estrela_bidirecional
+from utils.grafos_sinteticos import geometrico_aleatorio, para_networkx
+
+
+@pytest.fixture(scope="module")
+def cenario():
+    csr = geometrico_aleatorio(400, semente=3, mao_unica=0.3)
+    return csr, para_networkx(csr), PreprocessamentoALT(csr, semente=0)
+
+
+def _consultas(csr, quantidade, destinos, semente):
+    # Pares (origem, destinos) sorteados, em IDs originais
+    sorteio = random.Random(semente)
+    ids = csr.ids.tolist()
+    return [(sorteio.choice(ids), sorteio.sample(ids, destinos)) for _ in range(quantidade)]
+
+
+def test_limites_alt_nunca_passam_da_distancia_real(cenario):
+    csr, _, alt = cenario
+    reverso = csr.transposto()
+    sorteio = random.Random(0)
+    for _ in range(10):
+        destinos = sorteio.sample(range(len(csr)), 3)
+
+        # Distância real de cada nó até o destino mais próximo (e da origem mais próxima, no transposto)
+        ate_destinos = dijkstra.distancias(reverso, destinos)
+        desde_destinos = dijkstra.distancias(csr, destinos)
+
+        h = alt.heuristica(csr, destinos)
+        h_reverso = alt.heuristica(reverso, destinos)
+        nos = list(range(len(csr)))
+        assert np.all(np.array(h.varios(nos)) <= ate_destinos + 1e-6)
+        assert np.all(np.array(h_reverso.varios(nos)) <= desde_destinos + 1e-6)
+
+
+def test_bidirecional_igual_ao_dijkstra(cenario):
+    csr, grafo_nx, alt = cenario
+    for origem, destinos in _consultas(csr, 30, 1, 1):
+        try:
+            esperado = nx.dijkstra_path_length(grafo_nx, origem, destinos[0], weight="length")
+        except nx.NetworkXNoPath:
+            with pytest.raises(ValueError):
+                a_estrela_bidirecional(csr, origem, destinos, heuristica=alt.heuristica)
+            continue
+        distancia, destino = a_estrela_bidirecional(csr, origem, destinos, apenas_distancia=True, heuristica=alt.heuristica)
+        assert destino == destinos[0]
+        assert distancia == pytest.approx(esperado)
+
+        # Com a heurística Haversine padrão, o mesmo resultado
+        assert a_estrela_bidirecional(csr, origem, destinos, apenas_distancia=True)[0] == pytest.approx(esperado)
+
+
+def test_bidirecional_igual_ao_a_estrela_com_varios_destinos(cenario):
+    csr, grafo_nx, alt = cenario
+    for origem, destinos in _consultas(csr, 30, 6, 2):
+        try:
+            distancia, _ = a_estrela(csr, origem, destinos, apenas_distancia=True)
+        except ValueError:
+            continue
+        bidirecional, destino = a_estrela_bidirecional(csr, origem, destinos, apenas_distancia=True, heuristica=alt.heuristica)
+        assert bidirecional == pytest.approx(distancia)
+        assert destino in destinos
+
+        caminho = a_estrela_bidirecional(csr, origem, destinos, heuristica=alt.heuristica)
+        assert caminho[0] == origem and caminho[-1] in destinos
+        assert nx.path_weight(nx.DiGraph(grafo_nx), caminho, weight="length") == pytest.approx(distancia)
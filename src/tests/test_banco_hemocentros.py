@@ -0,0 +1,180 @@
+"""
+Testes do BancoDeHemocentros: a tabela de compatibilidade contra a regra
+ABO/Rh, as operações de estoque (reservar, liberar, consumir, repor) e os
+eventos de mudança de validade com as versões de cada tipo.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from utils.helper_functions import (
+    BancoDeHemocentros,
+    COMPATIBILIDADE,
+    MASCARAS_DOADORES,
+    MudancaValidade,
+    TIPOS_SANGUINEOS,
+)
+from utils.grafos_sinteticos import grade, para_networkx
+
+HEMOCENTROS = [10, 20, 30]
+
+
+def antigenos(tipo):
+    # A e B no sistema ABO, D no Rh
+    return set(tipo[:-1].replace("O", "")) | ({"D"} if tipo[-1] == "+" else set())
+
+
+def pode_doar(doador, receptor):
+    # O receptor precisa ter todos os antígenos do doador
+    return antigenos(doador) <= antigenos(receptor)
+
+
+@pytest.fixture
+def banco():
+    grafo = nx.MultiDiGraph()
+    for i, h_id in enumerate(HEMOCENTROS):
+        grafo.add_node(h_id, x=-47.0 + i * 0.01, y=-22.0)
+    banco = BancoDeHemocentros(HEMOCENTROS, grafo)
+
+    # Zera o estoque sorteado, pelo próprio banco, para partir de um estado conhecido
+    banco.aplicar_lote(
+        (h_id, tipo, -quantidade)
+        for h_id in HEMOCENTROS
+        for tipo, quantidade in banco.consultar_estoque(h_id).items()
+        if quantidade
+    )
+    return banco
+
+
+@pytest.mark.parametrize("receptor", TIPOS_SANGUINEOS)
+def test_compatibilidade_segue_regra_abo_rh(receptor):
+    esperados = {doador for doador in TIPOS_SANGUINEOS if pode_doar(doador, receptor)}
+    assert set(COMPATIBILIDADE[receptor]) == esperados
+
+    mascara = sum(1 << i for i, doador in enumerate(TIPOS_SANGUINEOS) if doador in esperados)
+    assert MASCARAS_DOADORES[receptor] == mascara
+
+
+@pytest.mark.parametrize("doador", TIPOS_SANGUINEOS)
+def test_validos_seguem_os_doadores(banco, doador):
+    banco.repor(20, doador, 1)
+    for receptor in TIPOS_SANGUINEOS:
+        assert banco.hemocentros_validos(receptor) == ([20] if pode_doar(doador, receptor) else [])
+
+
+def test_mascara_validos_somente_leitura(banco):
+    banco.repor(10, "O-", 3)
+    mascara = banco.mascara_validos("AB+")
+    assert mascara.tolist() == [True, False, False]
+    with pytest.raises(ValueError):
+        mascara[1] = True
+    assert banco.hemocentros_validos("AB+") == [10]
+
+
+def test_mascara_validos_com_minimo(banco):
+    banco.repor(10, "O-", 2)
+    banco.repor(10, "A-", 1)
+    banco.repor(20, "A-", 2)
+    assert banco.mascara_validos("A-", minimo=3).tolist() == [True, False, False]
+    assert banco.hemocentros_validos("AB-", minimo=2) == [10, 20]
+    assert banco.unidades_compativeis("A+").tolist() == [3, 2, 0]
+
+
+def test_reservar_liberar_consumir_repor(banco):
+    banco.repor(10, "B+", 5)
+    assert banco.consultar_estoque(10)["B+"] == 5
+
+    banco.reservar(10, "B+", 3)
+    assert banco.consultar_estoque(10)["B+"] == 2
+    assert banco.reservado[0, TIPOS_SANGUINEOS.index("B+")] == 3
+
+    banco.liberar(10, "B+", 1)
+    assert banco.consultar_estoque(10)["B+"] == 3
+    assert banco.reservado[0, TIPOS_SANGUINEOS.index("B+")] == 2
+
+    banco.consumir(10, "B+", 2, reservado=True)
+    assert banco.consultar_estoque(10)["B+"] == 3
+    assert banco.reservado[0, TIPOS_SANGUINEOS.index("B+")] == 0
+
+    banco.consumir(10, "B+", 3)
+    assert banco.consultar_estoque(10)["B+"] == 0
+    assert banco.hemocentros_validos("B+") == []
+
+
+def test_operacao_invalida_nao_altera_estoque(banco):
+    banco.repor(30, "O+", 2)
+    versao = banco.versao
+    estoque = banco.estoque.copy()
+
+    with pytest.raises(ValueError):
+        banco.consumir(30, "O+", 3)
+    with pytest.raises(ValueError):
+        banco.liberar(30, "O+", 1)
+    with pytest.raises(ValueError):
+        banco.repor(30, "O+", 0)
+    with pytest.raises(ValueError):
+        banco.repor(99, "O+", 1)
+    with pytest.raises(ValueError):
+        banco.aplicar_lote([(30, "O+", -1), (30, "O+", -2)])
+
+    assert banco.versao == versao
+    assert np.array_equal(banco.estoque, estoque)
+
+
+def test_sem_evento_quando_validade_nao_muda(banco):
+    banco.repor(10, "A+", 4)
+    recebidos = []
+    banco.inscrever(recebidos.append)
+    versoes = dict(banco.versoes_validade)
+
+    assert banco.consumir(10, "A+", 1) == []
+    assert banco.repor(10, "A+", 5) == []
+    assert recebidos == []
+    assert banco.versoes_validade == versoes
+
+
+def test_lote_emite_cada_mudanca_uma_vez(banco):
+    recebidos = []
+    banco.inscrever(recebidos.append)
+
+    eventos = banco.aplicar_lote([(10, "AB-", 1), (10, "AB-", 2), (20, "AB-", 1), (20, "AB-", -1)])
+
+    assert recebidos == [eventos]
+    assert sorted(eventos) == sorted([MudancaValidade(10, "AB-", True), MudancaValidade(10, "AB+", True)])
+
+    banco.cancelar_inscricao(recebidos.append)
+    banco.consumir(10, "AB-", 3)
+    assert len(recebidos) == 1
+
+
+def test_versoes_validade_so_do_tipo_afetado(banco):
+    # AB+ recebe de todos os tipos, mas só AB+ doa para AB+
+    versoes = dict(banco.versoes_validade)
+    eventos = banco.repor(30, "AB+", 2)
+    assert eventos == [MudancaValidade(30, "AB+", True)]
+    assert banco.versoes_validade == {**versoes, "AB+": versoes["AB+"] + 1}
+
+    # O- é doador universal: todos os tipos mudam, cada um uma única vez
+    versoes = dict(banco.versoes_validade)
+    banco.repor(20, "O-", 1)
+    assert banco.versoes_validade == {tipo: versao + 1 for tipo, versao in versoes.items()}
+
+    # No hemocentro 30, que já era válido para AB+, só os demais tipos mudam
+    versoes = dict(banco.versoes_validade)
+    banco.repor(30, "O-", 1)
+    assert banco.versoes_validade == {
+        tipo: versao + (tipo != "AB+") for tipo, versao in versoes.items()
+    }
+
+
+def test_coordenadas_do_grafo_compilado():
+    csr = grade(100, semente=4)
+    hemocentros = csr.nos([3, 50, 97])
+    pelo_csr = BancoDeHemocentros(hemocentros, csr)
+    pelo_networkx = BancoDeHemocentros(hemocentros, para_networkx(csr))
+    assert np.array_equal(pelo_csr.coords, pelo_networkx.coords)
@@ -0,0 +1,108 @@
+"""
+Testes do cache de rotas: prazo de validade (TTL), descarte do menos usado
+(LRU) e invalidação por tipo sanguíneo pelas mudanças de validade do banco.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import pytest
+
+from utils.cache_rotas import CacheDeRotas
+from utils.grafos_sinteticos import grade, para_networkx
+from utils.helper_functions import BancoDeHemocentros, Graph, TIPOS_SANGUINEOS
+
+
+class Relogio:
+
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def grafo():
+    return Graph.de_networkx(para_networkx(grade(25, semente=0)))
+
+
+@pytest.fixture
+def banco(grafo):
+    csr = grafo.compilar()
+    banco = BancoDeHemocentros(csr.nos([0, 12, 24]), csr)
+    banco.aplicar_lote(
+        (h_id, tipo, -quantidade)
+        for h_id in banco.ids.tolist()
+        for tipo, quantidade in banco.consultar_estoque(h_id).items()
+        if quantidade
+    )
+    return banco
+
+
+def test_ttl(grafo, banco):
+    relogio = Relogio()
+    cache = CacheDeRotas(banco, ttl=10, relogio=relogio)
+    cache.guardar(grafo, 1, "A+", "A*", [1, 2], 100.0)
+
+    relogio.agora = 10
+    assert cache.obter(grafo, 1, "A+", "A*").distancia == 100.0
+    relogio.agora = 10.5
+    assert cache.obter(grafo, 1, "A+", "A*") is None
+    assert (cache.acertos, cache.falhas, cache.expiradas) == (1, 1, 1)
+    assert len(cache.entradas) == 0 and cache.memoria_bytes == 0
+
+
+def test_lru(grafo, banco):
+    cache = CacheDeRotas(banco, capacidade=2, ttl=None)
+    cache.guardar(grafo, 1, "A+", "A*", [1, 2], 1.0)
+    cache.guardar(grafo, 2, "A+", "A*", [2, 3], 2.0)
+
+    # A origem 1 passa a ser a usada mais recentemente; a 2 é descartada
+    assert cache.obter(grafo, 1, "A+", "A*") is not None
+    cache.guardar(grafo, 3, "A+", "A*", [3, 4], 3.0)
+    assert cache.obter(grafo, 2, "A+", "A*") is None
+    assert cache.obter(grafo, 1, "A+", "A*") is not None
+    assert cache.obter(grafo, 3, "A+", "A*") is not None
+    assert cache.despejos == 1
+    assert cache.por_tipo["A+"] == set(cache.entradas)
+
+
+def test_invalidacao_so_do_tipo_afetado(grafo, banco):
+    h0, h1, h2 = banco.ids.tolist()
+    for h_id in (h0, h1):
+        for tipo in ("AB+", "B-", "A+"):
+            banco.repor(h_id, tipo, 1)
+    cache = CacheDeRotas(banco, ttl=None)
+    for origem, destino in ((1, h0), (2, h1)):
+        for tipo in ("AB+", "B-", "A+"):
+            cache.guardar(grafo, origem, tipo, "A*", [origem, destino], 1.0)
+
+    # Um hemocentro novo para AB+ pode estar mais perto de qualquer origem: só AB+ é descartado
+    banco.repor(h2, "AB+", 1)
+    assert cache.obter(grafo, 1, "AB+", "A*") is None
+    assert cache.obter(grafo, 2, "AB+", "A*") is None
+    assert cache.invalidadas == 2
+    for tipo in ("B-", "A+"):
+        assert cache.obter(grafo, 1, tipo, "A*") is not None
+        assert cache.obter(grafo, 2, tipo, "A*") is not None
+
+    # h0 deixa de ser válido para B- (para AB+ continua, com as outras bolsas): só a rota de B- até
+    # h0 sai; a de B- até h1 continua ótima, e A+ nem é afetado
+    cache.guardar(grafo, 1, "AB+", "A*", [1, h0], 1.0)
+    cache.guardar(grafo, 2, "AB+", "A*", [2, h1], 1.0)
+    banco.consumir(h0, "B-", 1)
+    assert cache.obter(grafo, 1, "B-", "A*") is None
+    assert cache.obter(grafo, 2, "B-", "A*") is not None
+    assert cache.obter(grafo, 1, "AB+", "A*") is not None
+    assert cache.obter(grafo, 2, "AB+", "A*") is not None
+    assert cache.obter(grafo, 1, "A+", "A*") is not None
+    assert cache.invalidadas == 3
+
+    # Sem inscrição, o cache não recebe mais as mudanças, mas a versão ainda protege as rotas
+    cache.fechar()
+    banco.repor(h2, "B-", 1)
+    assert cache.invalidadas == 3
+    assert cache.obter(grafo, 2, "B-", "A*") is None
+    assert set(cache.por_tipo) == set(TIPOS_SANGUINEOS)
@@ -0,0 +1,48 @@
+"""
+Testes do cache de tiles: escolha automática do zoom igual à do contextily.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import io
+import math
+
+import pytest
+from PIL import Image
+
+from utils.cache_tiles import CacheDeTiles, zoom_automatico
+
+
+def zoom_contextily(w, s, e, n):
+    # contextily.tile._calculate_zoom
+    return int(max(math.ceil(math.log2(360 * 2.0 / (e - w))), math.ceil(math.log2(360 * 2.0 / (n - s)))))
+
+
+@pytest.mark.parametrize("caixa", [
+    (-47.95, -22.07, -47.85, -21.99),
+    (-47.95, -22.10, -47.94, -21.90),
+    (-48.5, -22.5, -47.0, -21.9),
+    (-180.0, -85.0, 180.0, 85.0),
+])
+def test_zoom_automatico_como_contextily(caixa):
+    w, s, e, n = caixa
+    assert zoom_automatico(w, e, s, n) == zoom_contextily(w, s, e, n)
+
+
+def test_mosaico_usa_o_zoom_automatico(tmp_path):
+    pedidos = []
+
+    def fonte(z, x, y):
+        pedidos.append(z)
+        imagem = io.BytesIO()
+        Image.new("RGB", (256, 256), (255, 255, 255)).save(imagem, format="PNG")
+        return imagem.getvalue()
+
+    cache = CacheDeTiles(str(tmp_path), fonte=fonte)
+    imagem = cache.mosaico(-47.95, -47.85, -22.07, -21.99)
+
+    # A altura (0,08°) pede mais zoom do que a largura (0,1°)
+    assert set(pedidos) == {zoom_contextily(-47.95, -22.07, -47.85, -21.99)} == {14}
+    assert imagem.ndim == 3 and imagem.shape[2] == 3
@@ -0,0 +1,61 @@
+"""
+Testes da camada base: ladrilhos em disco com limite de tamanho, descartando
+os usados há mais tempo.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import os
+
+from utils.camada_base import CamadaBase
+from utils.grafos_sinteticos import grade, para_networkx
+from utils.helper_functions import Graph
+
+ESTILO = {"color": "black", "linewidth": 0.5}
+
+
+def _pngs(diretorio):
+    return sorted(
+        os.path.relpath(os.path.join(raiz, nome), diretorio)
+        for raiz, _, nomes in os.walk(diretorio)
+        for nome in nomes
+        if nome.endswith(".png")
+    )
+
+
+def test_ladrilhos_em_disco_respeitam_o_limite(tmp_path):
+    grafo = Graph.de_networkx(para_networkx(grade(100, semente=0)))
+
+    # Ladrilhos longe do grafo são vazios e têm o mesmo tamanho
+    camada = CamadaBase(grafo, str(tmp_path), limite_memoria=0)
+    camada.ladrilho(ESTILO, 14, 0, 0)
+    tamanho = camada.disco.total_bytes
+
+    camada = CamadaBase(grafo, str(tmp_path), limite_memoria=0, limite_disco=3 * tamanho)
+    for i in range(1, 6):
+        camada.ladrilho(ESTILO, 14, i, 0)
+    assert camada.disco.total_bytes <= 3 * tamanho
+    assert [os.path.basename(os.path.dirname(png)) for png in _pngs(tmp_path)] == ["3", "4", "5"]
+
+    # Os restantes são lidos do disco por uma nova camada, sem redesenhar
+    camada = CamadaBase(grafo, str(tmp_path), limite_memoria=0, limite_disco=3 * tamanho)
+    camada.ladrilho(ESTILO, 14, 5, 0)
+    camada.ladrilho(ESTILO, 14, 1, 0)
+    assert (camada.acertos, camada.falhas) == (1, 1)
+
+
+def test_ladrilho_do_disco_igual_ao_desenhado(tmp_path):
+    grafo = Graph.de_networkx(para_networkx(grade(100, semente=0)))
+    csr = grafo.compilar()
+    z = 14
+    lado = 360 / 2**z
+    i, j = int(csr.x.mean() // lado), int(csr.y.mean() // lado)
+
+    desenhado = CamadaBase(grafo, str(tmp_path)).ladrilho(ESTILO, z, i, j)
+    camada = CamadaBase(grafo, str(tmp_path))
+    lido = camada.ladrilho(ESTILO, z, i, j)
+    assert camada.acertos == 1
+    assert (lido == desenhado).all()
+    assert desenhado[..., 3].any()
@@ -0,0 +1,86 @@
+"""
+Testes do CampoDeDistancias: sequências de hemocentros que passam a ser (ou
+deixam de ser) válidos, comparadas com o campo refeito do zero por um
+Dijkstra de múltiplas fontes.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from algorithms import dijkstra
+from algorithms.campo_distancias import CampoDeDistancias
+from utils.grafo_csr import GrafoCSR
+from utils.grafos_sinteticos import grade, para_networkx
+from utils.helper_functions import BancoDeHemocentros, MudancaValidade, TIPOS_SANGUINEOS
+
+
+def _banco_vazio(grafo, hemocentros):
+    # Banco sem nenhuma bolsa: os hemocentros válidos vêm só dos eventos de cada teste
+    banco = BancoDeHemocentros(grafo.nos(hemocentros), para_networkx(grafo))
+    banco.aplicar_lote(
+        (h_id, tipo, -int(banco.estoque[linha, coluna]))
+        for linha, h_id in enumerate(banco.ids.tolist())
+        for coluna, tipo in enumerate(TIPOS_SANGUINEOS)
+        if banco.estoque[linha, coluna]
+    )
+    return banco
+
+
+def _conferir(campo, grafo, tipo, validos):
+    # O campo deve coincidir com um Dijkstra do zero a partir dos válidos, e a rota de
+    # cada nó deve terminar no hemocentro informado e custar a distância informada
+    esperado = dijkstra.distancias(grafo.transposto(), sorted(validos))
+    for i, no in enumerate(grafo.ids.tolist()):
+        resultado = campo.consultar(no, tipo)
+        if np.isinf(esperado[i]):
+            assert resultado is None
+            continue
+        distancia, destino, rota = resultado
+        assert distancia == pytest.approx(esperado[i])
+        assert grafo.indice[destino] in validos
+        assert rota[-1] == destino
+        assert grafo.custo_caminho(grafo.indices(rota)) == pytest.approx(distancia)
+
+
+def test_hemocentro_a_zero_metros_de_outro():
+    # 2 -> 1 (10 m) -> 0 (0 m), com 0 e 1 válidos; ao remover 0, o 1 continua sendo fonte
+    grafo = GrafoCSR.de_arestas([1, 2], [0, 1], [0.0, 10.0], x=[-47.9, -47.9, -47.9], y=[-22.0, -22.0, -22.0001])
+    campo = CampoDeDistancias(grafo, _banco_vazio(grafo, [0, 1]))
+
+    campo.aplicar_eventos([MudancaValidade(0, "O-", True), MudancaValidade(1, "O-", True)])
+    _conferir(campo, grafo, "O-", {0, 1})
+
+    campo.aplicar_eventos([MudancaValidade(0, "O-", False)])
+    assert campo.consultar(1, "O-") == (0.0, 1, [1])
+    assert campo.consultar(2, "O-") == (10.0, 1, [2, 1])
+    _conferir(campo, grafo, "O-", {1})
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_sequencias_aleatorias(semente):
+    # Grade com parte das ruas de comprimento zero, para provocar empates entre hemocentros
+    base = grade(150, semente=semente)
+    n = len(base)
+    origens = np.repeat(np.arange(n), np.diff(base.offsets))
+    pesos = np.asarray(base.pesos).copy()
+    rng = np.random.default_rng(semente)
+    pesos[rng.random(len(pesos)) < 0.2] = 0.0
+    grafo = GrafoCSR.de_arestas(origens, base.alvos, pesos, base.x, base.y, ids=base.ids)
+
+    sorteio = random.Random(semente)
+    hemocentros = sorteio.sample(range(n), 15)
+    campo = CampoDeDistancias(grafo, _banco_vazio(grafo, hemocentros))
+
+    validos = set()
+    for _ in range(60):
+        h = sorteio.choice(hemocentros)
+        valido = h not in validos
+        campo.aplicar_eventos([MudancaValidade(int(grafo.ids[h]), "A+", valido)])
+        (validos.add if valido else validos.discard)(h)
+        _conferir(campo, grafo, "A+", validos)
@@ -0,0 +1,97 @@
+"""
+Testes do GrafoCSR: compilação a partir do NetworkX e de arrays de arestas,
+snapshot em .npy, grafo transposto e custo de caminhos.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from utils.grafo_csr import GrafoCSR
+
+
+def _multigrafo():
+    # Pequeno MultiDiGraph no formato do osmnx, com arestas paralelas de custos diferentes
+    grafo = nx.MultiDiGraph()
+    for no, (x, y) in {10: (-47.90, -22.00), 20: (-47.89, -22.00), 30: (-47.89, -22.01), 40: (-47.90, -22.01)}.items():
+        grafo.add_node(no, x=x, y=y)
+    grafo.add_edge(10, 20, key=0, length=120.0)
+    grafo.add_edge(10, 20, key=1, length=80.0)
+    grafo.add_edge(10, 20, key=2, length=95.0)
+    grafo.add_edge(20, 30, key=0, length=50.0)
+    grafo.add_edge(30, 40, key=0, length=70.0)
+    grafo.add_edge(30, 40, key=1, length=60.0)
+    grafo.add_edge(40, 10, key=0, length=30.0)
+    grafo.add_edge(20, 10, key=0, length=110.0)
+    return grafo
+
+
+def _arestas(csr):
+    # Conjunto de arestas (origem, destino, custo) do CSR, em IDs originais
+    origens = np.repeat(np.arange(len(csr)), np.diff(csr.offsets))
+    return {
+        (int(csr.ids[u]), int(csr.ids[v]), float(w))
+        for u, v, w in zip(origens, np.asarray(csr.alvos), np.asarray(csr.pesos))
+    }
+
+
+def test_arestas_paralelas_ficam_com_o_menor_custo():
+    grafo = _multigrafo()
+    csr = GrafoCSR.de_networkx(grafo)
+    assert csr.numero_arestas() == 5
+    assert csr.pesos[csr.aresta(csr.indice[10], csr.indice[20])] == 80.0
+    assert csr.chaves[csr.aresta(csr.indice[10], csr.indice[20])] == 1
+    assert csr.pesos[csr.aresta(csr.indice[30], csr.indice[40])] == 60.0
+    with pytest.raises(KeyError):
+        csr.aresta(csr.indice[10], csr.indice[30])
+
+    # de_arestas colapsa da mesma forma
+    origens = [0, 0, 0, 1, 2, 2, 3, 1]
+    destinos = [1, 1, 1, 2, 3, 3, 0, 0]
+    pesos = [120.0, 80.0, 95.0, 50.0, 70.0, 60.0, 30.0, 110.0]
+    direto = GrafoCSR.de_arestas(origens, destinos, pesos, x=csr.x, y=csr.y, ids=csr.ids)
+    assert _arestas(direto) == _arestas(csr)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_salvar_e_carregar(tmp_path, mmap):
+    csr = GrafoCSR.de_networkx(_multigrafo())
+    csr.salvar(tmp_path)
+    carregado = GrafoCSR.carregar(tmp_path, mmap=mmap)
+    for nome in ("ids", "offsets", "alvos", "pesos", "chaves", "x", "y"):
+        assert np.array_equal(np.asarray(getattr(carregado, nome)), np.asarray(getattr(csr, nome)))
+    if mmap:
+        assert isinstance(carregado.pesos, np.memmap)
+    assert carregado.indice == csr.indice
+    assert list(carregado.vizinhos(carregado.indice[10])) == list(csr.vizinhos(csr.indice[10]))
+
+
+def test_transposto_inverte_todas_as_arestas():
+    csr = GrafoCSR.de_networkx(_multigrafo())
+    transposto = csr.transposto()
+    assert _arestas(transposto) == {(v, u, w) for u, v, w in _arestas(csr)}
+    assert _arestas(transposto.transposto()) == _arestas(csr)
+    for i in range(len(csr)):
+        for j, _ in csr.vizinhos(i):
+            assert np.array_equal(transposto.chaves[transposto.aresta(j, i)], csr.chaves[csr.aresta(i, j)])
+
+
+def test_custo_caminho_igual_ao_networkx():
+    # Entre arestas paralelas, o custo de um passo é o da mais barata, como no nx.path_weight
+    # sobre o DiGraph das arestas mínimas
+    grafo = _multigrafo()
+    minimos = nx.DiGraph()
+    for u, v, dados in grafo.edges(data=True):
+        if not minimos.has_edge(u, v) or dados["length"] < minimos.edges[u, v]["length"]:
+            minimos.add_edge(u, v, length=dados["length"])
+
+    csr = GrafoCSR.de_networkx(grafo)
+    for caminho in ([10, 20, 30, 40], [20, 10], [30, 40, 10, 20, 30]):
+        assert csr.custo_caminho(csr.indices(caminho)) == pytest.approx(
+            nx.path_weight(minimos, caminho, weight="length")
+        )
+    assert csr.custo_caminho(csr.indices([40])) == 0
@@ -0,0 +1,73 @@
+"""
+Testes da HierarquiaDeContracao: consultas ponto a ponto e para vários
+destinos comparadas com o Dijkstra do NetworkX, em uma grade e em um grafo
+geométrico aleatório com ruas de mão única.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import random
+
+import networkx as nx
+import pytest
+
+from algorithms.hierarquia_contracao import HierarquiaDeContracao
+from utils.grafos_sinteticos import grade, geometrico_aleatorio, para_networkx
+
+
+@pytest.fixture(scope="module", params=["grade", "geometrico"])
+def grafos(request):
+    csr = grade(150, semente=1) if request.param == "grade" else geometrico_aleatorio(150, semente=2, mao_unica=0.3)
+    return csr, para_networkx(csr), HierarquiaDeContracao.construir(csr)
+
+
+def _conferir_caminho(grafo_nx, caminho, distancia, origem, destino):
+    # O caminho desempacotado liga origem e destino por arestas do grafo e custa a distância
+    assert caminho[0] == origem and caminho[-1] == destino
+    custo = sum(min(d["length"] for d in grafo_nx[u][v].values()) for u, v in zip(caminho, caminho[1:]))
+    assert custo == pytest.approx(distancia)
+
+
+def _origens(csr, quantidade, semente):
+    return random.Random(semente).sample(csr.ids.tolist(), quantidade)
+
+
+def test_consultar_igual_ao_dijkstra(grafos):
+    csr, grafo_nx, ch = grafos
+    for origem in _origens(csr, 8, 0):
+        esperado = nx.single_source_dijkstra_path_length(grafo_nx, origem, weight="length")
+        for destino in _origens(csr, 15, origem):
+            resultado = ch.consultar(origem, destino)
+            if destino not in esperado:
+                assert resultado is None
+                continue
+            distancia, caminho = resultado
+            assert distancia == pytest.approx(esperado[destino])
+            assert ch.consultar(origem, destino, apenas_distancia=True) == pytest.approx(esperado[destino])
+            _conferir_caminho(grafo_nx, caminho, distancia, origem, destino)
+
+
+def test_consultar_varios_igual_ao_dijkstra(grafos):
+    csr, grafo_nx, ch = grafos
+    for origem in _origens(csr, 8, 1):
+        esperado = nx.single_source_dijkstra_path_length(grafo_nx, origem, weight="length")
+        destinos = _origens(csr, 10, origem + 1)
+        resultados = ch.consultar_varios(origem, destinos)
+
+        assert {destino for _, destino, _ in resultados} == {d for d in destinos if d in esperado}
+        assert [d for d, _, _ in resultados] == sorted(d for d, _, _ in resultados)
+        for distancia, destino, caminho in resultados:
+            assert distancia == pytest.approx(esperado[destino])
+            _conferir_caminho(grafo_nx, caminho, distancia, origem, destino)
+
+
+def test_salvar_e_carregar(grafos, tmp_path):
+    csr, grafo_nx, ch = grafos
+    ch.salvar(tmp_path)
+    carregada = HierarquiaDeContracao.carregar(tmp_path, csr)
+    for origem in _origens(csr, 5, 2):
+        destinos = _origens(csr, 10, origem + 2)
+        assert carregada.consultar_varios(origem, destinos) == ch.consultar_varios(origem, destinos)
+        assert carregada.consultar(origem, destinos[0]) == ch.consultar(origem, destinos[0])
@@ -0,0 +1,102 @@
+"""
+Testes do índice espacial: ajuste de coordenadas ao nó e à rua mais
+próximos, comparado com a busca exaustiva por distância haversine.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import numpy as np
+import pytest
+
+from algorithms.heuristicas import R
+from utils.grafos_sinteticos import geometrico_aleatorio
+from utils.indice_espacial import IndiceEspacial
+
+# Pontos amostrados ao longo de cada rua na busca exaustiva
+AMOSTRAS = 400
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * R * np.arcsin(np.sqrt(a))
+
+
+@pytest.fixture(scope="module")
+def grafo():
+    return geometrico_aleatorio(300, semente=5, mao_unica=0.3)
+
+
+@pytest.fixture(scope="module")
+def indice(grafo):
+    return IndiceEspacial(grafo)
+
+
+@pytest.fixture(scope="module")
+def pontos(grafo):
+    # Pontos aleatórios na caixa do grafo (com folga), nós e pontos médios de ruas
+    rng = np.random.default_rng(0)
+    folga = 0.002
+    lon = rng.uniform(grafo.x.min() - folga, grafo.x.max() + folga, 200)
+    lat = rng.uniform(grafo.y.min() - folga, grafo.y.max() + folga, 200)
+    nos = rng.choice(len(grafo), 20, replace=False)
+    arestas = rng.choice(grafo.numero_arestas(), 20, replace=False)
+    origens = np.searchsorted(grafo.offsets, arestas, side="right") - 1
+    alvos = np.asarray(grafo.alvos)[arestas]
+    lon = np.concatenate([lon, grafo.x[nos], (grafo.x[origens] + grafo.x[alvos]) / 2])
+    lat = np.concatenate([lat, grafo.y[nos], (grafo.y[origens] + grafo.y[alvos]) / 2])
+    return lon, lat
+
+
+def _segmentos(grafo):
+    # Extremos (índices densos) de todas as arestas do CSR, sem laços
+    origens = np.repeat(np.arange(len(grafo)), np.diff(grafo.offsets))
+    alvos = np.asarray(grafo.alvos, dtype=np.int64)
+    fora_laco = origens != alvos
+    return origens[fora_laco], alvos[fora_laco]
+
+
+def test_no_mais_proximo_igual_a_busca_exaustiva(grafo, indice, pontos):
+    lon, lat = pontos
+    ids, distancias = indice.nos_mais_proximos(lon, lat)
+
+    todas = haversine(lon[:, None], lat[:, None], grafo.x[None, :], grafo.y[None, :])
+    esperados = np.argmin(todas, axis=1)
+    assert ids.tolist() == grafo.nos(esperados)
+    assert np.allclose(distancias, todas.min(axis=1), rtol=1e-9, atol=1e-6)
+
+    no, distancia = indice.no_mais_proximo(lon[0], lat[0])
+    assert (no, distancia) == (ids[0].item(), pytest.approx(distancias[0]))
+
+
+def test_aresta_mais_proxima_igual_a_busca_exaustiva(grafo, indice, pontos):
+    lon, lat = pontos
+    ajuste = indice.arestas_mais_proximas(lon, lat)
+
+    # Distância de cada ponto a cada rua, pela menor distância haversine às amostras da rua
+    origens, alvos = _segmentos(grafo)
+    t = np.linspace(0, 1, AMOSTRAS)
+    amostras_lon = grafo.x[origens][:, None] + t * (grafo.x[alvos] - grafo.x[origens])[:, None]
+    amostras_lat = grafo.y[origens][:, None] + t * (grafo.y[alvos] - grafo.y[origens])[:, None]
+    comprimentos = haversine(grafo.x[origens], grafo.y[origens], grafo.x[alvos], grafo.y[alvos])
+    erro_amostragem = comprimentos.max() / (AMOSTRAS - 1) / 2 + 1e-3
+
+    indice_denso = grafo.indice
+    for k in range(len(lon)):
+        por_rua = haversine(lon[k], lat[k], amostras_lon, amostras_lat).min(axis=1)
+        assert ajuste.distancia[k] == pytest.approx(por_rua.min(), abs=erro_amostragem)
+
+        # A rua devolvida é uma das mais próximas (em qualquer sentido de percurso)
+        u, v = indice_denso[ajuste.u[k].item()], indice_denso[ajuste.v[k].item()]
+        da_rua = por_rua[((origens == u) & (alvos == v)) | ((origens == v) & (alvos == u))]
+        assert da_rua.min() == pytest.approx(por_rua.min(), abs=2 * erro_amostragem)
+
+        # O ponto ajustado fica sobre a rua, à distância informada do ponto original
+        assert haversine(lon[k], lat[k], ajuste.lon[k], ajuste.lat[k]) == pytest.approx(ajuste.distancia[k], abs=1e-3)
+        assert 0.0 <= ajuste.fracao[k] <= 1.0
+
+    # Nós e pontos médios de ruas já estão sobre as ruas
+    assert np.all(ajuste.distancia[200:220] < 1e-6)
+    assert np.all(ajuste.distancia[220:] < 1e-2)
@@ -0,0 +1,41 @@
+"""
+Testes das buscas com k destinos: o mesmo contrato no A* e no BFS quando só
+parte dos destinos (ou nenhum deles) é alcançável.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import pytest
+
+from algorithms.busca_informada import a_estrela
+from algorithms.busca_nao_informada import bfs
+from utils.grafo_csr import GrafoCSR
+
+BUSCAS = [a_estrela, bfs]
+
+
+@pytest.fixture
+def grafo():
+    # 0 -> 1 -> 2 -> 3, e 4 -> 0: o nó 4 não é alcançável a partir de 0
+    return GrafoCSR.de_arestas(
+        [0, 1, 2, 4], [1, 2, 3, 0], [100.0, 120.0, 90.0, 50.0],
+        x=[-47.900, -47.899, -47.898, -47.897, -47.901], y=[-22.0] * 5,
+    )
+
+
+@pytest.mark.parametrize("busca", BUSCAS)
+def test_k_com_parte_dos_destinos_alcancavel(grafo, busca):
+    resultado = busca(grafo, 0, [3, 4, 2], k=3)
+    assert [(destino, distancia) for destino, distancia, _ in resultado] == [(2, 220.0), (3, 310.0)]
+    assert [caminho for _, _, caminho in resultado] == [[0, 1, 2], [0, 1, 2, 3]]
+
+    resultado = busca(grafo, 0, [3, 4, 2], k=3, apenas_distancia=True)
+    assert [caminho for _, _, caminho in resultado] == [None, None]
+
+
+@pytest.mark.parametrize("busca", BUSCAS)
+def test_k_sem_destino_alcancavel(grafo, busca):
+    assert busca(grafo, 0, [4], k=2) == []
+    assert busca(grafo, 3, [0, 4], k=2, apenas_distancia=True) == []
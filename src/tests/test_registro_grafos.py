@@ -0,0 +1,55 @@
+"""
+Testes do registro de grafos: acertos e falhas contados só para os pedidos
+feitos ao registro, não para as partes de um grafo costurado.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import networkx as nx
+import pytest
+
+from utils.grafos_sinteticos import grade, para_networkx
+from utils.helper_functions import Graph
+from utils.registro_grafos import RegistroDeGrafos
+
+
+@pytest.fixture
+def registro():
+    # Duas cidades vizinhas que compartilham os nós da divisa (mesmos IDs)
+    oeste = para_networkx(grade(100, semente=0))
+    ids = sorted(oeste.nodes, key=lambda no: oeste.nodes[no]["x"])
+    divisa = set(ids[-10:])
+    largura = oeste.nodes[ids[-1]]["x"] - oeste.nodes[ids[0]]["x"]
+    leste = nx.relabel_nodes(oeste, {no: no if no in divisa else no + 10**6 for no in ids})
+    for no in leste.nodes:
+        if no not in divisa:
+            leste.nodes[no]["x"] += largura
+
+    grafos = {"oeste.graphml": oeste, "leste.graphml": leste}
+    registro = RegistroDeGrafos(carregar=lambda arquivo: Graph.de_networkx(grafos[arquivo], nome=arquivo))
+    registro.registrar("oeste", "oeste.graphml")
+    registro.registrar("leste", "leste.graphml")
+    return registro
+
+
+def test_costura_conta_um_pedido(registro):
+    grafo = registro.costurar(["oeste", "leste"])
+    assert (registro.acertos, registro.falhas) == (0, 1)
+    assert len(registro.tempos_carga) == 3
+    assert grafo.graph.number_of_nodes() == 2 * 100 - 10
+
+    registro.costurar(["oeste", "leste"])
+    registro.grafo("oeste")
+    assert (registro.acertos, registro.falhas) == (2, 1)
+
+
+def test_caixas_calculadas_nao_contam(registro):
+    assert registro.cidades_em(-1e6, -1e6) == []
+    assert (registro.acertos, registro.falhas) == (0, 0)
+    assert len(registro.tempos_carga) == 2
+
+    registro.grafo("leste")
+    assert (registro.acertos, registro.falhas) == (1, 0)
+    assert registro.metricas()["taxa_acertos"] == 1.0
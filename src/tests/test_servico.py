@@ -0,0 +1,91 @@
+"""
+Testes do serviço HTTP de roteamento: coalescência de pedidos idênticos,
+recusa com 503 acima do limite de cálculos e Content-Length inválido.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import asyncio
+import os
+import random
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import osmnx as ox
+
+from servico import ServicoDeRotas
+from utils.grafos_sinteticos import grade, para_networkx
+from utils.helper_functions import BancoDeHemocentros, Graph
+from utils.roteamento_lote import inicializar_processo
+
+
+class TestServicoDeRotas(unittest.IsolatedAsyncioTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.diretorio = tempfile.TemporaryDirectory()
+        cls.graphml = os.path.join(cls.diretorio.name, "cidade.graphml")
+        ox.save_graphml(para_networkx(grade(100, semente=0)), cls.graphml)
+        cls.grafo = Graph(cls.graphml)
+        cls.executor = ThreadPoolExecutor(1, initializer=inicializar_processo, initargs=(cls.graphml,))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+        cls.diretorio.cleanup()
+
+    def servico(self, limite_fila=64):
+        random.seed(0)
+        csr = self.grafo.compilar()
+        banco = BancoDeHemocentros(csr.nos([10, 50, 90]), csr)
+        banco.repor(int(banco.ids[0]), "O-", 1)
+        return ServicoDeRotas(self.grafo, banco, self.executor, limite_fila=limite_fila)
+
+    async def test_pedidos_identicos_fazem_um_calculo(self):
+        servico = self.servico()
+        origem = self.grafo.compilar().nos([0])[0]
+        respostas = await asyncio.gather(*(
+            servico.despachar("GET", f"/rota?origem={origem}&tipo=A%2B") for _ in range(20)
+        ))
+
+        self.assertEqual(servico.contadores["calculos"], 1)
+        self.assertEqual(servico.contadores["coalescidos"], 19)
+        self.assertEqual({status for status, _, _ in respostas}, {HTTPStatus.OK})
+        rotas = {tuple(resposta["rota"]) for _, resposta, _ in respostas}
+        self.assertEqual(len(rotas), 1)
+        self.assertEqual(next(iter(rotas))[0], origem)
+
+    async def test_acima_do_limite_responde_503(self):
+        servico = self.servico(limite_fila=1)
+        origens = self.grafo.compilar().nos([0, 1])
+        (status1, _, _), (status2, resposta, extras) = await asyncio.gather(*(
+            servico.despachar("GET", f"/rota?origem={origem}&tipo=O-") for origem in origens
+        ))
+
+        self.assertEqual(status1, HTTPStatus.OK)
+        self.assertEqual(status2, HTTPStatus.SERVICE_UNAVAILABLE)
+        self.assertIn("erro", resposta)
+        self.assertEqual(extras, {"Retry-After": "1"})
+        self.assertEqual(servico.contadores["recusados"], 1)
+        self.assertEqual(servico.contadores["erros"], 0)
+
+        # Terminado o cálculo, a mesma origem volta a ser atendida
+        status, _, _ = await servico.despachar("GET", f"/rota?origem={origens[1]}&tipo=O-")
+        self.assertEqual(status, HTTPStatus.OK)
+
+    async def test_content_length_invalido_responde_400(self):
+        servico = self.servico()
+        servidor = await asyncio.start_server(servico.atender, "127.0.0.1", 0)
+        porta = servidor.sockets[0].getsockname()[1]
+        async with servidor:
+            for valor in ("abc", "-5"):
+                leitor, escritor = await asyncio.open_connection("127.0.0.1", porta)
+                escritor.write(f"POST /estoque HTTP/1.1\r\nContent-Length: {valor}\r\n\r\n".encode("latin-1"))
+                await escritor.drain()
+                linha = await leitor.readline()
+                escritor.close()
+                self.assertEqual(linha.split()[1], b"400")
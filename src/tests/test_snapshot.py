@@ -0,0 +1,57 @@
+"""
+Testes do snapshot binário: troca do snapshot quando o GraphML muda e
+leitura do pickle só a partir de snapshots confiáveis.
+
+Execução (a partir de src/):
+
+    python3 -m pytest tests
+"""
+
+import os
+
+import osmnx as ox
+
+import utils.snapshot as snapshot_utils
+from utils.grafos_sinteticos import grade, para_networkx
+from utils.helper_functions import Graph
+
+
+def _graphml(tmp_path, semente):
+    caminho = str(tmp_path / "cidade.graphml")
+    ox.save_graphml(para_networkx(grade(100, semente=semente)), caminho)
+    return caminho
+
+
+def test_snapshot_refeito_quando_o_graphml_muda(tmp_path):
+    caminho = _graphml(tmp_path, 0)
+    primeira = Graph(caminho).versao
+    assert snapshot_utils.validar_snapshot(caminho) == primeira
+
+    # Outro conteúdo: o snapshot antigo é trocado pelo novo, sem sobras no diretório
+    caminho = _graphml(tmp_path, 1)
+    grafo = Graph(caminho)
+    assert grafo.versao != primeira
+    assert snapshot_utils.validar_snapshot(caminho) == grafo.versao
+    assert sorted(os.listdir(tmp_path)) == ["cidade.graphml", "cidade.graphml.snapshot"]
+    assert snapshot_utils.carregar_grafo(caminho).number_of_nodes() == len(grafo.compilar())
+
+
+def test_pickle_alterado_nao_e_lido(tmp_path):
+    caminho = _graphml(tmp_path, 0)
+    Graph(caminho)
+    with open(os.path.join(snapshot_utils.diretorio_snapshot(caminho), "grafo.pickle"), "ab") as f:
+        f.write(b"\0")
+    assert snapshot_utils.carregar_grafo(caminho) is None
+
+    # O Graph cai para o GraphML
+    assert Graph(caminho).graph.number_of_nodes() == 100
+
+
+def test_snapshot_gravavel_por_outros_nao_e_lido(tmp_path):
+    caminho = _graphml(tmp_path, 0)
+    Graph(caminho)
+    diretorio = snapshot_utils.diretorio_snapshot(caminho)
+    os.chmod(diretorio, 0o777)
+    assert snapshot_utils.carregar_grafo(caminho) is None
+    os.chmod(diretorio, 0o700)
+    assert snapshot_utils.carregar_grafo(caminho) is not None
@@ -0,0 +1,421 @@
+"""
+Benchmark dos algoritmos de roteamento.
+
+Este módulo roda os modos de roteamento do projeto (A*, A* com ALT, A*
+bidirecional, BFS, Ideal, hierarquia de contração e o caminho mínimo do
+NetworkX usado por Graph.calcular_rota) sobre o grafo de São Carlos e sobre
+grafos sintéticos (utils.grafos_sinteticos) de tamanho crescente, com
+diferentes quantidades de destinos. Para cada combinação são registrados os
+percentis de latência, os nós expandidos, o pico de memória e a qualidade da
+rota em relação ao caminho mínimo exato (Dijkstra).
+
+As consultas são sorteadas com semente fixa, de modo que duas execuções em
+commits diferentes medem exatamente as mesmas consultas. Os resultados são
+salvos em JSON (um arquivo por commit) e podem ser comparados depois.
+
+Uso pela linha de comando (a partir de src/):
+
+    python3 -m utils.benchmark --tamanhos 1000 10000 --destinos 1 5 25
+    python3 -m utils.benchmark --comparar ../benchmarks/abc1234.json ../benchmarks/def5678.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import networkx as nx
+
+from utils import grafos_sinteticos
+from algorithms.busca_informada import a_estrela, a_estrela_bidirecional
+from algorithms.busca_nao_informada import bfs
+from algorithms.alt import PreprocessamentoALT
+from algorithms.dijkstra import dijkstra_multi_alvo
+from algorithms.caminhos import reconstruir_caminho
+from algorithms.estatisticas import EstatisticasBusca
+from algorithms.hierarquia_contracao import HierarquiaDeContracao
+
+MODOS = ("A*", "A* ALT", "A* Bidirecional", "BFS", "Ideal", "CH", "NetworkX")
+
+# Modos rodados por padrão: a construção da hierarquia de contração é lenta em grafos grandes
+MODOS_PADRAO = ("A*", "A* ALT", "A* Bidirecional", "BFS", "Ideal", "NetworkX")
+
+GERADORES = {
+    "grade": grafos_sinteticos.grade,
+    "geometrico": grafos_sinteticos.geometrico_aleatorio,
+}
+
+# Diferença relativa de custo abaixo da qual uma rota é considerada ótima
+TOLERANCIA_OTIMA = 1e-9
+
+# Consultas repetidas sob o tracemalloc para medir o pico de memória (ele deixa as buscas mais lentas)
+CONSULTAS_MEMORIA = 3
+
+
+def commit_atual():
+    # Hash curto do commit atual (com "+" se houver alterações não commitadas), ou None fora do git
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        alterado = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("+" if alterado else "")
+
+
+def custo_rota(csr, rota):
+    # Custo de uma rota (IDs originais), usando a aresta mais barata entre cada par de nós
+    return csr.custo_caminho(csr.indices(rota))
+
+
+def percentil(valores, p):
+    return float(np.percentile(valores, p)) if len(valores) else None
+
+
+class Cenario:
+    """
+    Um grafo do benchmark e as estruturas pré-processadas de cada modo, criadas sob demanda.
+    """
+
+    def __init__(self, nome, csr, networkx=None, calcular_rota=None):
+        """
+        Args:
+            nome: Nome do grafo nos resultados
+            csr: GrafoCSR
+            networkx: Grafo do NetworkX equivalente; None converte o CSR quando necessário (opcional)
+            calcular_rota: Função calcular_rota(origem, destino) do modo NetworkX;
+                           None usa nx.shortest_path no grafo do NetworkX (opcional)
+        """
+        self.nome = nome
+        self.csr = csr
+        self._networkx = networkx
+        self._calcular_rota = calcular_rota
+        self._alt = None
+        self._hierarquia = None
+        self.preprocessamento = {}
+
+    def __medir(self, etapa, funcao):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        self.preprocessamento[etapa] = time.perf_counter() - inicio
+        return resultado
+
+    def alt(self):
+        if self._alt is None:
+            self._alt = self.__medir("ALT", lambda: PreprocessamentoALT(self.csr, semente=0))
+        return self._alt
+
+    def hierarquia(self):
+        if self._hierarquia is None:
+            self._hierarquia = self.__medir("CH", lambda: HierarquiaDeContracao.construir(self.csr))
+        return self._hierarquia
+
+    def calcular_rota(self):
+        if self._calcular_rota is None:
+            if self._networkx is None:
+                self._networkx = self.__medir("NetworkX", lambda: grafos_sinteticos.para_networkx(self.csr))
+            grafo = self._networkx
+            self._calcular_rota = lambda origem, destino: nx.shortest_path(grafo, origem, destino, weight="length")
+        return self._calcular_rota
+
+    def preparar(self, modo):
+        # Faz o pré-processamento do modo fora das medições de latência
+        if modo in ("A* ALT", "A* Bidirecional"):
+            self.alt()
+        elif modo == "CH":
+            self.hierarquia()
+        elif modo == "NetworkX":
+            self.calcular_rota()
+
+    def rotear(self, modo, origem, destinos, estatisticas):
+        """
+        Roteia uma consulta em um modo.
+
+        Args:
+            modo: Um dos MODOS
+            origem: ID do nó de origem
+            destinos: IDs dos nós de destino
+            estatisticas: EstatisticasBusca preenchida pelos modos que a suportam
+
+        Returns:
+            list: Rota (IDs) até o destino escolhido, ou None se não houver rota
+        """
+        csr = self.csr
+        try:
+            if modo == "A*":
+                return a_estrela(csr, origem, destinos, estatisticas=estatisticas)
+            if modo == "A* ALT":
+                return a_estrela(csr, origem, destinos, heuristica=self.alt().heuristica, estatisticas=estatisticas)
+            if modo == "A* Bidirecional":
+                return a_estrela_bidirecional(
+                    csr, origem, destinos, heuristica=self.alt().heuristica, estatisticas=estatisticas
+                )
+            if modo == "BFS":
+                return bfs(csr, origem, destinos, estatisticas=estatisticas)
+        except ValueError:
+            return None
+
+        if modo == "Ideal":
+            ranking, predecessor = dijkstra_multi_alvo(csr, csr.indice[origem], csr.indices(destinos))
+            return csr.nos(reconstruir_caminho(predecessor, ranking[0][1])) if ranking else None
+
+        if modo == "CH":
+            resultados = self.hierarquia().consultar_varios(origem, destinos)
+            return resultados[0][2] if resultados else None
+
+        # NetworkX: um caminho mínimo por destino, como Graph.calcular_rota, e fica o mais curto
+        calcular_rota = self.calcular_rota()
+        melhor = None
+        for destino in destinos:
+            try:
+                rota = calcular_rota(origem, destino)
+            except nx.NetworkXNoPath:
+                continue
+            custo = custo_rota(csr, rota)
+            if melhor is None or custo < melhor[0]:
+                melhor = (custo, rota)
+        return melhor[1] if melhor else None
+
+
+def sortear_consultas(csr, quantidade, n_destinos, semente):
+    # Sorteia pares (origem, destinos) de forma reprodutível e calcula o custo exato de cada um
+    rng = random.Random(semente)
+    ids = csr.ids.tolist()
+    consultas = []
+    for _ in range(quantidade):
+        amostra = rng.sample(ids, min(n_destinos + 1, len(ids)))
+        origem, destinos = amostra[0], amostra[1:]
+        ranking, _ = dijkstra_multi_alvo(csr, csr.indice[origem], csr.indices(destinos))
+        consultas.append((origem, destinos, ranking[0][0] if ranking else None))
+    return consultas
+
+
+def _media(estatisticas, contador):
+    # Média de um contador das EstatisticasBusca, ou None para os modos que não as preenchem
+    return float(np.mean([getattr(e, contador) for e in estatisticas])) if estatisticas else None
+
+
+def medir_modo(cenario, modo, consultas):
+    """
+    Roda todas as consultas em um modo e resume latência, nós expandidos,
+    memória e qualidade das rotas.
+
+    Returns:
+        dict: Métricas do modo
+    """
+    cenario.preparar(modo)
+
+    latencias = []
+    contadores = []
+    razoes = []
+    sem_rota = 0
+    falhas = 0
+    for origem, destinos, exato in consultas:
+        estatisticas = EstatisticasBusca()
+        inicio = time.perf_counter()
+        rota = cenario.rotear(modo, origem, destinos, estatisticas)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if estatisticas.expandidos:
+            contadores.append(estatisticas)
+
+        if rota is None:
+            if exato is None:
+                sem_rota += 1
+            else:
+                falhas += 1  # Havia rota, mas o modo não a encontrou
+        elif exato is not None:
+            custo = custo_rota(cenario.csr, rota)
+            razoes.append(custo / exato if exato > 0 else 1.0)
+
+    # Pico de memória em uma segunda passada, separada das latências
+    picos = []
+    for origem, destinos, _ in consultas[:CONSULTAS_MEMORIA]:
+        tracemalloc.start()
+        cenario.rotear(modo, origem, destinos, EstatisticasBusca())
+        picos.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "consultas": len(consultas),
+        "p50_ms": percentil(latencias, 50),
+        "p90_ms": percentil(latencias, 90),
+        "p99_ms": percentil(latencias, 99),
+        "media_ms": float(np.mean(latencias)) if latencias else None,
+        "expandidos_medio": _media(contadores, "expandidos"),
+        "insercoes_medio": _media(contadores, "insercoes"),
+        "obsoletas_medio": _media(contadores, "obsoletas"),
+        "avaliacoes_heuristica_medio": _media(contadores, "avaliacoes_heuristica"),
+        "fronteira_maxima": max((e.fronteira_maxima for e in contadores), default=None),
+        "pico_memoria_kb": max(picos) / 1024 if picos else None,
+        "otimas": sum(r <= 1 + TOLERANCIA_OTIMA for r in razoes) / len(razoes) if razoes else None,
+        "razao_media": float(np.mean(razoes)) if razoes else None,
+        "razao_maxima": max(razoes) if razoes else None,
+        "sem_rota": sem_rota,
+        "falhas": falhas,
+    }
+
+
+def executar(cenarios, destinos, consultas, modos, limite_networkx, semente=0, saida=sys.stderr):
+    """
+    Roda o benchmark em todos os cenários.
+
+    Args:
+        cenarios: Iterável de Cenario (pode ser um gerador, para não manter todos na memória)
+        destinos: Quantidades de destinos por consulta
+        consultas: Quantidade de consultas por combinação
+        modos: Modos a medir
+        limite_networkx: Maior grafo (em nós) em que o modo NetworkX é rodado
+        semente: Semente do sorteio das consultas (opcional)
+        saida: Arquivo onde o progresso é escrito (opcional)
+
+    Returns:
+        dict: Resultados e tempos de pré-processamento
+    """
+    resultados = []
+    preprocessamento = []
+    for cenario in cenarios:
+        n = len(cenario.csr)
+        for n_destinos in destinos:
+            lista = sortear_consultas(cenario.csr, consultas, n_destinos, semente)
+            for modo in modos:
+                if modo == "NetworkX" and n > limite_networkx:
+                    continue
+                metricas = medir_modo(cenario, modo, lista)
+                resultados.append({
+                    "grafo": cenario.nome, "nos": n, "arestas": cenario.csr.numero_arestas(),
+                    "destinos": n_destinos, "modo": modo, **metricas,
+                })
+                print(
+                    f"{cenario.nome:>18} {n_destinos:>3} destinos {modo:>16}: "
+                    f"p50 {metricas['p50_ms']:9.2f} ms  p99 {metricas['p99_ms']:9.2f} ms  "
+                    f"ótimas {_formatar(metricas['otimas'])}",
+                    file=saida,
+                )
+        for etapa, segundos in cenario.preprocessamento.items():
+            preprocessamento.append({"grafo": cenario.nome, "nos": n, "etapa": etapa, "segundos": segundos})
+
+    return {
+        "commit": commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "maquina": platform.machine(),
+        "consultas": consultas,
+        "semente": semente,
+        "resultados": resultados,
+        "preprocessamento": preprocessamento,
+    }
+
+
+def _formatar(valor):
+    return "-" if valor is None else f"{valor:.3f}"
+
+
+def comparar(base, novo, tolerancia=0.1, saida=sys.stdout):
+    """
+    Compara dois resultados do benchmark, combinação por combinação.
+
+    Uma regressão é uma combinação cuja latência mediana piorou mais que a
+    tolerância, ou cuja fração de rotas ótimas diminuiu.
+
+    Args:
+        base: Resultados de referência (dict carregado do JSON)
+        novo: Resultados a comparar
+        tolerancia: Piora relativa aceita na latência mediana (opcional)
+        saida: Arquivo onde a tabela é escrita (opcional)
+
+    Returns:
+        list: Descrição de cada regressão encontrada
+    """
+    chave = lambda r: (r["grafo"], r["destinos"], r["modo"])
+    anteriores = {chave(r): r for r in base["resultados"]}
+
+    print(f"{base.get('commit')} -> {novo.get('commit')}", file=saida)
+    regressoes = []
+    for r in novo["resultados"]:
+        a = anteriores.get(chave(r))
+        if a is None:
+            continue
+        variacao = r["p50_ms"] / a["p50_ms"] - 1 if a["p50_ms"] else 0.0
+        problemas = []
+        if variacao > tolerancia:
+            problemas.append(f"p50 {variacao:+.0%}")
+        if a["otimas"] is not None and r["otimas"] is not None and r["otimas"] < a["otimas"] - TOLERANCIA_OTIMA:
+            problemas.append(f"ótimas {a['otimas']:.3f} -> {r['otimas']:.3f}")
+
+        print(
+            f"{r['grafo']:>18} {r['destinos']:>3} destinos {r['modo']:>16}: "
+            f"p50 {a['p50_ms']:9.2f} -> {r['p50_ms']:9.2f} ms ({variacao:+6.1%})"
+            + ("  REGRESSÃO: " + ", ".join(problemas) if problemas else ""),
+            file=saida,
+        )
+        if problemas:
+            regressoes.append(f"{' / '.join(map(str, chave(r)))}: {', '.join(problemas)}")
+    return regressoes
+
+
+def cenarios_da_linha_de_comando(args):
+    # Gera os cenários um de cada vez, para que só um grafo grande fique na memória
+    if args.graphml and os.path.exists(args.graphml):
+        from utils.helper_functions import Graph
+
+        grafo = Graph(args.graphml)
+        yield Cenario("sao_carlos", grafo.compilar(), grafo.graph, grafo.calcular_rota)
+    elif args.graphml:
+        print(f"{args.graphml} não encontrado; seguindo só com os grafos sintéticos", file=sys.stderr)
+
+    for tipo in args.tipos:
+        for n in args.tamanhos:
+            csr = GERADORES[tipo](n, semente=args.semente)
+            yield Cenario(f"{tipo}_{len(csr)}", csr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos algoritmos de roteamento.")
+    parser.add_argument("--graphml", default="../data/sao_carlos.graphml", help="grafo real ('' para pular)")
+    parser.add_argument("--tipos", nargs="+", default=list(GERADORES), choices=list(GERADORES))
+    parser.add_argument("--tamanhos", nargs="+", type=int, default=[1000, 10000, 100000])
+    parser.add_argument("--destinos", nargs="+", type=int, default=[1, 5, 25])
+    parser.add_argument("--consultas", type=int, default=50)
+    parser.add_argument("--modos", nargs="+", default=list(MODOS_PADRAO), choices=MODOS)
+    parser.add_argument("--limite-networkx", type=int, default=20000, help="maior grafo para o modo NetworkX")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", default="../benchmarks", help="diretório dos resultados")
+    parser.add_argument("--comparar", nargs="+", metavar="JSON",
+                        help="compara um resultado salvo com outro (ou com uma nova execução)")
+    parser.add_argument("--tolerancia", type=float, default=0.1, help="piora aceita no p50 (fração)")
+    args = parser.parse_args()
+
+    if args.comparar and len(args.comparar) > 2:
+        parser.error("--comparar recebe um ou dois arquivos")
+
+    if args.comparar and len(args.comparar) == 2:
+        with open(args.comparar[1]) as f:
+            novo = json.load(f)
+    else:
+        novo = executar(
+            cenarios_da_linha_de_comando(args), args.destinos, args.consultas,
+            args.modos, args.limite_networkx, args.semente,
+        )
+        os.makedirs(args.saida, exist_ok=True)
+        arquivo = os.path.join(args.saida, f"{novo['commit'] or 'sem_commit'}.json")
+        with open(arquivo, "w") as f:
+            json.dump(novo, f, indent=1, ensure_ascii=False)
+        print(f"Resultados salvos em {arquivo}", file=sys.stderr)
+
+    if args.comparar:
+        with open(args.comparar[0]) as f:
+            base = json.load(f)
+        regressoes = comparar(base, novo, args.tolerancia)
+        if regressoes:
+            print(f"{len(regressoes)} regressões encontradas", file=sys.stderr)
+            sys.exit(1)
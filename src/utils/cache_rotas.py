@@ -0,0 +1,205 @@
+"""
+Cache de rotas até o hemocentro mais próximo.
+
+Os mesmos pacientes (origem e tipo sanguíneo) são roteados repetidas vezes,
+mas a rota só muda quando muda o grafo ou o conjunto de hemocentros válidos
+para o tipo. Este módulo contém a classe CacheDeRotas, que guarda a rota, a
+distância e o destino de cada (origem, tipo, algoritmo, versão do grafo),
+junto com a versão dos hemocentros válidos do tipo (versoes_validade do
+BancoDeHemocentros) com que foram calculados, com descarte do menos usado
+(LRU) e prazo de validade (TTL).
+
+O cache se inscreve no banco e trata cada MudancaValidade com precisão:
+
+- um hemocentro que deixa de ser válido descarta só as rotas do tipo que
+  terminam nele; as demais continuam ótimas (o destino delas segue válido e
+  os candidatos só diminuíram) e passam para a nova versão;
+- um hemocentro que passa a ser válido pode estar mais perto de qualquer
+  origem, então descarta todas as rotas do tipo.
+
+Mudanças de estoque que não alteram os válidos de um tipo não mexem nas
+rotas desse tipo.
+"""
+
+import sys
+import time
+from collections import OrderedDict, namedtuple
+
+# Quantidade máxima de rotas guardadas
+CAPACIDADE_PADRAO = 10000
+
+# Prazo de validade, em segundos, de uma rota guardada
+TTL_PADRAO = 600
+
+# Rota guardada: IDs dos nós, distância (metros), destino, versão dos válidos do tipo,
+# instante em que foi guardada e memória estimada (bytes)
+EntradaRota = namedtuple("EntradaRota", ["rota", "distancia", "destino", "versao_validade", "criada", "bytes"])
+
+
+def _bytes_rota(rota):
+    # Memória estimada de uma rota: a lista, os inteiros dos IDs e a entrada em si
+    return sys.getsizeof(rota) + sum(sys.getsizeof(no) for no in rota) + 200
+
+
+class CacheDeRotas:
+    """
+    Rotas já calculadas, do usado há mais tempo ao mais recente.
+
+    Attributes:
+        acertos: Consultas atendidas pelo cache
+        falhas: Consultas sem rota guardada, com rota de outra versão ou vencida
+        expiradas: Rotas descartadas por passarem do TTL
+        invalidadas: Rotas descartadas por mudanças nos hemocentros válidos
+        despejos: Rotas descartadas para respeitar a capacidade
+    """
+
+    def __init__(self, banco, capacidade=CAPACIDADE_PADRAO, ttl=TTL_PADRAO, relogio=time.monotonic):
+        """
+        Args:
+            banco: BancoDeHemocentros cujas mudanças de validade invalidam as rotas
+            capacidade: Quantidade máxima de rotas guardadas (opcional)
+            ttl: Prazo de validade das rotas, em segundos; None não expira (opcional)
+            relogio: Função que retorna o instante atual, em segundos (opcional)
+        """
+        self.banco = banco
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.relogio = relogio
+
+        # (origem, tipo, algoritmo, versão do grafo) -> EntradaRota
+        self.entradas = OrderedDict()
+
+        # Chaves das rotas de cada tipo, para invalidar um tipo sem percorrer o cache inteiro
+        self.por_tipo = {tipo: set() for tipo in banco.TIPOS_SANGUINEOS}
+
+        self.memoria_bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.expiradas = 0
+        self.invalidadas = 0
+        self.despejos = 0
+
+        banco.inscrever(self.__mudancas)
+
+    def obter(self, grafo, origem, tipo, algoritmo):
+        """
+        Retorna a rota guardada para a consulta, se ainda valer.
+
+        Args:
+            grafo: Graph em que a rota foi calculada
+            origem: ID do nó de origem
+            tipo: Tipo sanguíneo do receptor
+            algoritmo: Algoritmo que calculou a rota
+
+        Returns:
+            EntradaRota: A rota guardada, ou None se não houver uma válida
+        """
+        chave = (origem, tipo, algoritmo, self.__versao_grafo(grafo))
+        entrada = self.entradas.get(chave)
+        if entrada is None or entrada.versao_validade != self.banco.versoes_validade[tipo]:
+            self.falhas += 1
+            return None
+        if self.ttl is not None and self.relogio() - entrada.criada > self.ttl:
+            self.__remover(chave)
+            self.expiradas += 1
+            self.falhas += 1
+            return None
+
+        self.acertos += 1
+        self.entradas.move_to_end(chave)
+        return entrada
+
+    def guardar(self, grafo, origem, tipo, algoritmo, rota, distancia, versao_validade=None):
+        """
+        Guarda a rota calculada para uma consulta.
+
+        Args:
+            grafo: Graph em que a rota foi calculada
+            origem: ID do nó de origem
+            tipo: Tipo sanguíneo do receptor
+            algoritmo: Algoritmo que calculou a rota
+            rota: Lista de IDs dos nós, da origem ao hemocentro
+            distancia: Distância da rota, em metros
+            versao_validade: Versão dos válidos do tipo lida quando o cálculo começou;
+                             None usa a atual. Uma rota calculada antes de uma mudança
+                             nunca é devolvida depois dela (opcional)
+        """
+        if versao_validade is None:
+            versao_validade = self.banco.versoes_validade[tipo]
+        if self.capacidade <= 0 or versao_validade != self.banco.versoes_validade[tipo]:
+            return
+
+        chave = (origem, tipo, algoritmo, self.__versao_grafo(grafo))
+        if chave in self.entradas:
+            self.__remover(chave)
+        rota = list(rota)
+        entrada = EntradaRota(rota, distancia, rota[-1], versao_validade, self.relogio(), _bytes_rota(rota))
+        self.entradas[chave] = entrada
+        self.por_tipo[tipo].add(chave)
+        self.memoria_bytes += entrada.bytes
+
+        while len(self.entradas) > self.capacidade:
+            self.__remover(next(iter(self.entradas)))
+            self.despejos += 1
+
+    def limpar(self):
+        """
+        Descarta todas as rotas guardadas (por exemplo, ao trocar o grafo).
+        """
+        self.entradas.clear()
+        for chaves in self.por_tipo.values():
+            chaves.clear()
+        self.memoria_bytes = 0
+
+    def fechar(self):
+        """
+        Cancela a inscrição no banco; o cache deixa de receber as mudanças de validade.
+        """
+        self.banco.cancelar_inscricao(self.__mudancas)
+
+    def metricas(self):
+        """
+        Retorna os contadores do cache e a memória estimada em uso.
+        """
+        consultas = self.acertos + self.falhas
+        return {
+            "entradas": len(self.entradas),
+            "capacidade": self.capacidade,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acertos": self.acertos / consultas if consultas else None,
+            "expiradas": self.expiradas,
+            "invalidadas": self.invalidadas,
+            "despejos": self.despejos,
+            "memoria_bytes": self.memoria_bytes,
+        }
+
+    def __versao_grafo(self, grafo):
+        # Hash do GraphML de origem; grafos sem snapshot são distinguidos pelo objeto
+        return grafo.versao if grafo.versao is not None else id(grafo)
+
+    def __remover(self, chave):
+        entrada = self.entradas.pop(chave)
+        self.por_tipo[chave[1]].discard(chave)
+        self.memoria_bytes -= entrada.bytes
+
+    def __mudancas(self, eventos):
+        # Recebe as MudancaValidade de uma alteração do banco, que já está na nova versão
+        novos_validos = set()
+        invalidos = {}
+        for evento in eventos:
+            if evento.valido:
+                novos_validos.add(evento.tipo)
+            else:
+                invalidos.setdefault(evento.tipo, set()).add(evento.hemocentro)
+
+        for tipo in novos_validos | invalidos.keys():
+            versao = self.banco.versoes_validade[tipo]
+            for chave in list(self.por_tipo[tipo]):
+                entrada = self.entradas[chave]
+                if tipo in novos_validos or entrada.destino in invalidos[tipo]:
+                    self.__remover(chave)
+                    self.invalidadas += 1
+                elif entrada.versao_validade == versao - 1:
+                    # Continua ótima: o destino segue válido e os candidatos só diminuíram
+                    self.entradas[chave] = entrada._replace(versao_validade=versao)
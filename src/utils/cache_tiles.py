@@ -0,0 +1,291 @@
+"""
+Cache local de tiles do mapa de fundo.
+
+O mapa de fundo (OpenStreetMap) era buscado na internet a cada desenho. Este
+módulo guarda os tiles em um diretório local, no formato {z}/{x}/{y}.png, com
+limite de tamanho em disco (os tiles usados há mais tempo são removidos
+primeiro), e só recorre à fonte de tiles quando um tile ainda não está no
+cache. Assim, um mapa já visto é redesenhado sem acesso à rede, e uma região
+pode ser baixada de antemão (semear) para uso offline.
+
+A fonte é qualquer função fonte(z, x, y) que devolva os bytes do tile; a
+FonteHTTP cobre servidores no padrão de URL {z}/{x}/{y}, inclusive um
+servidor local de testes.
+"""
+
+import io
+import math
+import os
+import urllib.request
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+# Servidor padrão, o mesmo usado antes pelo contextily (OpenStreetMap Mapnik)
+URL_OSM = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+
+# Diretório padrão do cache, relativo a src/ como os demais caminhos do projeto
+DIRETORIO_PADRAO = os.path.join("..", "data", "tiles")
+
+# Limites de tiles do padrão Web Mercator
+ZOOM_MAXIMO = 19
+LATITUDE_MAXIMA = 85.0511287798
+
+# Cor usada no lugar de um tile indisponível (sem cache e sem rede)
+COR_INDISPONIVEL = (236, 236, 236)
+
+
+class FonteHTTP:
+    """
+    Fonte de tiles servidos por HTTP em um modelo de URL com {z}, {x} e {y}.
+    """
+
+    def __init__(self, url=URL_OSM, tempo_limite=10, agente="blood_donation/1.0"):
+        """
+        Args:
+            url: Modelo da URL dos tiles (opcional)
+            tempo_limite: Tempo máximo de cada requisição, em segundos (opcional)
+            agente: User-Agent enviado ao servidor, exigido pela política do OpenStreetMap (opcional)
+        """
+        self.url = url
+        self.tempo_limite = tempo_limite
+        self.agente = agente
+
+    def __call__(self, z, x, y):
+        requisicao = urllib.request.Request(self.url.format(z=z, x=x, y=y), headers={"User-Agent": self.agente})
+        with urllib.request.urlopen(requisicao, timeout=self.tempo_limite) as resposta:
+            return resposta.read()
+
+
+def tile_de(lon, lat, z):
+    """
+    Converte longitude e latitude na posição (fracionária) do tile no nível z.
+    """
+    lat = min(max(lat, -LATITUDE_MAXIMA), LATITUDE_MAXIMA)
+    n = 2 ** z
+    x = (lon + 180) / 360 * n
+    y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n
+    return x, y
+
+
+def zoom_automatico(lon_min, lon_max, lat_min, lat_max):
+    """
+    Escolhe o nível de zoom para um retângulo em graus como o contextily: o maior
+    entre os níveis pela largura e pela altura, ambos com 360 graus por tile no nível 0.
+    """
+    z_lon = math.ceil(math.log2(360 * 2 / max(lon_max - lon_min, 1e-9)))
+    z_lat = math.ceil(math.log2(360 * 2 / max(lat_max - lat_min, 1e-9)))
+    return max(z_lon, z_lat)
+
+
+class CacheDeTiles:
+    """
+    Tiles do mapa de fundo em um diretório local, com limite de tamanho.
+
+    A ordem de uso dos tiles é mantida em memória e, entre execuções, pela data
+    de modificação dos arquivos, atualizada a cada acerto.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_PADRAO, fonte=None, limite_bytes=256 * 2**20):
+        """
+        Args:
+            diretorio: Diretório do cache (opcional)
+            fonte: Função fonte(z, x, y) -> bytes usada quando o tile não está no cache;
+                   None usa o OpenStreetMap, e False trabalha só com o cache (opcional)
+            limite_bytes: Tamanho máximo do cache em disco (opcional)
+        """
+        self.diretorio = diretorio
+        self.fonte = FonteHTTP() if fonte is None else fonte
+        self.limite_bytes = limite_bytes
+        self.acertos = 0
+        self.falhas = 0
+        self.indisponiveis = 0
+
+        # Arquivos do cache, do usado há mais tempo ao mais recente, e seus tamanhos
+        self.arquivos = OrderedDict()
+        self.total_bytes = 0
+        encontrados = []
+        for raiz, _, nomes in os.walk(diretorio):
+            for nome in nomes:
+                if nome.endswith(".png"):
+                    estado = os.stat(os.path.join(raiz, nome))
+                    encontrados.append((estado.st_mtime, os.path.join(raiz, nome), estado.st_size))
+        for _, caminho, tamanho in sorted(encontrados):
+            self.arquivos[caminho] = tamanho
+            self.total_bytes += tamanho
+
+    def __caminho(self, z, x, y):
+        return os.path.join(self.diretorio, str(z), str(x), f"{y}.png")
+
+    def __guardar(self, caminho, dados):
+        # Escreve o tile (de forma atômica) e remove os mais antigos além do limite
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = caminho + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+
+        self.total_bytes += len(dados) - self.arquivos.pop(caminho, 0)
+        self.arquivos[caminho] = len(dados)
+        while self.total_bytes > self.limite_bytes and len(self.arquivos) > 1:
+            antigo, tamanho = self.arquivos.popitem(last=False)
+            self.total_bytes -= tamanho
+            try:
+                os.remove(antigo)
+            except FileNotFoundError:
+                pass
+
+    def guardar(self, z, x, y, dados):
+        """
+        Guarda os bytes de um tile obtido por outro meio (por exemplo, desenhado
+        localmente), respeitando o limite de tamanho.
+        """
+        self.__guardar(self.__caminho(z, x, y), dados)
+
+    def tile(self, z, x, y):
+        """
+        Retorna os bytes do tile (z, x, y), do cache ou da fonte; None se estiver indisponível.
+        """
+        caminho = self.__caminho(z, x, y)
+        if caminho in self.arquivos:
+            try:
+                with open(caminho, "rb") as f:
+                    dados = f.read()
+                os.utime(caminho)
+                self.arquivos.move_to_end(caminho)
+                self.acertos += 1
+                return dados
+            except FileNotFoundError:
+                self.total_bytes -= self.arquivos.pop(caminho)
+
+        self.falhas += 1
+        if not self.fonte:
+            return None
+        try:
+            dados = self.fonte(z, x, y)
+        except OSError:
+            return None
+        self.__guardar(caminho, dados)
+        return dados
+
+    def semear(self, lon_min, lat_min, lon_max, lat_max, zooms):
+        """
+        Baixa de antemão os tiles que cobrem um retângulo, para uso offline.
+
+        Args:
+            lon_min, lat_min, lon_max, lat_max: Retângulo em graus
+            zooms: Níveis de zoom a baixar
+
+        Returns:
+            int: Quantidade de tiles baixados (os já presentes no cache não contam)
+        """
+        baixados = 0
+        for z in zooms:
+            for x, y in self.__tiles_do_retangulo(lon_min, lon_max, lat_min, lat_max, z):
+                if self.__caminho(z, x, y) not in self.arquivos:
+                    baixados += self.tile(z, x, y) is not None
+        return baixados
+
+    def __tiles_do_retangulo(self, lon_min, lon_max, lat_min, lat_max, z):
+        x0, y0 = tile_de(lon_min, lat_max, z)
+        x1, y1 = tile_de(lon_max, lat_min, z)
+        ultimo = 2 ** z - 1
+        return [
+            (x, y)
+            for x in range(max(int(x0), 0), min(int(x1), ultimo) + 1)
+            for y in range(max(int(y0), 0), min(int(y1), ultimo) + 1)
+        ]
+
+    def mosaico(self, lon_min, lon_max, lat_min, lat_max, z=None, limite_tiles=64):
+        """
+        Monta a imagem do mapa para um retângulo em longitude e latitude.
+
+        Os tiles são quadrados em Web Mercator; as linhas do mosaico são
+        reamostradas para que a imagem fique linear em latitude, como os eixos
+        dos gráficos do projeto (EPSG:4326).
+
+        Args:
+            lon_min, lon_max, lat_min, lat_max: Retângulo em graus
+            z: Nível de zoom; None escolhe como o contextily, pelo tamanho do retângulo (opcional)
+            limite_tiles: Quantidade máxima de tiles; o zoom é reduzido até caber (opcional)
+
+        Returns:
+            np.ndarray: Imagem RGB (altura x largura x 3) que cobre exatamente o retângulo
+        """
+        if z is None:
+            z = zoom_automatico(lon_min, lon_max, lat_min, lat_max)
+        z = min(max(int(z), 0), ZOOM_MAXIMO)
+        while z > 0 and len(self.__tiles_do_retangulo(lon_min, lon_max, lat_min, lat_max, z)) > limite_tiles:
+            z -= 1
+
+        tiles = self.__tiles_do_retangulo(lon_min, lon_max, lat_min, lat_max, z)
+        xs = sorted({x for x, _ in tiles})
+        ys = sorted({y for _, y in tiles})
+
+        imagens = {}
+        lado = None
+        for x, y in tiles:
+            dados = self.tile(z, x, y)
+            if dados is None:
+                self.indisponiveis += 1
+                continue
+            imagens[x, y] = np.asarray(Image.open(io.BytesIO(dados)).convert("RGB"))
+            lado = imagens[x, y].shape[0]
+        lado = lado or 256
+
+        completo = np.empty((len(ys) * lado, len(xs) * lado, 3), dtype=np.uint8)
+        completo[:] = COR_INDISPONIVEL
+        for (x, y), imagem in imagens.items():
+            i, j = (y - ys[0]) * lado, (x - xs[0]) * lado
+            completo[i:i + lado, j:j + lado] = imagem
+
+        # Pixels do mosaico para cada coluna (linear em longitude) e linha (linear em latitude)
+        px0, py0 = tile_de(lon_min, lat_max, z)
+        px1, py1 = tile_de(lon_max, lat_min, z)
+        largura = max(int(round((px1 - px0) * lado)), 1)
+        altura = max(int(round((py1 - py0) * lado)), 1)
+
+        lons = lon_min + (np.arange(largura) + 0.5) * (lon_max - lon_min) / largura
+        lats = lat_max - (np.arange(altura) + 0.5) * (lat_max - lat_min) / altura
+        lats = np.radians(np.clip(lats, -LATITUDE_MAXIMA, LATITUDE_MAXIMA))
+
+        colunas = ((lons + 180) / 360 * 2**z - xs[0]) * lado
+        linhas = ((1 - np.arcsinh(np.tan(lats)) / np.pi) / 2 * 2**z - ys[0]) * lado
+        colunas = np.clip(colunas.astype(int), 0, completo.shape[1] - 1)
+        linhas = np.clip(linhas.astype(int), 0, completo.shape[0] - 1)
+
+        return completo[np.ix_(linhas, colunas)]
+
+    def desenhar(self, ax, zorder=0, **kwargs):
+        """
+        Desenha o mapa de fundo na área visível do eixo (em longitude e latitude).
+
+        Args:
+            ax: Eixo do matplotlib, com os limites já definidos
+            zorder: Camada da imagem, abaixo das ruas e dos marcadores (opcional)
+            **kwargs: Repassados para mosaico (z, limite_tiles)
+        """
+        lon_min, lon_max = ax.get_xlim()
+        lat_min, lat_max = ax.get_ylim()
+        imagem = self.mosaico(lon_min, lon_max, lat_min, lat_max, **kwargs)
+
+        ax.imshow(
+            imagem, extent=(lon_min, lon_max, lat_min, lat_max),
+            origin="upper", aspect=ax.get_aspect(), interpolation="antialiased", zorder=zorder,
+        )
+        ax.set_xlim(lon_min, lon_max)
+        ax.set_ylim(lat_min, lat_max)
+
+
+_cache_padrao = None
+
+
+def cache_padrao():
+    """
+    Retorna o cache no diretório padrão, com o OpenStreetMap como fonte, criado uma vez por processo.
+    """
+    global _cache_padrao
+    if _cache_padrao is None:
+        _cache_padrao = CacheDeTiles()
+    return _cache_padrao
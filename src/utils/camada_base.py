@@ -0,0 +1,217 @@
+"""
+Camada base pré-renderizada das ruas.
+
+Redesenhar todas as ruas da cidade a cada rota é a etapa mais lenta de um
+clique no aplicativo, embora elas nunca mudem. Este módulo contém a classe
+CamadaBase, que desenha as ruas uma única vez em ladrilhos (tiles) de
+imagem, por nível de zoom, e os reaproveita como fundo dos gráficos: a cada
+pedido só a rota, o usuário e os hemocentros são desenhados por cima.
+
+Os ladrilhos ficam em um cache em memória (LRU) e, se houver diretório, em
+disco, identificados pela versão (hash) do grafo, pelo estilo e pela posição.
+O disco usa o CacheDeTiles, com limite de tamanho: os ladrilhos usados há
+mais tempo são removidos primeiro.
+"""
+
+import hashlib
+import io
+import math
+from collections import OrderedDict
+
+import numpy as np
+import shapely
+from shapely.geometry import LineString
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from PIL import Image
+
+from utils.cache_tiles import CacheDeTiles
+
+# Largura de cada ladrilho em pixels e resolução usada para desenhá-lo
+LARGURA_LADRILHO = 512
+DPI_LADRILHO = 200
+
+# Quantidade aproximada de ladrilhos na largura da área visível
+LADRILHOS_POR_LARGURA = 4
+
+# Abaixo desta tolerância (em graus, cerca de meio metro) a simplificação não
+# reduz as geometrias do OSM, e os níveis de zoom compartilham a geometria completa
+TOLERANCIA_MINIMA = 5e-6
+
+# Tamanho máximo padrão dos ladrilhos guardados em disco
+LIMITE_DISCO = 128 * 2**20
+
+
+class CamadaBase:
+    """
+    Ruas de um Graph desenhadas em ladrilhos reaproveitáveis.
+
+    Os ladrilhos são quadrados em graus: no nível z, cada um cobre 360 / 2**z
+    graus de longitude e de latitude. A altura em pixels é corrigida pelo
+    cosseno da latitude, como o aspecto usado pelo osmnx nos gráficos.
+    """
+
+    def __init__(self, grafo, diretorio=None, limite_memoria=64, limite_disco=LIMITE_DISCO):
+        """
+        Args:
+            grafo: Graph cujas ruas serão desenhadas
+            diretorio: Diretório do cache em disco; None guarda só em memória (opcional)
+            limite_memoria: Quantidade máxima de ladrilhos no cache em memória (opcional)
+            limite_disco: Tamanho máximo, em bytes, do cache em disco (opcional)
+        """
+        self.grafo = grafo
+        self.diretorio = diretorio
+        self.limite_memoria = limite_memoria
+        self.disco = CacheDeTiles(diretorio, fonte=False, limite_bytes=limite_disco) if diretorio else None
+        self.cache = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+
+        csr = grafo.compilar()
+        self.cos_lat = math.cos(math.radians((float(csr.y.min()) + float(csr.y.max())) / 2))
+        self.limites = (float(csr.x.min()), float(csr.x.max()), float(csr.y.min()), float(csr.y.max()))
+        self._geometrias = None
+        self._niveis = {}
+
+    def __carregar_geometrias(self):
+        # Geometria completa de cada rua (as arestas sem geometria viram um segmento reto)
+        if self._geometrias is None:
+            nodes = self.grafo.graph.nodes
+            geometrias = [
+                dados['geometry'] if 'geometry' in dados
+                else LineString([(nodes[u]['x'], nodes[u]['y']), (nodes[v]['x'], nodes[v]['y'])])
+                for u, v, dados in self.grafo.graph.edges(data=True)
+            ]
+            self._geometrias = np.array(geometrias, dtype=object)
+        return self._geometrias
+
+    def __nivel_de_detalhe(self, z):
+        """
+        Ruas simplificadas para o nível de zoom z, calculadas uma vez por nível.
+
+        A tolerância é meio pixel do ladrilho: a simplificação (Douglas-Peucker)
+        não muda o desenho, mas reduz os vértices proporcionalmente ao zoom, e
+        ruas menores que a tolerância, invisíveis nesse nível, são descartadas.
+        Os níveis mais próximos que TOLERANCIA_MINIMA usam a geometria completa.
+
+        Returns:
+            tuple: (coordenadas de todos os vértices, início de cada rua em
+                    coordenadas, retângulo de cada rua [x_min, y_min, x_max, y_max])
+        """
+        tolerancia = 360 / 2**z / LARGURA_LADRILHO / 2
+        if tolerancia < TOLERANCIA_MINIMA:
+            z, tolerancia = None, 0.0
+
+        if z not in self._niveis:
+            geometrias = self.__carregar_geometrias()
+            caixas = shapely.bounds(geometrias)
+            visiveis = np.maximum(caixas[:, 2] - caixas[:, 0], caixas[:, 3] - caixas[:, 1]) >= tolerancia
+            simplificadas = geometrias[visiveis]
+            if tolerancia > 0:
+                simplificadas = shapely.simplify(simplificadas, tolerancia, preserve_topology=False)
+
+            coordenadas, ruas = shapely.get_coordinates(simplificadas, return_index=True)
+            inicios = np.searchsorted(ruas, np.arange(len(simplificadas) + 1))
+            self._niveis[z] = (coordenadas, inicios, caixas[visiveis])
+        return self._niveis[z]
+
+    def __chave(self, estilo, z, i, j):
+        # Identificador do ladrilho: versão do grafo, estilo e nível (o primeiro nível de
+        # diretórios no disco) e posição
+        versao = self.grafo.versao or f"memoria-{id(self.grafo)}"
+        estilo = hashlib.sha1(repr(sorted(estilo.items())).encode()).hexdigest()[:12]
+        return f"{versao[:16]}_{estilo}_{z}", i, j
+
+    def __desenhar_ladrilho(self, estilo, z, i, j):
+        # Desenha as ruas que cruzam o ladrilho (i, j) do nível z em uma imagem RGBA transparente
+        lado = 360 / 2**z
+        x0, y0 = i * lado, j * lado
+        altura = round(LARGURA_LADRILHO / self.cos_lat)
+
+        fig = Figure(figsize=(LARGURA_LADRILHO / DPI_LADRILHO, altura / DPI_LADRILHO), dpi=DPI_LADRILHO)
+        fig.patch.set_alpha(0)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.set_axis_off()
+        ax.set_xlim(x0, x0 + lado)
+        ax.set_ylim(y0, y0 + lado)
+
+        # Todas as ruas que cruzam o ladrilho em um único artista
+        coordenadas, inicios, caixas = self.__nivel_de_detalhe(z)
+        dentro = np.flatnonzero(
+            (caixas[:, 2] >= x0) & (caixas[:, 0] <= x0 + lado) &
+            (caixas[:, 3] >= y0) & (caixas[:, 1] <= y0 + lado)
+        )
+        if len(dentro):
+            ax.add_collection(LineCollection([coordenadas[inicios[k]:inicios[k + 1]] for k in dentro], **estilo))
+
+        canvas.draw()
+        return np.asarray(canvas.buffer_rgba()).copy()
+
+    def ladrilho(self, estilo, z, i, j):
+        """
+        Retorna a imagem RGBA de um ladrilho, do cache em memória, do disco ou desenhando-o.
+        """
+        chave = self.__chave(estilo, z, i, j)
+        if chave in self.cache:
+            self.cache.move_to_end(chave)
+            self.acertos += 1
+            return self.cache[chave]
+
+        dados = self.disco.tile(*chave) if self.disco is not None else None
+        if dados is not None:
+            imagem = np.asarray(Image.open(io.BytesIO(dados)).convert("RGBA"))
+            self.acertos += 1
+        else:
+            imagem = self.__desenhar_ladrilho(estilo, z, i, j)
+            self.falhas += 1
+            if self.disco is not None:
+                png = io.BytesIO()
+                Image.fromarray(imagem).save(png, format="PNG")
+                self.disco.guardar(*chave, png.getvalue())
+
+        self.cache[chave] = imagem
+        while len(self.cache) > self.limite_memoria:
+            self.cache.popitem(last=False)
+        return imagem
+
+    def desenhar(self, ax, x_min, x_max, y_min, y_max, zorder=1, **estilo):
+        """
+        Desenha as ruas da área visível como uma única imagem de fundo no eixo.
+
+        Args:
+            ax: Eixo do matplotlib (com os limites já definidos ou a definir)
+            x_min, x_max, y_min, y_max: Área visível, em graus
+            zorder: Camada da imagem; 1 fica acima de um mapa de fundo e abaixo dos marcadores (opcional)
+            **estilo: Estilo das linhas (color, linewidth, alpha...) usado na LineCollection
+        """
+        largura = max(x_max - x_min, 1e-9)
+        z = int(min(max(math.floor(math.log2(360 * LADRILHOS_POR_LARGURA / largura)), 0), 24))
+        lado = 360 / 2**z
+
+        i0, i1 = math.floor(x_min / lado), math.floor(x_max / lado)
+        j0, j1 = math.floor(y_min / lado), math.floor(y_max / lado)
+
+        # Monta o mosaico: linhas de cima para baixo (latitude decrescente)
+        mosaico = np.concatenate([
+            np.concatenate([self.ladrilho(estilo, z, i, j) for i in range(i0, i1 + 1)], axis=1)
+            for j in range(j1, j0 - 1, -1)
+        ], axis=0)
+
+        # Recorta o mosaico à área visível (em pixels inteiros), para não reamostrar o excesso
+        px = LARGURA_LADRILHO / lado
+        py = mosaico.shape[0] / ((j1 - j0 + 1) * lado)
+        c0 = math.floor((x_min - i0 * lado) * px)
+        c1 = math.ceil((x_max - i0 * lado) * px)
+        l0 = math.floor(((j1 + 1) * lado - y_max) * py)
+        l1 = math.ceil(((j1 + 1) * lado - y_min) * py)
+        mosaico = mosaico[l0:l1, c0:c1]
+
+        ax.imshow(
+            mosaico,
+            extent=(i0 * lado + c0 / px, i0 * lado + c1 / px, (j1 + 1) * lado - l1 / py, (j1 + 1) * lado - l0 / py),
+            origin="upper", aspect="auto", interpolation="antialiased", zorder=zorder,
+        )
+        ax.set_xlim(x_min, x_max)
+        ax.set_ylim(y_min, y_max)
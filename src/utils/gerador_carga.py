@@ -0,0 +1,178 @@
+"""
+Gerador de carga para o serviço HTTP de roteamento (servico.py).
+
+Abre várias conexões keep-alive com o serviço e envia pedidos GET /rota
+sorteados de um conjunto fixo de pontos dentro da caixa do grafo (obtida em
+/saude) e de tipos sanguíneos. Como os pontos se repetem, pedidos idênticos
+chegam ao mesmo tempo e exercitam a coalescência do serviço; com um conjunto
+grande de pontos, a carga é dominada por cálculos distintos.
+
+Uso pela linha de comando (a partir de src/, com o serviço no ar):
+
+    python3 -m utils.gerador_carga --url http://127.0.0.1:8080 --conexoes 32 --pedidos 2000
+
+Ao final, mostra a vazão, os percentis de latência vistos pelos clientes, a
+contagem de respostas por código HTTP e as métricas do próprio serviço.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from urllib.parse import urlsplit, urlencode
+
+import numpy as np
+
+from utils.helper_functions import TIPOS_SANGUINEOS
+
+
+class Conexao:
+    """
+    Conexão HTTP/1.1 keep-alive com o serviço, reaberta se o servidor a fechar.
+    """
+
+    def __init__(self, host, porta):
+        self.host = host
+        self.porta = porta
+        self.leitor = None
+        self.escritor = None
+
+    async def pedir(self, metodo, alvo, corpo=None):
+        """
+        Envia uma requisição e retorna (status, resposta JSON).
+        """
+        if self.escritor is None:
+            self.leitor, self.escritor = await asyncio.open_connection(self.host, self.porta)
+
+        dados = json.dumps(corpo).encode() if corpo is not None else b""
+        self.escritor.write(
+            f"{metodo} {alvo} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(dados)}\r\n\r\n".encode("latin-1")
+            + dados
+        )
+        await self.escritor.drain()
+
+        status = int((await self.leitor.readline()).split()[1])
+        cabecalhos = {}
+        while (linha := await self.leitor.readline()) not in (b"\r\n", b"\n", b""):
+            nome, _, valor = linha.decode("latin-1").partition(":")
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        resposta = json.loads(await self.leitor.readexactly(int(cabecalhos.get("content-length", 0))))
+
+        if cabecalhos.get("connection", "").lower() == "close":
+            self.fechar()
+        return status, resposta
+
+    def fechar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+        self.leitor = self.escritor = None
+
+
+async def gerar_carga(url, conexoes=16, pedidos=1000, duracao=None, pontos=200, algoritmo="A*", semente=0):
+    '''
+    Envia pedidos de rota ao serviço a partir de várias conexões simultâneas.
+
+    Args:
+        url: endereço do serviço, como http://127.0.0.1:8080
+        conexoes: quantidade de clientes simultâneos, cada um com uma conexão (opcional)
+        pedidos: total de pedidos enviados (opcional, ignorado com duracao)
+        duracao: tempo da carga, em segundos; None envia exatamente `pedidos` (opcional)
+        pontos: quantidade de pares (ponto, tipo) distintos sorteados (opcional)
+        algoritmo: algoritmo pedido ao serviço (opcional)
+        semente: semente do sorteio dos pontos (opcional)
+
+    Returns:
+        dict: vazão (pedidos/s), latências (ms) p50/p90/p99/máxima, contagem por
+              código HTTP, duração e as métricas do serviço ao final
+    '''
+    endereco = urlsplit(url)
+    host, porta = endereco.hostname, endereco.port or 80
+
+    controle = Conexao(host, porta)
+    _, saude = await controle.pedir("GET", "/saude")
+    lon_min, lat_min, lon_max, lat_max = saude["caixa"]
+
+    rng = random.Random(semente)
+    alvos = [
+        "/rota?" + urlencode({
+            "lat": rng.uniform(lat_min, lat_max),
+            "lon": rng.uniform(lon_min, lon_max),
+            "tipo": rng.choice(TIPOS_SANGUINEOS),
+            "algoritmo": algoritmo,
+        })
+        for _ in range(pontos)
+    ]
+
+    latencias = []
+    codigos = Counter()
+    restantes = pedidos
+    fim = time.perf_counter() + duracao if duracao is not None else None
+
+    async def cliente(i):
+        nonlocal restantes
+        conexao = Conexao(host, porta)
+        sorteio = random.Random(semente * 1000 + i + 1)
+        try:
+            while (time.perf_counter() < fim) if fim is not None else restantes > 0:
+                restantes -= 1
+                inicio = time.perf_counter()
+                try:
+                    status, _ = await conexao.pedir("GET", sorteio.choice(alvos))
+                except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    conexao.fechar()
+                    status = "falha"
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                codigos[status] += 1
+        finally:
+            conexao.fechar()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(i) for i in range(conexoes)))
+    total = time.perf_counter() - inicio
+
+    _, metricas = await controle.pedir("GET", "/metricas")
+    controle.fechar()
+
+    latencias = np.array(latencias)
+    return {
+        "pedidos": len(latencias),
+        "duracao": total,
+        "vazao": len(latencias) / total if total else None,
+        "p50_ms": float(np.percentile(latencias, 50)) if len(latencias) else None,
+        "p90_ms": float(np.percentile(latencias, 90)) if len(latencias) else None,
+        "p99_ms": float(np.percentile(latencias, 99)) if len(latencias) else None,
+        "maximo_ms": float(latencias.max()) if len(latencias) else None,
+        "codigos": {str(codigo): quantidade for codigo, quantidade in sorted(codigos.items(), key=str)},
+        "servico": metricas,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gerador de carga para o serviço HTTP de roteamento.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--conexoes", type=int, default=16, help="clientes simultâneos")
+    parser.add_argument("--pedidos", type=int, default=1000, help="total de pedidos")
+    parser.add_argument("--duracao", type=float, default=None, help="segundos de carga (no lugar de --pedidos)")
+    parser.add_argument("--pontos", type=int, default=200, help="pares (ponto, tipo) distintos")
+    parser.add_argument("--algoritmo", default="A*")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    resultado = asyncio.run(gerar_carga(
+        args.url, args.conexoes, args.pedidos, args.duracao, args.pontos, args.algoritmo, args.semente
+    ))
+    servico = resultado.pop("servico")
+    print(f"{resultado['pedidos']} pedidos em {resultado['duracao']:.2f} s ({resultado['vazao']:.1f} pedidos/s)")
+    print(f"latência (ms): p50 {resultado['p50_ms']:.2f}  p90 {resultado['p90_ms']:.2f}  "
+          f"p99 {resultado['p99_ms']:.2f}  máx {resultado['maximo_ms']:.2f}")
+    print(f"códigos: {resultado['codigos']}")
+    print(f"serviço: {servico['calculos']} cálculos, {servico['coalescidos']} coalescidos, "
+          f"{servico['recusados']} recusados, {servico['erros']} erros")
+    if servico["cache"] is not None:
+        cache = servico["cache"]
+        print(f"cache: {cache['entradas']} rotas, taxa de acertos {cache['taxa_acertos'] or 0:.1%}, "
+              f"{cache['invalidadas']} invalidadas, {cache['memoria_bytes'] / 1024:.0f} KiB")
+    for nome, latencia in servico["latencias"].items():
+        print(f"  {nome}: {latencia['total']} medidas, p50 {latencia['p50_ms']:.2f} ms, p99 {latencia['p99_ms']:.2f} ms")
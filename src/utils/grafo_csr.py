@@ -0,0 +1,326 @@
+"""
+Representação compacta (CSR) do grafo de ruas.
+
+Este módulo contém a classe GrafoCSR, que compila o MultiDiGraph do NetworkX
+carregado a partir do GraphML em arrays contíguos (Compressed Sparse Row):
+índices densos para os nós, vetores de offsets, alvos e pesos para as arestas
+e vetores de coordenadas. As buscas percorrem esses arrays em vez dos
+dicionários aninhados do NetworkX.
+
+Como as arestas paralelas são colapsadas na de menor custo, o CSR também é a
+tabela de arestas do grafo: para cada par (u, v), guarda o custo e a chave da
+aresta paralela mais barata, usadas igualmente pelas buscas, pela soma da
+distância das rotas e pelo desenho da geometria.
+"""
+
+import os
+import weakref
+import numpy as np
+
+# Arrays que compõem o grafo, salvos um por arquivo .npy no snapshot
+ARRAYS = ("ids", "offsets", "alvos", "pesos", "chaves", "x", "y")
+
+
+class GrafoCSR:
+    """
+    Grafo de ruas em formato CSR.
+
+    Os vizinhos do nó de índice i são alvos[offsets[i]:offsets[i + 1]], com os
+    respectivos custos em pesos[offsets[i]:offsets[i + 1]]. Arestas paralelas
+    são colapsadas na de menor custo, como já era feito pelo A*, e a chave da
+    aresta escolhida fica em chaves[offsets[i]:offsets[i + 1]].
+
+    Os índices densos seguem a ordem crescente dos IDs dos nós, de forma que
+    desempates por índice na fila de prioridade equivalem a desempates por ID,
+    e a ordem dos vizinhos de cada nó é a mesma do NetworkX. Assim, as buscas
+    retornam exatamente os mesmos caminhos nos dois formatos.
+    """
+
+    def __init__(self, ids, offsets, alvos, pesos, x, y, indice=None, chaves=None):
+        """
+        Args:
+            ids: Array com o ID original de cada índice denso
+            offsets: Array (n + 1) com o início das arestas de cada nó
+            alvos: Array com o índice denso do destino de cada aresta
+            pesos: Array com o custo de cada aresta
+            x: Array com a longitude de cada nó
+            y: Array com a latitude de cada nó
+            indice: Mapa ID -> índice denso já construído (opcional)
+            chaves: Array com a chave (no MultiDiGraph) de cada aresta; None usa 0 (opcional)
+        """
+        self.ids = ids
+        self.offsets = offsets
+        self.alvos = alvos
+        self.pesos = pesos
+        self.chaves = np.zeros(len(alvos), dtype=np.int64) if chaves is None else chaves
+        self.x = x
+        self.y = y
+
+        # Mapeia o ID original de cada nó para o seu índice denso
+        if indice is None:
+            indice = {no: i for i, no in enumerate(ids.tolist())}
+        self.indice = indice
+
+        # Coordenadas em radianos e grafo transposto, calculados uma única vez sob demanda
+        self._radianos = None
+        self._transposto = None
+
+    @classmethod
+    def de_networkx(cls, grafo, weight="length"):
+        """
+        Compila um grafo do NetworkX para o formato CSR.
+
+        Args:
+            grafo: Grafo do NetworkX (com atributos 'x' e 'y' nos nós)
+            weight: Atributo das arestas usado como custo (opcional)
+
+        Returns:
+            GrafoCSR: Grafo compilado
+        """
+        ids = sorted(grafo.nodes)
+        indice = {no: i for i, no in enumerate(ids)}
+
+        offsets = [0]
+        alvos = []
+        pesos = []
+        chaves = []
+        for no in ids:
+            for vizinho, arestas in grafo.adj[no].items():
+                # Entre arestas paralelas, fica a de menor custo (a primeira, em caso de empate)
+                if grafo.is_multigraph():
+                    chave, custo = min(
+                        ((c, attr.get(weight, 0)) for c, attr in arestas.items()), key=lambda item: item[1]
+                    )
+                else:
+                    chave, custo = 0, arestas.get(weight, 0)
+                alvos.append(indice[vizinho])
+                pesos.append(custo)
+                chaves.append(chave)
+            offsets.append(len(alvos))
+
+        tipo_indice = np.int32 if len(ids) < 2**31 else np.int64
+        return cls(
+            ids=np.array(ids),
+            offsets=np.array(offsets, dtype=np.int64),
+            alvos=np.array(alvos, dtype=tipo_indice),
+            pesos=np.array(pesos, dtype=np.float64),
+            chaves=np.array(chaves, dtype=np.int64),
+            x=np.array([grafo.nodes[no]['x'] for no in ids], dtype=np.float64),
+            y=np.array([grafo.nodes[no]['y'] for no in ids], dtype=np.float64),
+        )
+
+    @classmethod
+    def de_arestas(cls, origens, destinos, pesos, x, y, ids=None):
+        """
+        Monta um grafo CSR diretamente a partir de arrays de arestas, sem passar
+        pelo NetworkX (usado, por exemplo, pelos grafos sintéticos do benchmark).
+
+        Args:
+            origens: Índice denso da origem de cada aresta
+            destinos: Índice denso do destino de cada aresta
+            pesos: Custo de cada aresta
+            x: Longitude de cada nó
+            y: Latitude de cada nó
+            ids: ID de cada nó, em ordem crescente; None usa os próprios índices (opcional)
+
+        Returns:
+            GrafoCSR: Grafo montado, com as arestas paralelas colapsadas na de menor custo
+        """
+        n = len(x)
+        origens = np.asarray(origens, dtype=np.int64)
+        destinos = np.asarray(destinos, dtype=np.int64)
+        pesos = np.asarray(pesos, dtype=np.float64)
+
+        # Ordena por origem, destino e custo; a primeira de cada par (origem, destino) é a mais barata
+        ordem = np.lexsort((pesos, destinos, origens))
+        origens, destinos, pesos = origens[ordem], destinos[ordem], pesos[ordem]
+        primeira = np.ones(len(origens), dtype=bool)
+        primeira[1:] = (origens[1:] != origens[:-1]) | (destinos[1:] != destinos[:-1])
+        origens, destinos, pesos = origens[primeira], destinos[primeira], pesos[primeira]
+
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(origens, minlength=n), out=offsets[1:])
+
+        tipo_indice = np.int32 if n < 2**31 else np.int64
+        return cls(
+            ids=np.arange(n, dtype=np.int64) if ids is None else np.asarray(ids),
+            offsets=offsets,
+            alvos=destinos.astype(tipo_indice),
+            pesos=pesos,
+            x=np.asarray(x, dtype=np.float64),
+            y=np.asarray(y, dtype=np.float64),
+        )
+
+    def salvar(self, diretorio):
+        """
+        Salva os arrays do grafo em arquivos .npy (um por array) no diretório.
+        """
+        os.makedirs(diretorio, exist_ok=True)
+        for nome in ARRAYS:
+            np.save(os.path.join(diretorio, nome + ".npy"), np.asarray(getattr(self, nome)))
+
+    @classmethod
+    def carregar(cls, diretorio, mmap=True):
+        """
+        Carrega um grafo salvo com salvar().
+
+        Com mmap=True os arrays são mapeados em memória (somente leitura): o
+        carregamento é praticamente instantâneo e vários processos que abrem o
+        mesmo snapshot compartilham as mesmas páginas do sistema operacional.
+
+        Args:
+            diretorio: Diretório com os arquivos .npy
+            mmap: Se True, mapeia os arquivos em vez de lê-los (opcional)
+
+        Returns:
+            GrafoCSR: Grafo carregado
+        """
+        modo = "r" if mmap else None
+        arrays = {
+            nome: np.load(os.path.join(diretorio, nome + ".npy"), mmap_mode=modo)
+            for nome in ARRAYS
+        }
+        return cls(**arrays)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def numero_arestas(self):
+        return len(self.alvos)
+
+    def radianos(self):
+        """
+        Retorna as latitudes, longitudes e cossenos das latitudes em radianos,
+        pré-calculados uma única vez para todas as consultas.
+
+        Returns:
+            tuple: (lat, lon, cos_lat), arrays indexados pelo índice denso
+        """
+        if self._radianos is None:
+            lat = np.radians(self.y)
+            self._radianos = (lat, np.radians(self.x), np.cos(lat))
+        return self._radianos
+
+    def transposto(self):
+        """
+        Retorna o grafo com todas as arestas invertidas (v -> u para cada u -> v),
+        usado pelas buscas que partem dos destinos em direção à origem.
+
+        Returns:
+            GrafoCSR: Grafo transposto, com os mesmos índices densos
+        """
+        if self._transposto is None:
+            n = len(self)
+            origens = np.repeat(np.arange(n, dtype=self.alvos.dtype), np.diff(self.offsets))
+            ordem = np.argsort(self.alvos, kind="stable")
+            offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.alvos, minlength=n), out=offsets[1:])
+            self._transposto = GrafoCSR(
+                self.ids, offsets, origens[ordem], self.pesos[ordem],
+                self.x, self.y, indice=self.indice, chaves=self.chaves[ordem],
+            )
+            self._transposto._transposto = self
+        return self._transposto
+
+    def vizinhos(self, i):
+        """
+        Retorna pares (índice do vizinho, custo) das arestas que saem do nó i.
+        """
+        ini, fim = self.offsets[i:i + 2].tolist()
+        return zip(self.alvos[ini:fim].tolist(), self.pesos[ini:fim].tolist())
+
+    def aresta(self, i, j):
+        """
+        Retorna a posição (nos arrays alvos, pesos e chaves) da aresta i -> j.
+
+        Raises:
+            KeyError: Se não existir aresta de i para j
+        """
+        ini, fim = self.offsets[i:i + 2].tolist()
+        posicoes = np.flatnonzero(self.alvos[ini:fim] == j)
+        if not len(posicoes):
+            raise KeyError((i, j))
+        return ini + int(posicoes[0])
+
+    def custo_caminho(self, indices):
+        """
+        Soma, da esquerda para a direita como o NetworkX, os custos das arestas de um
+        caminho dado em índices densos.
+        """
+        pesos = self.pesos
+        return sum(pesos[self.aresta(u, v)].item() for u, v in zip(indices[:-1], indices[1:]))
+
+    def indices(self, nos):
+        """
+        Converte uma sequência de IDs originais em índices densos.
+        """
+        return [self.indice[no] for no in nos]
+
+    def nos(self, indices):
+        """
+        Converte uma sequência de índices densos em IDs originais.
+        """
+        return self.ids[list(indices)].tolist()
+
+
+def funcao_vizinhos(grafo, weight="length"):
+    """
+    Retorna uma função que, dado um nó, itera sobre pares (vizinho, custo).
+
+    Permite que as buscas percorram da mesma forma um GrafoCSR (nós como
+    índices densos) ou um grafo do NetworkX (nós como IDs originais). No
+    NetworkX, arestas paralelas são colapsadas na de menor custo, usando a
+    tabela de tabela_vizinhos.
+
+    Args:
+        grafo: GrafoCSR ou grafo do NetworkX
+        weight: Atributo das arestas usado como custo no NetworkX (opcional)
+
+    Returns:
+        function: Função vizinhos(no) -> iterável de (vizinho, custo)
+    """
+    if isinstance(grafo, GrafoCSR):
+        return grafo.vizinhos
+
+    adj = grafo.adj
+    if grafo.is_multigraph():
+        # Os custos mínimos entre arestas paralelas são calculados uma vez por grafo
+        tabela = tabela_vizinhos(grafo, weight)
+        return tabela.__getitem__
+    else:
+        def vizinhos(no):
+            for vizinho, attr in adj[no].items():
+                yield vizinho, attr.get(weight, 0)
+    return vizinhos
+
+
+# Tabelas de vizinhos dos grafos do NetworkX já consultados, por grafo e atributo de custo
+_tabelas = weakref.WeakKeyDictionary()
+
+
+def tabela_vizinhos(grafo, weight="length"):
+    """
+    Retorna, para um MultiDiGraph do NetworkX, a lista de (vizinho, menor custo)
+    de cada nó, calculada uma única vez por grafo e atributo de custo, em vez de
+    percorrer as arestas paralelas a cada relaxação.
+
+    Assim como o GrafoCSR, a tabela supõe que o grafo não é alterado depois da
+    primeira consulta.
+
+    Args:
+        grafo: Grafo do NetworkX
+        weight: Atributo das arestas usado como custo (opcional)
+
+    Returns:
+        dict: Mapa nó -> lista de (vizinho, custo), na ordem de adjacência do NetworkX
+    """
+    por_atributo = _tabelas.setdefault(grafo, {})
+    if weight not in por_atributo:
+        por_atributo[weight] = {
+            no: [
+                (vizinho, min(attr.get(weight, 0) for attr in arestas.values()))
+                for vizinho, arestas in adjacencia.items()
+            ]
+            for no, adjacencia in grafo.adj.items()
+        }
+    return por_atributo[weight]
@@ -0,0 +1,140 @@
+"""
+Grafos de ruas sintéticos para testes de desempenho.
+
+Este módulo gera, diretamente no formato GrafoCSR, malhas viárias de tamanho
+arbitrário (de milhares a milhões de nós) em torno de São Carlos: uma grade
+urbana com pequenas irregularidades e um grafo geométrico aleatório (cada
+ponto ligado aos seus vizinhos mais próximos). Em ambos, parte das ruas é de
+mão única e o comprimento de cada rua é a distância Haversine entre as pontas
+multiplicada por um fator >= 1, de modo que a heurística do A* continua
+admissível. A geração é determinística para uma mesma semente.
+"""
+
+import numpy as np
+import networkx as nx
+from utils.grafo_csr import GrafoCSR
+from algorithms.heuristicas import R
+
+# Canto sudoeste das malhas (longitude, latitude), próximo a São Carlos - SP
+ORIGEM = (-47.95, -22.05)
+
+# Distância média entre cruzamentos, em graus (cerca de 100 m)
+ESPACAMENTO = 0.001
+
+
+def _haversine(x1, y1, x2, y2):
+    # Distância Haversine vetorizada, em metros
+    lat1, lat2 = np.radians(y1), np.radians(y2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(np.radians(x2 - x1) / 2) ** 2
+    return 2 * R * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _ruas(pares, x, y, rng, mao_unica):
+    # Transforma pares de nós em arestas dirigidas: uma parte vira mão única (em um sentido
+    # sorteado) e as demais têm os dois sentidos com o mesmo comprimento
+    u, v = pares[:, 0], pares[:, 1]
+    comprimento = _haversine(x[u], y[u], x[v], y[v]) * rng.uniform(1.0, 1.3, len(u))
+
+    unica = rng.random(len(u)) < mao_unica
+    invertida = unica & (rng.random(len(u)) < 0.5)
+    ida_u = np.where(invertida, v, u)
+    ida_v = np.where(invertida, u, v)
+
+    dupla = ~unica
+    origens = np.concatenate([ida_u, v[dupla]])
+    destinos = np.concatenate([ida_v, u[dupla]])
+    pesos = np.concatenate([comprimento, comprimento[dupla]])
+    return GrafoCSR.de_arestas(origens, destinos, pesos, x, y)
+
+
+def grade(n, semente=0, remocao=0.1, mao_unica=0.15):
+    """
+    Gera uma grade urbana com cerca de n nós.
+
+    Args:
+        n: Quantidade aproximada de nós (a grade tem round(sqrt(n))² nós)
+        semente: Semente do gerador aleatório (opcional)
+        remocao: Fração de quarteirões sem ligação (opcional)
+        mao_unica: Fração das ruas de mão única (opcional)
+
+    Returns:
+        GrafoCSR: Grafo gerado
+    """
+    rng = np.random.default_rng(semente)
+    lado = max(int(round(np.sqrt(n))), 2)
+    linha, coluna = np.divmod(np.arange(lado * lado), lado)
+
+    # Cruzamentos levemente deslocados da grade perfeita
+    x = ORIGEM[0] + (coluna + rng.uniform(-0.2, 0.2, lado * lado)) * ESPACAMENTO
+    y = ORIGEM[1] + (linha + rng.uniform(-0.2, 0.2, lado * lado)) * ESPACAMENTO
+
+    # Ruas horizontais e verticais entre cruzamentos vizinhos, com algumas removidas
+    nos = np.arange(lado * lado)
+    horizontais = nos[coluna < lado - 1]
+    verticais = nos[linha < lado - 1]
+    pares = np.concatenate([
+        np.column_stack([horizontais, horizontais + 1]),
+        np.column_stack([verticais, verticais + lado]),
+    ])
+    pares = pares[rng.random(len(pares)) >= remocao]
+    return _ruas(pares, x, y, rng, mao_unica)
+
+
+def geometrico_aleatorio(n, semente=0, vizinhos=3, mao_unica=0.15):
+    """
+    Gera um grafo geométrico aleatório com n nós, na mesma densidade da grade.
+
+    Cada ponto é ligado aos seus vizinhos mais próximos, o que produz uma
+    malha irregular, com ruas de comprimentos variados e algumas regiões
+    desconectadas.
+
+    Args:
+        n: Quantidade de nós
+        semente: Semente do gerador aleatório (opcional)
+        vizinhos: Quantidade de vizinhos mais próximos ligados a cada ponto (opcional)
+        mao_unica: Fração das ruas de mão única (opcional)
+
+    Returns:
+        GrafoCSR: Grafo gerado
+    """
+    from sklearn.neighbors import KDTree
+
+    rng = np.random.default_rng(semente)
+    largura = np.sqrt(n) * ESPACAMENTO
+    x = ORIGEM[0] + rng.uniform(0, largura, n)
+    y = ORIGEM[1] + rng.uniform(0, largura, n)
+
+    # Vizinhos mais próximos em coordenadas aproximadamente métricas
+    cos_lat = np.cos(np.radians(ORIGEM[1]))
+    _, mais_proximos = KDTree(np.column_stack([x * cos_lat, y])).query(
+        np.column_stack([x * cos_lat, y]), k=vizinhos + 1
+    )
+
+    # Cada par de vizinhos vira uma única rua, independentemente de quem escolheu quem
+    pares = np.column_stack([np.repeat(np.arange(n), vizinhos), mais_proximos[:, 1:].ravel()])
+    pares = np.unique(np.sort(pares, axis=1), axis=0)
+    return _ruas(pares, x, y, rng, mao_unica)
+
+
+def para_networkx(grafo):
+    """
+    Converte um GrafoCSR em um MultiDiGraph do NetworkX com 'x', 'y' e 'length',
+    no mesmo formato dos grafos do osmnx.
+
+    Args:
+        grafo: GrafoCSR
+
+    Returns:
+        networkx.MultiDiGraph: Grafo equivalente
+    """
+    resultado = nx.MultiDiGraph(crs="epsg:4326")
+    ids = grafo.ids.tolist()
+    resultado.add_nodes_from(
+        (no, {"x": x, "y": y}) for no, x, y in zip(ids, grafo.x.tolist(), grafo.y.tolist())
+    )
+    origens = np.repeat(np.arange(len(ids)), np.diff(grafo.offsets))
+    resultado.add_edges_from(
+        (ids[u], ids[v], {"length": w})
+        for u, v, w in zip(origens.tolist(), np.asarray(grafo.alvos).tolist(), np.asarray(grafo.pesos).tolist())
+    )
+    return resultado
@@ -1,25 +1,221 @@
 import osmnx as ox
 import networkx as nx
 import random
+import numpy as np
+from collections import namedtuple
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+from shapely.geometry import LineString
+import os
+import shutil
+import tempfile
+from utils.grafo_csr import GrafoCSR
+import utils.snapshot as snapshot_utils
+from algorithms.hierarquia_contracao import HierarquiaDeContracao
+from algorithms.dijkstra import dijkstra_multi_alvo
+from algorithms.caminhos import reconstruir_caminho
+from utils.camada_base import CamadaBase
+from utils.cache_tiles import cache_padrao
+from utils.indice_espacial import IndiceEspacial
+import math
+
+# Memória aproximada (em bytes) ocupada pelo grafo do NetworkX carregado, por nó, por aresta
+# e por ponto das geometrias das ruas (medida com o osmnx)
+BYTES_POR_NO = 600
+BYTES_POR_ARESTA = 650
+BYTES_POR_PONTO = 16
 
 # Classe que representa o grafo da cidade escolhida
 class Graph:
 
-    # Inicia e mantém na memória o grafo em OSMNX e GDF
-    def __init__(self, graphml_file):
-
-        # Esse formato usamos para cálculos
-        self.graph = ox.load_graphml(graphml_file)
-
-        # Esse formato usamos para plotar no mapa
-        self.nodes_gdf, self.edges_gdf = ox.graph_to_gdfs(self.graph)
-    
-
-    # Retorna n nós aleatórios do grafo em uma lista
+    # Inicia e mantém na memória o grafo em OSMNX; os GDFs só são montados quando usados
+    def __init__(self, graphml_file, snapshot=True, colunas_nos=None, colunas_arestas=None):
+
+        self.graphml_file = graphml_file
+        self._graph = None
+        self._hierarquia = None
+        self._camada_base = None
+        self._indice_espacial = None
+        self._memoria_grafo = None
+
+        # Esse formato usamos para plotar no mapa. Colunas None mantêm todas as colunas;
+        # para plotagem bastam, por exemplo, ("geometry", "length") nas arestas
+        self._nodes_gdf = None
+        self._edges_gdf = None
+        self.colunas_nos = colunas_nos
+        self.colunas_arestas = colunas_arestas
+
+        # Formatos compactos (CSR) usados pelas buscas, um por atributo de custo
+        self.compilados = {}
+
+        # Com snapshot, o grafo é mapeado dos arrays salvos em vez de reinterpretar o
+        # GraphML; a versão identifica o conteúdo do arquivo de origem
+        self.versao = snapshot_utils.validar_snapshot(graphml_file) if snapshot else None
+        if self.versao is not None:
+            self.compilados["length"] = snapshot_utils.carregar_csr(graphml_file)
+        elif snapshot:
+            self.versao = snapshot_utils.salvar_snapshot(graphml_file, self.graph, self.compilar())
+
+
+    # Esse formato usamos para cálculos; lido do snapshot ou do GraphML na primeira vez que é usado
+    @property
+    def graph(self):
+        if self._graph is None:
+            if self.versao is not None:
+                self._graph = snapshot_utils.carregar_grafo(self.graphml_file)
+            if self._graph is None:
+                self._graph = ox.load_graphml(self.graphml_file)
+        return self._graph
+
+
+    # GDF dos nós, montado no primeiro acesso (sem montar o das arestas)
+    @property
+    def nodes_gdf(self):
+        if self._nodes_gdf is None:
+            gdf = ox.graph_to_gdfs(self.graph, edges=False)
+            if self.colunas_nos is not None:
+                gdf = gdf[list(self.colunas_nos)]
+            self._nodes_gdf = gdf
+        return self._nodes_gdf
+
+
+    # GDF das arestas, montado no primeiro acesso (sem montar o dos nós)
+    @property
+    def edges_gdf(self):
+        if self._edges_gdf is None:
+            gdf = ox.graph_to_gdfs(self.graph, nodes=False)
+            if self.colunas_arestas is not None:
+                gdf = gdf[list(self.colunas_arestas)]
+            self._edges_gdf = gdf
+        return self._edges_gdf
+
+
+    # Libera os GDFs (por exemplo, sob pressão de memória); serão remontados se usados de novo
+    def liberar_gdfs(self, nos=True, arestas=True):
+        if nos:
+            self._nodes_gdf = None
+        if arestas:
+            self._edges_gdf = None
+
+
+    # Cria um Graph a partir de um grafo do NetworkX já em memória (por exemplo, a união
+    # de duas cidades vizinhas), sem arquivo GraphML nem snapshot
+    @classmethod
+    def de_networkx(cls, grafo, nome="<memória>"):
+        instancia = cls(nome, snapshot=False)
+        instancia._graph = grafo
+        return instancia
+
+
+    # Memória aproximada ocupada pelo grafo, em bytes: arrays compilados, grafo do NetworkX
+    # (se carregado), GDFs (se montados) e estruturas auxiliares já construídas
+    def memoria_estimada(self):
+        total = sum(
+            getattr(csr, nome).nbytes
+            for csr in self.compilados.values()
+            for nome in ("ids", "offsets", "alvos", "pesos", "chaves", "x", "y")
+        )
+        if self._graph is not None:
+            if self._memoria_grafo is None:
+                pontos = sum(
+                    len(dados['geometry'].coords) for _, _, dados in self._graph.edges(data=True) if 'geometry' in dados
+                )
+                self._memoria_grafo = (
+                    self._graph.number_of_nodes() * BYTES_POR_NO
+                    + self._graph.number_of_edges() * BYTES_POR_ARESTA
+                    + pontos * BYTES_POR_PONTO
+                )
+            total += self._memoria_grafo
+        for gdf in (self._nodes_gdf, self._edges_gdf):
+            if gdf is not None:
+                total += int(gdf.memory_usage(deep=True).sum())
+        if self._indice_espacial is not None:
+            indice = self._indice_espacial
+            total += sum(a.nbytes for a in (indice.inicios, indice.fins, indice.arestas, indice.deslocamentos, indice.tamanhos))
+        return total
+
+
+    # Compila o grafo para o formato CSR (arrays), mais rápido para as buscas
+    def compilar(self, weight="length"):
+        if weight not in self.compilados:
+            self.compilados[weight] = GrafoCSR.de_networkx(self.graph, weight=weight)
+        return self.compilados[weight]
+
+
+    # Hierarquia de contração do grafo, para consultas de caminho mínimo muito rápidas.
+    # Fica salva no diretório do snapshot (e é descartada junto com ele se o GraphML mudar)
+    def hierarquia_de_contracao(self):
+        if self._hierarquia is None:
+            diretorio = os.path.join(snapshot_utils.diretorio_snapshot(self.graphml_file), "ch")
+            if self.versao is not None and os.path.isdir(diretorio):
+                self._hierarquia = HierarquiaDeContracao.carregar(diretorio, self.compilar())
+            else:
+                self._hierarquia = HierarquiaDeContracao.construir(self.compilar())
+                if self.versao is not None:
+                    # Montada em um diretório temporário próprio e só então movida para o lugar,
+                    # como o snapshot; se outro processo gravou a dele antes, vale a dele
+                    temporario = tempfile.mkdtemp(dir=os.path.dirname(diretorio), prefix="ch.")
+                    try:
+                        self._hierarquia.salvar(temporario)
+                        os.replace(temporario, diretorio)
+                    except OSError:
+                        shutil.rmtree(temporario, ignore_errors=True)
+                        if os.path.isdir(diretorio):
+                            self._hierarquia = HierarquiaDeContracao.carregar(diretorio, self.compilar())
+        return self._hierarquia
+
+
+    # Ruas pré-renderizadas em ladrilhos, usadas como fundo dos gráficos.
+    # Com snapshot, os ladrilhos também ficam salvos em disco junto dele
+    def camada_base(self):
+        if self._camada_base is None:
+            diretorio = None
+            if self.versao is not None:
+                diretorio = os.path.join(snapshot_utils.diretorio_snapshot(self.graphml_file), "camadas")
+            self._camada_base = CamadaBase(self, diretorio)
+        return self._camada_base
+
+
+    # Índice espacial dos nós e das ruas (com a geometria real de cada aresta), para ajustar
+    # coordenadas (longitude, latitude) ao grafo. Montado uma única vez
+    def indice_espacial(self):
+        if self._indice_espacial is None:
+            csr = self.compilar()
+            self._indice_espacial = IndiceEspacial(csr, self.__arestas_para_indice(csr))
+        return self._indice_espacial
+
+
+    # Arestas com a geometria, em índices densos; o sentido inverso de uma rua de mão
+    # dupla (mesma geometria percorrida ao contrário) não é indexado de novo
+    def __arestas_para_indice(self, csr):
+        grafo = self.graph
+        chaves = grafo.edges(keys=True, data=True) if grafo.is_multigraph() else (
+            (u, v, 0, dados) for u, v, dados in grafo.edges(data=True)
+        )
+        for u, v, chave, dados in chaves:
+            if u == v:
+                continue
+            coords = list(dados['geometry'].coords) if 'geometry' in dados else None
+            if u > v and grafo.has_edge(v, u):
+                inversas = grafo[v][u].values() if grafo.is_multigraph() else [grafo[v][u]]
+                if any(
+                    (list(d['geometry'].coords)[::-1] if 'geometry' in d else None) == coords
+                    for d in inversas
+                ):
+                    continue
+            yield csr.indice[u], csr.indice[v], chave, coords
+
+
+    # Nó do grafo mais próximo de cada coordenada (longitude, latitude), em lote
+    def nos_mais_proximos(self, lons, lats):
+        return self.indice_espacial().nos_mais_proximos(lons, lats)[0].tolist()
+
+
+    # Retorna n nós aleatórios do grafo em uma lista (sem precisar do grafo do NetworkX)
     def get_random_nodes(self, n=1):
-        return random.sample(list(self.graph.nodes), n)
+        return random.sample(self.compilar().ids.tolist(), n)
 
 
     # Retorna os IDs dos nós em formato GDF
@@ -32,10 +228,55 @@ class Graph:
         return nx.shortest_path(self.graph, origem, destino, weight=weight)
         
     
+    # Aresta usada pelas buscas entre dois nós: a de menor custo entre as paralelas.
+    # Retorna (chave no MultiDiGraph, custo); KeyError se os nós não forem vizinhos
+    def aresta_minima(self, u, v, weight="length"):
+        csr = self.compilar(weight)
+        posicao = csr.aresta(csr.indice[u], csr.indice[v])
+        return csr.chaves[posicao].item(), csr.pesos[posicao].item()
+
+
+    # Distância de uma rota somando as mesmas arestas usadas pelas buscas
+    def distancia_rota(self, rota, weight="length"):
+        csr = self.compilar(weight)
+        return csr.custo_caminho(csr.indices(rota))
+
+
     # Calcula a distância da rota com método padrão da biblioteca networkx
     def calcular_distancia(self, origem, destino, weight="length"):
         return nx.shortest_path_length(self.graph, origem, destino, weight=weight)
 
+    # Rota ótima até o destino mais próximo com um único Dijkstra, em vez de um por destino
+    def rota_mais_proxima(self, origem, destinos, k=1, weight="length"):
+        '''
+        Roda um Dijkstra a partir da origem que para ao fixar o primeiro destino
+        (ou os k primeiros) do conjunto.
+
+        É o modo "Ideal" fora da interface (roteamento em lote, serviço HTTP),
+        onde não há um CampoDeDistancias mantido para cada tipo sanguíneo.
+
+        Args:
+            origem: nó de partida
+            destinos: nós objetivos (por exemplo, os hemocentros válidos)
+            k: quantidade de destinos a fixar antes de parar; None para todos (opcional)
+            weight: atributo de custo das arestas (opcional)
+
+        Returns:
+            tuple: (distância, rota, ranking) do destino mais próximo, onde ranking
+                   é a lista de (distância, destino) de todos os destinos fixados, em
+                   ordem crescente de distância; None se nenhum destino for alcançável
+        '''
+        csr = self.compilar(weight)
+        ranking, predecessor = dijkstra_multi_alvo(csr, csr.indice[origem], csr.indices(destinos), k=k)
+        if not ranking:
+            return None
+
+        distancia, mais_proximo = ranking[0]
+        rota = csr.nos(reconstruir_caminho(predecessor, mais_proximo))
+        ranking = list(zip([dist for dist, _ in ranking], csr.nos([d for _, d in ranking])))
+        return distancia, rota, ranking
+
+
     # Função customizada: Plotar a rota com cores chamativas
     def plotar_rota(self, rota, name=None, app=False):
         '''
@@ -46,47 +287,22 @@ class Graph:
             rota: lista de nós que compõe a rota
             name: nome do arquivo caso queria salvar a imagem (opcional)
             app: indica se foi chamada pelo aplicativo ou não (opcional)
+
+        Returns:
+            Image: a figura desenhada em memória, quando chamada pelo aplicativo
         '''
 
         # Definindo o primeiro e o último nó
         origem = rota[0]
         destino = rota[-1]
 
-        fig, ax = ox.plot_graph(
-            self.graph,
-            show=False,
-            close=False,
-            bgcolor='white',
-            node_size=0,
-            edge_color='gray',
-            edge_linewidth=0.5
-        )
+        fig, ax = plt.subplots(figsize=(8, 8), facecolor='white')
+        ax.set_facecolor('white')
 
         # Coordenadas da rota
         x = [self.graph.nodes[n]['x'] for n in rota]
         y = [self.graph.nodes[n]['y'] for n in rota]
 
-        # Desenha a rota real respeitando a geometria das arestas
-        for u, v in zip(rota[:-1], rota[1:]):
-            edge_data = self.graph.get_edge_data(u, v)
-            if self.graph.is_multigraph():
-                edge_data = edge_data[0]  # pega a primeira aresta se for multigraph
-
-            if 'geometry' in edge_data:
-                xs, ys = edge_data['geometry'].xy
-            else:
-                xs = [self.graph.nodes[u]['x'], self.graph.nodes[v]['x']]
-                ys = [self.graph.nodes[u]['y'], self.graph.nodes[v]['y']]
-
-            if u == rota[0]: ax.plot(xs, ys, color='blue', linewidth=3, alpha=0.7, label='Rota') # Label somente uma vez
-            else: ax.plot(xs, ys, color='blue', linewidth=3, alpha=0.7)
-
-        # Destacar origem
-        ax.scatter(self.graph.nodes[origem]['x'], self.graph.nodes[origem]['y'], c='#00AA00', s=150, label='Origem', zorder=5)
-
-        # Destacar destino
-        ax.scatter(self.graph.nodes[destino]['x'], self.graph.nodes[destino]['y'], c='red', s=60, label='Destino', zorder=5)
-
         # Zoom: calcular limites com margem
         margin = 0.005
 
@@ -103,9 +319,42 @@ class Graph:
         x_center = (x_min + x_max) / 2
         y_center = (y_min + y_max) / 2
 
-        # Aplica limites com proporção quadrada e margem extra
-        ax.set_xlim(x_center - lado / 2 - margin, x_center + lado / 2 + margin)
-        ax.set_ylim(y_center - lado / 2 - margin, y_center + lado / 2 + margin)
+        # O grafo todo em cinza vem da camada pré-renderizada, já com os limites
+        # de proporção quadrada e margem extra aplicados
+        self.camada_base().desenhar(
+            ax,
+            x_center - lado / 2 - margin, x_center + lado / 2 + margin,
+            y_center - lado / 2 - margin, y_center + lado / 2 + margin,
+            color='gray', linewidth=0.5,
+        )
+        ax.set_aspect(1 / math.cos(math.radians(y_center)))
+        ax.set_axis_off()
+
+        # Junta a geometria real das arestas em uma única linha, usando entre as
+        # arestas paralelas a mesma (a mais curta) percorrida pelas buscas
+        pontos = []
+        for u, v in zip(rota[:-1], rota[1:]):
+            edge_data = self.graph.get_edge_data(u, v)
+            if self.graph.is_multigraph():
+                edge_data = edge_data[self.aresta_minima(u, v)[0]]
+
+            if 'geometry' in edge_data:
+                coords = list(edge_data['geometry'].coords)
+            else:
+                coords = [(self.graph.nodes[u]['x'], self.graph.nodes[u]['y']), (self.graph.nodes[v]['x'], self.graph.nodes[v]['y'])]
+            pontos.extend(coords[1:] if pontos else coords)
+
+        # Desenha a rota com um único artista, simplificada a meio pixel da imagem exibida
+        if len(pontos) > 1:
+            linha = LineString(pontos).simplify((lado + 2 * margin) / LARGURA_APP / 2)
+            xs, ys = linha.xy
+            ax.plot(xs, ys, color='blue', linewidth=3, alpha=0.7, label='Rota')
+
+        # Destacar origem
+        ax.scatter(self.graph.nodes[origem]['x'], self.graph.nodes[origem]['y'], c='#00AA00', s=150, label='Origem', zorder=5)
+
+        # Destacar destino
+        ax.scatter(self.graph.nodes[destino]['x'], self.graph.nodes[destino]['y'], c='red', s=60, label='Destino', zorder=5)
 
         plt.legend()
         plt.tight_layout()
@@ -117,82 +366,287 @@ class Graph:
             else:
                 plt.savefig("../images/" + name, dpi=300)
 
-        # Se for exibido pelo aplicativo, não abra uma janela
+        # Se for exibido pelo aplicativo, não abra uma janela: a figura é devolvida como imagem
         if app:
-            plt.close(fig) 
+            imagem = renderizar_figura(fig)
+            plt.close(fig)
+            return imagem
         else:
             plt.show()   
 
 
 
-# Classe que representa todos os hemocentros da cidade escolhida
+# Largura máxima, em pixels, das imagens exibidas pelo aplicativo
+LARGURA_APP = 1100
+
+
+# Função que desenha uma figura direto em memória, já no tamanho de exibição
+def renderizar_figura(fig, largura=LARGURA_APP):
+    '''
+    Rasteriza a figura no buffer do matplotlib e a converte em uma imagem PIL, sem passar
+    pelo disco. A resolução é escolhida para que o maior lado tenha `largura` pixels.
+
+    Args:
+        fig: figura do matplotlib
+        largura: tamanho do maior lado da imagem, em pixels (opcional)
+
+    Returns:
+        Image: imagem RGB da figura
+    '''
+    fig.set_dpi(largura / max(fig.get_size_inches()))
+    buffer, tamanho = FigureCanvasAgg(fig).print_to_buffer()
+    return Image.frombuffer("RGBA", tamanho, buffer, "raw", "RGBA", 0, 1).convert("RGB")
+
+
+# Tipos sanguíneos, na ordem das colunas da matriz de estoque
+TIPOS_SANGUINEOS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+
+# Tipos doadores de cada tipo receptor
+COMPATIBILIDADE = {
+    'O-': ['O-'],
+    'O+': ['O-', 'O+'],
+    'A-': ['O-', 'A-'],
+    'A+': ['O-', 'O+', 'A-', 'A+'],
+    'B-': ['O-', 'B-'],
+    'B+': ['O-', 'O+', 'B-', 'B+'],
+    'AB-': ['O-', 'A-', 'B-', 'AB-'],
+    'AB+': ['O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+']
+}
+
+# Doadores de cada tipo como máscara de 8 bits (bit i = coluna i da matriz de estoque)
+MASCARAS_DOADORES = {
+    receptor: sum(1 << TIPOS_SANGUINEOS.index(doador) for doador in doadores)
+    for receptor, doadores in COMPATIBILIDADE.items()
+}
+
+# Colunas ligadas em cada uma das 256 máscaras possíveis
+COLUNAS_MASCARAS = [tuple(i for i in range(8) if mascara >> i & 1) for mascara in range(256)]
+
+# Tipos receptores afetados por uma mudança em cada coluna (tipo doador) da matriz de estoque
+RECEPTORES = [
+    [receptor for receptor in TIPOS_SANGUINEOS if MASCARAS_DOADORES[receptor] >> coluna & 1]
+    for coluna in range(len(TIPOS_SANGUINEOS))
+]
+
+# Evento emitido quando um hemocentro passa a ser (ou deixa de ser) válido para um tipo sanguíneo
+MudancaValidade = namedtuple("MudancaValidade", ["hemocentro", "tipo", "valido"])
+
+
+# Classe que representa todos os hemocentros da cidade escolhida.
+# O estoque fica em uma matriz (hemocentros x tipos sanguíneos), de modo que as
+# consultas por hemocentros válidos são uma única operação vetorizada.
+# O estoque deve ser alterado pelos métodos reservar, liberar, consumir, repor e aplicar_lote,
+# que mantêm os hemocentros válidos de cada tipo e avisam os inscritos quando eles mudam
 class BancoDeHemocentros:
 
     def __init__(self, h_list, grafo):
 
-        self.TIPOS_SANGUINEOS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+        self.TIPOS_SANGUINEOS = TIPOS_SANGUINEOS
 
-        # Atributo principal, vai guardar todo o estoque dos hemocentros
-        self.hemocentros = {}
-        
-        # Para cada hemocentro:
-        for node_id in h_list:
-            self.hemocentros[node_id] = {
-                
-                # Salvando suas coordenadas
-                'coords': (grafo.nodes[node_id]['x'], grafo.nodes[node_id]['y']),
-                
-                # Gerando um número aleatório de bolsas de sangue de cada tipo
-                'estoque': self.__generate_random_stock()
-            }
+        # Identificadores dos hemocentros e a linha de cada um nas matrizes
+        self.ids = np.array(list(h_list), dtype=np.int64)
+        self.indice = {int(node_id): i for i, node_id in enumerate(self.ids)}
+
+        # Coordenadas (x, y) de cada hemocentro, lidas do GrafoCSR (sem carregar o grafo do
+        # NetworkX) ou do grafo do NetworkX
+        if isinstance(grafo, GrafoCSR):
+            linhas = grafo.indices(self.indice)
+            self.coords = np.column_stack((grafo.x[linhas], grafo.y[linhas])).astype(float)
+        else:
+            self.coords = np.array(
+                [(grafo.nodes[node_id]['x'], grafo.nodes[node_id]['y']) for node_id in self.indice], dtype=float
+            ).reshape(-1, 2)
+
+        # Atributo principal: bolsas de sangue de cada tipo (colunas) em cada hemocentro (linhas),
+        # geradas aleatoriamente. A matriz é guardada por colunas, pois as consultas somam tipos inteiros
+        self.estoque = np.asfortranarray(np.array(
+            [self.__generate_random_stock() for _ in self.indice], dtype=np.int32
+        ).reshape(-1, len(TIPOS_SANGUINEOS)))
+
+        # Bolsas reservadas para pedidos em andamento, fora do estoque disponível
+        self.reservado = np.zeros_like(self.estoque)
+
+        # Hemocentros válidos (pelo menos uma bolsa compatível) de cada tipo, mantidos a cada mudança
+        self.validos = {}
+        for tipo in TIPOS_SANGUINEOS:
+            self.validos[tipo] = self.unidades_compativeis(tipo) >= 1
+
+        # Versão do estoque (muda a cada alteração) e de cada conjunto de válidos (muda só quando ele muda)
+        self.versao = 0
+        self.versoes_validade = dict.fromkeys(TIPOS_SANGUINEOS, 0)
+
+        # Funções chamadas com a lista de MudancaValidade de cada alteração
+        self.inscritos = []
 
     
     # Gerando um número aleatório de bolsas de sangue de cada tipo
     def __generate_random_stock(self):
-        return {
-            tipo: random.choices([0, random.randint(1, 50)], weights=[0.6, 0.4])[0]
+        return [
+            random.choices([0, random.randint(1, 50)], weights=[0.6, 0.4])[0]
             for tipo in self.TIPOS_SANGUINEOS
+        ]
+
+
+    # Visão em dicionário dos hemocentros, com as coordenadas e o estoque de cada um
+    @property
+    def hemocentros(self):
+        return {
+            h_id: {'coords': tuple(self.coords[i].tolist()), 'estoque': self.consultar_estoque(h_id)}
+            for h_id, i in self.indice.items()
         }
 
 
     # Retorna o estoque de bolsas de sangue de um determinado hemocentro
     def consultar_estoque(self, h_id):
-        return self.hemocentros.get(h_id, {}).get('estoque', None)
-
-
-    # Função que retorna os tipos doadores para um determinado tipo
-    def __doadores(self, tipo: str) -> list:
-        compatibilidade = {
-            'O-': ['O-'],
-            'O+': ['O-', 'O+'],
-            'A-': ['O-', 'A-'],
-            'A+': ['O-', 'O+', 'A-', 'A+'],
-            'B-': ['O-', 'B-'],
-            'B+': ['O-', 'O+', 'B-', 'B+'],
-            'AB-': ['O-', 'A-', 'B-', 'AB-'],
-            'AB+': ['O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+']
-        }
-        return compatibilidade.get(tipo.upper(), [])
-        
-    
-    # Função que retorna os hemocentros que possuem sangue disponível para ser doado, dado o tipo sanguíneo do usuário
-    def hemocentros_validos(self, tipo: str) -> list:
+        i = self.indice.get(h_id)
+        if i is None:
+            return None
+        return dict(zip(self.TIPOS_SANGUINEOS, self.estoque[i].tolist()))
+
+
+    # Retorna, para cada hemocentro (ou só para as linhas pedidas), o total de bolsas disponíveis
+    # que podem ser doadas a um determinado tipo
+    def unidades_compativeis(self, tipo: str, linhas=slice(None)) -> np.ndarray:
+        estoque = self.estoque[linhas]
+        unidades = np.zeros(len(estoque), dtype=np.int64)
+        for coluna in COLUNAS_MASCARAS[MASCARAS_DOADORES.get(tipo.upper(), 0)]:
+            unidades += estoque[:, coluna]
+        return unidades
+
+
+    # Retorna um vetor booleano indicando, para cada hemocentro (na ordem de ids), se ele possui
+    # pelo menos minimo bolsas compatíveis com o tipo, somando os tipos doadores.
+    # Para minimo = 1, devolve uma visão somente leitura do vetor mantido pelo banco
+    def mascara_validos(self, tipo: str, minimo: int = 1) -> np.ndarray:
+        if minimo <= 1 and tipo.upper() in self.validos:
+            mascara = self.validos[tipo.upper()].view()
+            mascara.flags.writeable = False
+            return mascara
+        return self.unidades_compativeis(tipo) >= max(minimo, 1)
+
+
+    # Retorna a função peso(h_id) com as bolsas disponíveis compatíveis com o tipo, usada pelas buscas
+    # para reordenar os k hemocentros mais próximos (parâmetro peso de a_estrela e bfs)
+    def peso_por_unidades(self, tipo: str):
+        unidades = self.unidades_compativeis(tipo)
+        return lambda h_id: int(unidades[self.indice[h_id]])
+
+
+    # Inscreve uma função que recebe a lista de MudancaValidade de cada alteração de estoque
+    # em que algum hemocentro mudou de validade. É chamada na mesma thread da alteração
+    def inscrever(self, funcao):
+        self.inscritos.append(funcao)
+
+
+    # Remove uma função inscrita
+    def cancelar_inscricao(self, funcao):
+        self.inscritos.remove(funcao)
+
+
+    # Reserva bolsas disponíveis de um hemocentro para um pedido
+    def reservar(self, h_id, tipo: str, quantidade: int) -> list:
+        return self.__alterar(h_id, tipo, quantidade, -1, +1)
+
+
+    # Devolve ao estoque disponível bolsas reservadas e não usadas
+    def liberar(self, h_id, tipo: str, quantidade: int) -> list:
+        return self.__alterar(h_id, tipo, quantidade, +1, -1)
+
+
+    # Retira bolsas do hemocentro: das reservadas, se reservado=True, ou das disponíveis
+    def consumir(self, h_id, tipo: str, quantidade: int, reservado: bool = False) -> list:
+        if reservado:
+            return self.__alterar(h_id, tipo, quantidade, 0, -1)
+        return self.__alterar(h_id, tipo, quantidade, -1, 0)
+
+
+    # Acrescenta bolsas (doações, transferências) ao estoque disponível
+    def repor(self, h_id, tipo: str, quantidade: int) -> list:
+        return self.__alterar(h_id, tipo, quantidade, +1, 0)
+
+
+    # Aplica de uma vez uma sequência de variações (h_id, tipo, variação) do estoque disponível,
+    # como um fluxo de movimentações. É atômica: se alguma deixaria o estoque negativo, nada é aplicado.
+    # Retorna as mudanças de validade, notificadas aos inscritos em uma única chamada
+    def aplicar_lote(self, mudancas) -> list:
+        mudancas = list(mudancas)
+        if not mudancas:
+            return []
+        linhas = np.array([self.__linha(h_id) for h_id, _, _ in mudancas], dtype=np.int64)
+        colunas = np.array([self.__coluna(tipo) for _, tipo, _ in mudancas], dtype=np.int64)
+        variacoes = np.array([variacao for _, _, variacao in mudancas], dtype=np.int64)
+        return self.__aplicar(linhas, colunas, variacoes, np.zeros_like(variacoes))
+
+
+    def __linha(self, h_id):
+        linha = self.indice.get(h_id)
+        if linha is None:
+            raise ValueError(f"Hemocentro desconhecido: {h_id}")
+        return linha
+
+
+    def __coluna(self, tipo):
+        if tipo not in TIPOS_SANGUINEOS:
+            raise ValueError(f"Tipo sanguíneo inválido: {tipo}")
+        return TIPOS_SANGUINEOS.index(tipo)
+
+
+    # Operação simples sobre um hemocentro e tipo: a quantidade entra com o sinal de cada matriz
+    def __alterar(self, h_id, tipo, quantidade, sinal_estoque, sinal_reservado):
+        if quantidade <= 0:
+            raise ValueError("A quantidade deve ser positiva.")
+        linhas = np.array([self.__linha(h_id)])
+        colunas = np.array([self.__coluna(tipo)])
+        return self.__aplicar(linhas, colunas, np.array([sinal_estoque * quantidade]), np.array([sinal_reservado * quantidade]))
+
+
+    # Valida e aplica as variações nas duas matrizes, atualiza os válidos só das linhas e tipos afetados
+    # e notifica os inscritos das mudanças de validade
+    def __aplicar(self, linhas, colunas, variacoes_estoque, variacoes_reservado):
         
-        hcs_validos = []
-        doadores = self.__doadores(tipo)
-
-        for hc in self.hemocentros:
-            blood_stock = self.consultar_estoque(hc)            
-            for doador in doadores:
-                if blood_stock[doador] > 0:
-                    hcs_validos.append(hc)
-                    break
+        # Soma as variações de cada célula (linha, coluna), que pode aparecer mais de uma vez
+        celulas, inverso = np.unique(linhas * len(TIPOS_SANGUINEOS) + colunas, return_inverse=True)
+        linhas, colunas = np.divmod(celulas, len(TIPOS_SANGUINEOS))
+        estoque = self.estoque[linhas, colunas] + np.bincount(inverso, variacoes_estoque).astype(np.int64)
+        reservado = self.reservado[linhas, colunas] + np.bincount(inverso, variacoes_reservado).astype(np.int64)
+        if (estoque < 0).any() or (reservado < 0).any():
+            raise ValueError("Estoque insuficiente para a operação.")
+
+        self.estoque[linhas, colunas] = estoque
+        self.reservado[linhas, colunas] = reservado
+        self.versao += 1
+
+        # Só os tipos receptores das colunas alteradas, e só nas linhas alteradas, podem mudar de validade
+        eventos = []
+        linhas = np.unique(linhas)
+        afetados = {receptor for coluna in np.unique(colunas) for receptor in RECEPTORES[coluna]}
+        for tipo in TIPOS_SANGUINEOS:
+            if tipo not in afetados:
+                continue
+            validos = self.unidades_compativeis(tipo, linhas) >= 1
+            mudaram = validos != self.validos[tipo][linhas]
+            if mudaram.any():
+                self.validos[tipo][linhas[mudaram]] = validos[mudaram]
+                self.versoes_validade[tipo] += 1
+                eventos.extend(
+                    MudancaValidade(h_id, tipo, valido)
+                    for h_id, valido in zip(self.ids[linhas[mudaram]].tolist(), validos[mudaram].tolist())
+                )
+
+        if eventos:
+            for funcao in list(self.inscritos):
+                funcao(eventos)
+        return eventos
         
-        return hcs_validos
+    
+    # Função que retorna os hemocentros que possuem sangue disponível para ser doado, dado o tipo sanguíneo do usuário.
+    # Com minimo, exige pelo menos essa quantidade de bolsas compatíveis (somando os tipos doadores)
+    def hemocentros_validos(self, tipo: str, minimo: int = 1) -> list:
+        return self.ids[self.mascara_validos(tipo, minimo)].tolist()
     
 
 # Função que plota os hemocentros, o usuário e as ruas com zoom
-def plotar_com_zoom(gdf_user, gdf_hcs, gdf_edges, valid=False, map=True, name=None, app=False):
+def plotar_com_zoom(gdf_user, gdf_hcs, gdf_edges, valid=False, map=True, name=None, app=False, camada=None, tiles=None):
     '''
     Essa função plota a posição do usuário e as posições dos hemocentros em relação ao grafo todo.
     O Plot é realizado com zoom, ignorando partes não importantes do grafo (pois este geralmente é muito grande.)
@@ -205,6 +659,11 @@ def plotar_com_zoom(gdf_user, gdf_hcs, gdf_edges, valid=False, map=True, name=No
         map: booleano responsável por colocar o mapa por debaixo do plot (opcional)
         name: nome do arquivo caso queira salvar a imagem (opcional)
         app: indica se foi chamada pelo aplicativo (opcional)
+        camada: CamadaBase com as ruas pré-renderizadas; se passada, substitui gdf_edges (opcional)
+        tiles: CacheDeTiles do mapa de fundo; None usa o cache padrão em ../data/tiles (opcional)
+
+    Returns:
+        Image: a figura desenhada em memória, quando chamada pelo aplicativo
     '''
 
     # Juntando os pontos que queremos enquadrar
@@ -239,6 +698,8 @@ def plotar_com_zoom(gdf_user, gdf_hcs, gdf_edges, valid=False, map=True, name=No
         x_max_plot = x_center + lado / 2 + x_margin
         y_min_plot = y_center - lado / 2 - y_margin
         y_max_plot = y_center + lado / 2 + y_margin
+    elif camada is not None:
+        x_min_plot, x_max_plot, y_min_plot, y_max_plot = camada.limites
 
     ## Daqui pra cima, a única coisa que foi feita foi o cálculo para dar zoom. 
     ## Não se preocupe tanto com o código acima.
@@ -257,18 +718,21 @@ def plotar_com_zoom(gdf_user, gdf_hcs, gdf_edges, valid=False, map=True, name=No
     
     # Plotando os dados de fato no mapa, caso tenham sido passados por argumento
     fig, ax = plt.subplots(figsize=(10, 10))
-    if gdf_edges is not None: gdf_edges.plot(ax=ax, linewidth=0.2, edgecolor="blue", label='Ruas')
+    if camada is not None:
+        camada.desenhar(ax, x_min_plot, x_max_plot, y_min_plot, y_max_plot, color="blue", linewidth=0.2)
+        ax.plot([], [], color="blue", linewidth=0.2, label='Ruas')  # Apenas para a legenda
+    elif gdf_edges is not None: gdf_edges.plot(ax=ax, linewidth=0.2, edgecolor="blue", label='Ruas')
     if gdf_hcs is not None: gdf_hcs.plot(ax=ax, color="red", markersize=50, zorder=3, label=hc_label)
     if gdf_user is not None: gdf_user.plot(ax=ax, color=green, markersize=150, zorder=3, label='Localização do Usuário')
     
-    if gdfs:
+    if gdfs or camada is not None:
         # Aplicando limites
         ax.set_xlim(x_min_plot, x_max_plot)
         ax.set_ylim(y_min_plot, y_max_plot)
 
     if map:
-        import contextily as ctx
-        ctx.add_basemap(ax, crs=gdf_edges.crs, source=ctx.providers.OpenStreetMap.Mapnik)
+        # Mapa de fundo a partir do cache local de tiles; a rede só é usada para os que faltam
+        (tiles or cache_padrao()).desenhar(ax)
 
     # Estética final
     ax.set_axis_off()
@@ -283,9 +747,11 @@ def plotar_com_zoom(gdf_user, gdf_hcs, gdf_edges, valid=False, map=True, name=No
         else:
             plt.savefig("../images/" + name, dpi=300)
 
-    # Se for exibido pelo aplicativo, não abra uma janela
+    # Se for exibido pelo aplicativo, não abra uma janela: a figura é devolvida como imagem
     if app:
-        plt.close(fig) 
+        imagem = renderizar_figura(fig)
+        plt.close(fig)
+        return imagem
     else:
         plt.show()  
 
@@ -0,0 +1,220 @@
+"""
+Índice espacial para ajustar coordenadas ao grafo de ruas.
+
+Usuários e hemocentros chegam como latitude e longitude, mas as buscas partem
+de nós do grafo. Este módulo contém a classe IndiceEspacial, que monta uma
+única vez árvores KD (scikit-learn) sobre os nós e sobre os trechos das ruas
+e ajusta pontos isolados ou lotes inteiros de pontos ao nó mais próximo ou à
+posição mais próxima sobre uma rua, em tempo logarítmico e sem GeoPandas.
+
+As coordenadas são convertidas em vetores unitários (x, y, z) sobre a esfera,
+de modo que a distância euclidiana entre eles cresce com a distância sobre a
+superfície, sem distorção por latitude.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from sklearn.neighbors import KDTree
+
+from algorithms.heuristicas import R
+
+# Comprimento máximo, em metros, dos trechos indexados: ruas mais longas são divididas,
+# o que limita o raio da busca de candidatos em volta de cada ponto
+TRECHO_MAXIMO = 50.0
+
+# Posição de um ponto ajustado a uma rua: aresta u -> v (com a chave no MultiDiGraph),
+# distância do ponto até a rua, posição ao longo dela (em metros sobre a geometria, a
+# partir de u, e como fração do comprimento) e as coordenadas do ponto sobre a rua. Nas
+# consultas em lote, cada campo é um array
+PontoNaAresta = namedtuple("PontoNaAresta", ["u", "v", "chave", "distancia", "posicao", "fracao", "lon", "lat"])
+
+
+def _unitarios(lon, lat):
+    # Vetores unitários (n x 3) correspondentes às coordenadas em graus
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def _metros(corda):
+    # Distância sobre a superfície correspondente à distância em linha reta na esfera unitária
+    return 2 * R * np.arcsin(np.minimum(np.asarray(corda) / 2, 1.0))
+
+
+class IndiceEspacial:
+    """
+    Árvores KD sobre os nós e os trechos das ruas de um GrafoCSR.
+    """
+
+    def __init__(self, grafo, arestas=None):
+        """
+        Monta os índices dos nós e das ruas.
+
+        Args:
+            grafo: GrafoCSR da cidade
+            arestas: Ruas a indexar, como tuplas (u, v, chave, coordenadas) com u e v
+                     em índices densos e coordenadas (lon, lat) da geometria, ou None
+                     para uma linha reta entre os nós. None indexa as arestas do CSR
+                     em linha reta, com cada rua de mão dupla uma única vez (opcional)
+        """
+        self.grafo = grafo
+        self.arvore_nos = KDTree(_unitarios(grafo.x, grafo.y))
+
+        if arestas is None:
+            n = len(grafo)
+            origens = np.repeat(np.arange(n, dtype=np.int64), np.diff(grafo.offsets))
+            alvos = np.asarray(grafo.alvos, dtype=np.int64)
+            reversa = np.isin(alvos * n + origens, origens * n + alvos)
+            posicoes = np.flatnonzero((~reversa | (origens < alvos)) & (origens != alvos))
+            arestas = zip(
+                origens[posicoes].tolist(), alvos[posicoes].tolist(),
+                np.asarray(grafo.chaves)[posicoes].tolist(), [None] * len(posicoes),
+            )
+
+        # Polilinhas das arestas, concatenadas, com a aresta (na ordem de indexação) de cada ponto
+        self.u, self.v, self.chaves = [], [], []
+        pontos = []
+        donos = []
+        for i, (u, v, chave, coords) in enumerate(arestas):
+            if coords is None:
+                coords = [(grafo.x[u], grafo.y[u]), (grafo.x[v], grafo.y[v])]
+            self.u.append(u)
+            self.v.append(v)
+            self.chaves.append(chave)
+            pontos.append(np.asarray(coords, dtype=np.float64))
+            donos.append(np.full(len(pontos[-1]), i))
+        self.u = np.array(self.u, dtype=np.int64)
+        self.v = np.array(self.v, dtype=np.int64)
+        self.chaves = np.array(self.chaves)
+        pontos = np.concatenate(pontos) if pontos else np.empty((0, 2))
+        donos = np.concatenate(donos) if donos else np.empty(0, dtype=np.int64)
+
+        # Segmentos entre pontos consecutivos da mesma aresta
+        xyz = _unitarios(pontos[:, 0], pontos[:, 1])
+        mesmo = donos[1:] == donos[:-1]
+        a, b, aresta = xyz[:-1][mesmo], xyz[1:][mesmo], donos[:-1][mesmo]
+        comprimento = _metros(np.linalg.norm(b - a, axis=1))
+
+        # Distância do início de cada segmento até o início da sua aresta
+        acumulado = np.cumsum(comprimento) - comprimento
+        primeiro = np.ones(len(aresta), dtype=bool)
+        primeiro[1:] = aresta[1:] != aresta[:-1]
+        inicio_aresta = np.maximum.accumulate(np.where(primeiro, np.arange(len(aresta)), 0))
+        inicio = acumulado - acumulado[inicio_aresta]
+
+        # Comprimento total de cada aresta indexada
+        self.comprimentos = np.zeros(len(self.u))
+        np.add.at(self.comprimentos, aresta, comprimento)
+
+        # Divide os segmentos longos em trechos de até TRECHO_MAXIMO metros
+        partes = np.maximum(np.ceil(comprimento / TRECHO_MAXIMO), 1).astype(np.int64)
+        segmento = np.repeat(np.arange(len(aresta)), partes)
+        j = np.arange(len(segmento)) - np.repeat(np.cumsum(partes) - partes, partes)
+        t0 = (j / partes[segmento])[:, None]
+        t1 = ((j + 1) / partes[segmento])[:, None]
+        direcao = b[segmento] - a[segmento]
+        self.inicios = a[segmento] + t0 * direcao
+        self.fins = a[segmento] + t1 * direcao
+        self.arestas = aresta[segmento]
+        self.deslocamentos = inicio[segmento] + t0[:, 0] * comprimento[segmento]
+        self.tamanhos = comprimento[segmento] / partes[segmento]
+
+        # Árvore sobre o ponto médio de cada trecho; um trecho a uma distância d de um
+        # ponto tem o ponto médio a no máximo d + meio trecho
+        self.meio_trecho = float(np.max(np.linalg.norm(self.fins - self.inicios, axis=1)) / 2) if len(segmento) else 0.0
+        self.arvore_trechos = KDTree((self.inicios + self.fins) / 2) if len(segmento) else None
+
+    def nos_mais_proximos(self, lon, lat):
+        """
+        Ajusta um lote de pontos aos nós mais próximos.
+
+        Args:
+            lon: Longitudes dos pontos (array ou lista)
+            lat: Latitudes dos pontos (array ou lista)
+
+        Returns:
+            tuple: (ids, distancias), arrays com o ID do nó mais próximo de cada
+                   ponto e a distância até ele, em metros
+        """
+        corda, indices = self.arvore_nos.query(_unitarios(lon, lat), k=1)
+        return np.asarray(self.grafo.ids)[indices[:, 0]], _metros(corda[:, 0])
+
+    def no_mais_proximo(self, lon, lat):
+        """
+        Retorna (ID do nó mais próximo, distância em metros) de um ponto.
+        """
+        ids, distancias = self.nos_mais_proximos([lon], [lat])
+        return ids[0].item(), distancias[0].item()
+
+    def arestas_mais_proximas(self, lon, lat):
+        """
+        Ajusta um lote de pontos às posições mais próximas sobre as ruas.
+
+        Args:
+            lon: Longitudes dos pontos (array ou lista)
+            lat: Latitudes dos pontos (array ou lista)
+
+        Returns:
+            PontoNaAresta: Campos em arrays, um elemento por ponto
+        """
+        if self.arvore_trechos is None:
+            raise ValueError("O grafo não tem arestas para ajustar os pontos.")
+        pontos = _unitarios(lon, lat)
+
+        # O trecho com o ponto médio mais próximo dá um limite superior para a distância;
+        # os candidatos são os trechos com ponto médio dentro desse limite mais meio trecho
+        _, mais_proximo = self.arvore_trechos.query(pontos, k=1)
+        limite, _ = self.__projetar(pontos, mais_proximo[:, 0])
+        candidatos = self.arvore_trechos.query_radius(pontos, limite + self.meio_trecho * (1 + 1e-9) + 1e-15)
+
+        quantidades = np.array([len(c) for c in candidatos])
+        trechos = np.concatenate(candidatos).astype(np.int64)
+        consulta = np.repeat(np.arange(len(pontos)), quantidades)
+        distancia, t = self.__projetar(pontos[consulta], trechos)
+
+        # Para cada ponto, o candidato mais próximo
+        ordem = np.lexsort((distancia, consulta))
+        melhor = ordem[np.cumsum(quantidades) - quantidades]
+        trechos, t, distancia = trechos[melhor], t[melhor], distancia[melhor]
+
+        # Coordenadas do ponto sobre a rua
+        ajustado = self.inicios[trechos] + t[:, None] * (self.fins[trechos] - self.inicios[trechos])
+        ajustado /= np.linalg.norm(ajustado, axis=1)[:, None]
+        lat_ajustada = np.degrees(np.arcsin(np.clip(ajustado[:, 2], -1.0, 1.0)))
+        lon_ajustada = np.degrees(np.arctan2(ajustado[:, 1], ajustado[:, 0]))
+
+        # A soma dos trechos pode passar do comprimento da aresta por arredondamento
+        arestas = self.arestas[trechos]
+        total = self.comprimentos[arestas]
+        posicao = np.minimum(self.deslocamentos[trechos] + t * self.tamanhos[trechos], total)
+        ids = np.asarray(self.grafo.ids)
+        return PontoNaAresta(
+            u=ids[self.u[arestas]],
+            v=ids[self.v[arestas]],
+            chave=self.chaves[arestas],
+            distancia=_metros(distancia),
+            posicao=posicao,
+            fracao=np.divide(posicao, total, out=np.zeros_like(posicao), where=total > 0),
+            lon=lon_ajustada,
+            lat=lat_ajustada,
+        )
+
+    def aresta_mais_proxima(self, lon, lat):
+        """
+        Retorna o PontoNaAresta (com valores escalares) da posição mais próxima de um ponto sobre as ruas.
+        """
+        lote = self.arestas_mais_proximas([lon], [lat])
+        return PontoNaAresta(*(campo[0].item() for campo in lote))
+
+    def __projetar(self, pontos, trechos):
+        # Distância (na esfera unitária) de cada ponto ao seu trecho e a posição
+        # t (de 0 a 1) do ponto mais próximo ao longo do trecho
+        a = self.inicios[trechos]
+        direcao = self.fins[trechos] - a
+        quadrado = np.einsum("ij,ij->i", direcao, direcao)
+        t = np.einsum("ij,ij->i", pontos - a, direcao)
+        t = np.clip(np.divide(t, quadrado, out=np.zeros_like(t), where=quadrado > 0), 0.0, 1.0)
+        distancia = np.linalg.norm(pontos - (a + t[:, None] * direcao), axis=1)
+        return distancia, t
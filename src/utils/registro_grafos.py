@@ -0,0 +1,225 @@
+"""
+Registro de grafos de várias cidades.
+
+Este módulo contém a classe RegistroDeGrafos, que associa cada cidade (ou
+região) ao seu arquivo GraphML e à sua caixa de coordenadas, carrega os
+grafos sob demanda e mantém na memória apenas os usados mais recentemente,
+dentro de um orçamento de memória configurável. Antes de descartar um grafo
+inteiro, o registro libera os GDFs dos grafos menos usados, que são
+remontados se voltarem a ser necessários.
+
+Pontos perto da divisa entre duas cidades caem nas caixas (com margem) de
+ambas; nesse caso o registro devolve a união dos dois grafos, costurados
+pelos nós em comum (os IDs do OpenStreetMap são os mesmos nos dois arquivos),
+para que a rota possa atravessar a divisa.
+"""
+
+import math
+import time
+from collections import OrderedDict
+
+import networkx as nx
+
+from utils.helper_functions import Graph
+from algorithms.heuristicas import R
+
+# Orçamento de memória padrão para os grafos carregados
+LIMITE_PADRAO = 1024 * 2**20
+
+# Distância da divisa, em metros, dentro da qual um ponto é roteado com as cidades vizinhas
+MARGEM_PADRAO = 2000
+
+
+class RegistroDeGrafos:
+    """
+    Grafos de várias cidades, carregados sob demanda e descartados do menos
+    usado para o mais usado quando a memória estimada passa do limite.
+
+    Os contadores de acertos e falhas só consideram os pedidos feitos ao
+    registro: as partes de um grafo costurado e os carregamentos para calcular
+    caixas não contam como pedidos.
+
+    Attributes:
+        acertos: Pedidos atendidos por um grafo já carregado
+        falhas: Pedidos que precisaram carregar (ou costurar) o grafo
+        despejos: Grafos descartados para respeitar o limite de memória
+        tempos_carga: Tempo (em segundos) de cada carregamento ou costura, sem o
+                      carregamento das partes, que tem a sua própria medida
+    """
+
+    def __init__(self, limite_bytes=LIMITE_PADRAO, carregar=Graph):
+        """
+        Args:
+            limite_bytes: Memória máxima estimada para os grafos carregados (opcional)
+            carregar: Função carregar(graphml_file) que devolve o Graph da cidade (opcional)
+        """
+        self.limite_bytes = limite_bytes
+        self.carregar = carregar
+
+        # Cidades registradas: nome -> (arquivo GraphML, caixa ou None)
+        self.cidades = {}
+
+        # Grafos carregados, do usado há mais tempo ao mais recente; as chaves são tuplas
+        # com os nomes das cidades (mais de um nome para grafos costurados)
+        self.carregados = OrderedDict()
+
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+        self.tempos_carga = []
+
+    def registrar(self, nome, graphml_file, caixa=None):
+        """
+        Registra uma cidade.
+
+        Args:
+            nome: Nome da cidade (ou região)
+            graphml_file: Caminho do GraphML da cidade
+            caixa: (lon_min, lat_min, lon_max, lat_max) da cidade; None calcula a
+                   partir dos nós quando o grafo for carregado pela primeira vez (opcional)
+        """
+        self.cidades[nome] = (graphml_file, caixa)
+
+    def grafo(self, nome):
+        """
+        Retorna o Graph de uma cidade registrada, carregando-o se necessário.
+
+        Raises:
+            KeyError: Se a cidade não estiver registrada
+        """
+        return self.__obter((nome,))
+
+    def cidades_em(self, lon, lat, margem=0):
+        """
+        Retorna as cidades cuja caixa, ampliada pela margem, contém o ponto.
+
+        Cidades registradas sem caixa são carregadas para que a caixa seja calculada.
+
+        Args:
+            lon, lat: Coordenadas do ponto, em graus
+            margem: Ampliação das caixas, em metros (opcional)
+
+        Returns:
+            list: Nomes das cidades, na ordem de registro
+        """
+        margem_lat = math.degrees(margem / R)
+        margem_lon = margem_lat / max(math.cos(math.radians(lat)), 1e-6)
+        encontradas = []
+        for nome in list(self.cidades):
+            lon_min, lat_min, lon_max, lat_max = self.__caixa(nome)
+            if lon_min - margem_lon <= lon <= lon_max + margem_lon and lat_min - margem_lat <= lat <= lat_max + margem_lat:
+                encontradas.append(nome)
+        return encontradas
+
+    def grafo_para(self, lon, lat, margem=MARGEM_PADRAO):
+        """
+        Retorna o grafo que atende um ponto.
+
+        Se o ponto estiver a menos da margem de outras cidades, devolve a união
+        dos grafos dessas cidades, costurados pelos nós em comum.
+
+        Args:
+            lon, lat: Coordenadas do ponto, em graus
+            margem: Distância da divisa, em metros, que inclui a cidade vizinha (opcional)
+
+        Returns:
+            tuple: (nomes das cidades, Graph)
+
+        Raises:
+            KeyError: Se nenhuma cidade registrada cobrir o ponto
+        """
+        nomes = self.cidades_em(lon, lat, margem)
+        if not nomes:
+            raise KeyError(f"Nenhuma cidade registrada cobre o ponto ({lat}, {lon}).")
+
+        # Cidades que contêm o ponto vêm antes das que só estão dentro da margem
+        dentro = self.cidades_em(lon, lat)
+        nomes = tuple(sorted(nomes, key=lambda nome: nome not in dentro))
+        return nomes, self.__obter(nomes)
+
+    def costurar(self, nomes):
+        """
+        Retorna a união dos grafos de várias cidades, mantida no registro como
+        qualquer outro grafo.
+
+        Args:
+            nomes: Nomes das cidades
+
+        Returns:
+            Graph: Grafo com todos os nós e arestas das cidades
+        """
+        return self.__obter(tuple(nomes))
+
+    def metricas(self):
+        """
+        Retorna os contadores do registro e a memória estimada em uso.
+        """
+        pedidos = self.acertos + self.falhas
+        return {
+            "carregados": [list(chave) for chave in self.carregados],
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acertos": self.acertos / pedidos if pedidos else None,
+            "despejos": self.despejos,
+            "tempo_carga_medio": sum(self.tempos_carga) / len(self.tempos_carga) if self.tempos_carga else None,
+            "tempo_carga_maximo": max(self.tempos_carga, default=None),
+            "memoria_bytes": self.memoria_estimada(),
+            "limite_bytes": self.limite_bytes,
+        }
+
+    def memoria_estimada(self):
+        return sum(grafo.memoria_estimada() for grafo in self.carregados.values())
+
+    def __caixa(self, nome):
+        # Caixa da cidade, calculada a partir dos nós (carregando o grafo) se não foi informada
+        graphml_file, caixa = self.cidades[nome]
+        if caixa is None:
+            csr = self.__obter((nome,), pedido=False).compilar()
+            caixa = (float(csr.x.min()), float(csr.y.min()), float(csr.x.max()), float(csr.y.max()))
+            self.cidades[nome] = (graphml_file, caixa)
+        return caixa
+
+    def __obter(self, chave, pedido=True):
+        # Com pedido=False (partes de um grafo costurado, cálculo de caixas), o uso não
+        # entra nos acertos e falhas
+        if chave in self.carregados:
+            if pedido:
+                self.acertos += 1
+            self.carregados.move_to_end(chave)
+            return self.carregados[chave]
+
+        for nome in chave:
+            if nome not in self.cidades:
+                raise KeyError(f"Cidade não registrada: {nome}")
+
+        if pedido:
+            self.falhas += 1
+        if len(chave) == 1:
+            inicio = time.perf_counter()
+            grafo = self.carregar(self.cidades[chave[0]][0])
+        else:
+            # Os nós com o mesmo ID nas duas cidades passam a ser um só
+            partes = [self.__obter((nome,), pedido=False).graph for nome in chave]
+            inicio = time.perf_counter()
+            grafo = Graph.de_networkx(nx.compose_all(partes), nome="+".join(chave))
+        grafo.compilar()
+        self.tempos_carga.append(time.perf_counter() - inicio)
+
+        self.carregados[chave] = grafo
+        self.__respeitar_limite(chave)
+        return grafo
+
+    def __respeitar_limite(self, atual):
+        # Primeiro libera os GDFs dos grafos menos usados; se não bastar, descarta os grafos
+        if self.memoria_estimada() <= self.limite_bytes:
+            return
+        for chave, grafo in self.carregados.items():
+            if chave != atual:
+                grafo.liberar_gdfs()
+        while self.memoria_estimada() > self.limite_bytes and len(self.carregados) > 1:
+            chave = next(iter(self.carregados))
+            if chave == atual:
+                self.carregados.move_to_end(chave)
+                chave = next(iter(self.carregados))
+            del self.carregados[chave]
+            self.despejos += 1
@@ -0,0 +1,193 @@
+"""
+Roteamento em lote com um pool de processos.
+
+Este módulo roteia de uma vez milhares de pedidos (origem, tipo sanguíneo),
+por exemplo para o planejamento noturno ou estudos de demanda, contra o mesmo
+grafo e o mesmo banco de hemocentros. Os pedidos são divididos em blocos e
+distribuídos entre processos; cada processo mapeia em memória o snapshot do
+grafo (somente leitura), de modo que todos compartilham as mesmas páginas, e
+os resultados são devolvidos conforme os blocos terminam.
+
+Uso pela linha de comando (a partir de src/):
+
+    python3 -m utils.roteamento_lote pedidos.csv --algoritmo "A*"
+
+onde cada linha de pedidos.csv é "origem,tipo" (ID do nó de origem) ou
+"latitude,longitude,tipo" (coordenadas ajustadas, em lote, ao nó mais próximo).
+Linhas em branco são ignoradas e linhas malformadas são relatadas com erro.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.helper_functions import Graph, BancoDeHemocentros
+from algorithms.busca_informada import a_estrela, a_estrela_bidirecional
+from algorithms.busca_nao_informada import bfs
+from algorithms.alt import PreprocessamentoALT
+
+ALGORITMOS = ("A*", "A* Bidirecional", "BFS", "Ideal")
+
+# Estado de cada processo do pool, preenchido uma única vez por inicializar_processo
+_grafo = None
+_validos = None
+_alt = None
+
+
+def inicializar_processo(graphml_file, validos=None):
+    # Carrega o grafo do snapshot (mapeado em memória) no processo do pool
+    global _grafo, _validos
+    _grafo = Graph(graphml_file)
+    _validos = validos or {}
+
+
+def rotear_no_processo(origem, destinos, algoritmo):
+    # Rota (IDs) da origem até o destino mais próximo e a sua distância, calculadas no grafo
+    # do processo atual; (None, None) se não houver rota
+    global _alt
+    csr = _grafo.compilar()
+
+    rota = None
+    if destinos:
+        try:
+            if algoritmo == "A*":
+                rota = a_estrela(csr, origem, destinos)
+            elif algoritmo == "A* Bidirecional":
+                if _alt is None:
+                    _alt = PreprocessamentoALT(csr)
+                rota = a_estrela_bidirecional(csr, origem, destinos, heuristica=_alt.heuristica)
+            elif algoritmo == "BFS":
+                rota = bfs(csr, origem, destinos)
+            else:
+                resultado = _grafo.rota_mais_proxima(origem, destinos)
+                rota = resultado[1] if resultado is not None else None
+        except ValueError:
+            rota = None
+
+    distancia = None
+    if rota is not None:
+        distancia = csr.custo_caminho(csr.indices(rota))
+    return rota, distancia
+
+
+def _rotear(origem, tipo, algoritmo):
+    # Roteia um pedido no processo atual e devolve o resultado como dicionário; um pedido
+    # inválido vira um resultado com erro, sem derrubar o resto do bloco
+    inicio = time.perf_counter()
+    rota, distancia, erro = None, None, None
+    if origem not in _grafo.compilar().indice:
+        erro = f"Nó de origem não encontrado: {origem}"
+    elif tipo not in _validos:
+        erro = f"Tipo sanguíneo inválido: {tipo}"
+    else:
+        rota, distancia = rotear_no_processo(origem, _validos[tipo], algoritmo)
+    return {
+        "origem": origem,
+        "tipo": tipo,
+        "destino": rota[-1] if rota else None,
+        "distancia": distancia,
+        "nos": len(rota) if rota else 0,
+        "algoritmo": algoritmo,
+        "tempo": time.perf_counter() - inicio,
+        "erro": erro,
+    }
+
+
+def _rotear_bloco(bloco, algoritmo):
+    return [_rotear(origem, tipo, algoritmo) for origem, tipo in bloco]
+
+
+def rotear_em_lote(graphml_file, banco, pedidos, algoritmo="A*", processos=None, tamanho_bloco=64):
+    '''
+    Roteia uma lista de pedidos em paralelo e devolve os resultados conforme ficam prontos.
+
+    Os hemocentros válidos de cada tipo são calculados uma vez e enviados aos
+    processos; o grafo é lido por cada processo a partir do snapshot.
+
+    Args:
+        graphml_file: caminho do GraphML da cidade (o snapshot é criado se não existir)
+        banco: BancoDeHemocentros com os estoques atuais
+        pedidos: sequência de pares (origem, tipo sanguíneo)
+        algoritmo: "A*", "A* Bidirecional", "BFS" ou "Ideal" (opcional)
+        processos: quantidade de processos; None usa todos os núcleos (opcional)
+        tamanho_bloco: pedidos enviados juntos a cada processo (opcional)
+
+    Yields:
+        dict: resultado de cada pedido, com origem, tipo, destino, distancia (metros),
+              nos (tamanho da rota), algoritmo, tempo (segundos) e erro; destino é None
+              quando não há rota, e erro descreve pedidos inválidos (origem fora do
+              grafo ou tipo desconhecido). A ordem é a de conclusão, não a dos pedidos.
+    '''
+    if algoritmo not in ALGORITMOS:
+        raise ValueError(f"Algoritmo inválido: {algoritmo}")
+
+    # Garante que o snapshot existe antes que os processos tentem criá-lo ao mesmo tempo
+    Graph(graphml_file)
+
+    validos = {tipo: banco.hemocentros_validos(tipo) for tipo in banco.TIPOS_SANGUINEOS}
+    pedidos = list(pedidos)
+    blocos = [pedidos[i:i + tamanho_bloco] for i in range(0, len(pedidos), tamanho_bloco)]
+
+    with ProcessPoolExecutor(
+        max_workers=processos or os.cpu_count(),
+        initializer=inicializar_processo,
+        initargs=(graphml_file, validos),
+    ) as executor:
+        futuros = [executor.submit(_rotear_bloco, bloco, algoritmo) for bloco in blocos]
+        for futuro in as_completed(futuros):
+            yield from futuro.result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roteamento em lote de pedidos (origem, tipo sanguíneo).")
+    parser.add_argument("pedidos", help="CSV com uma linha 'origem,tipo' ou 'latitude,longitude,tipo' por pedido")
+    parser.add_argument("--graphml", default="../data/sao_carlos.graphml")
+    parser.add_argument("--hemocentros", type=int, default=5, help="quantidade de hemocentros aleatórios")
+    parser.add_argument("--algoritmo", default="A*", choices=ALGORITMOS)
+    parser.add_argument("--processos", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.pedidos, newline="") as f:
+        linhas = list(csv.reader(f))
+
+    grafo = Graph(args.graphml)
+
+    # Linhas em branco são ignoradas; linhas malformadas viram resultados com erro,
+    # sem interromper o lote
+    pedidos, coordenadas, invalidas = [], [], []
+    for numero, linha in enumerate(linhas, start=1):
+        campos = [campo.strip() for campo in linha]
+        if not any(campos):
+            continue
+        try:
+            if len(campos) == 3:
+                coordenadas.append((float(campos[0]), float(campos[1])))
+                pedidos.append((None, campos[2]))
+            elif len(campos) == 2:
+                pedidos.append((int(campos[0]), campos[1]))
+            else:
+                raise ValueError
+        except ValueError:
+            invalidas.append({"linha": numero, "erro": f"Linha inválida: {','.join(linha)}"})
+
+    # Pedidos com coordenadas são ajustados ao nó mais próximo, todos de uma vez
+    nos = iter([])
+    if coordenadas:
+        lats, lons = zip(*coordenadas)
+        nos = iter(grafo.nos_mais_proximos(lons, lats))
+    pedidos = [(next(nos) if origem is None else origem, tipo) for origem, tipo in pedidos]
+
+    # As coordenadas dos hemocentros vêm do grafo compilado, sem carregar o do NetworkX
+    banco = BancoDeHemocentros(grafo.get_random_nodes(args.hemocentros), grafo.compilar())
+
+    for invalida in invalidas:
+        print(json.dumps(invalida))
+
+    inicio = time.perf_counter()
+    for resultado in rotear_em_lote(args.graphml, banco, pedidos, args.algoritmo, args.processos):
+        print(json.dumps(resultado))
+    print(f"{len(pedidos)} pedidos em {time.perf_counter() - inicio:.2f} s", file=sys.stderr)
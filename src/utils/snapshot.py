@@ -0,0 +1,180 @@
+"""
+Snapshot binário do grafo da cidade.
+
+Carregar o GraphML significa interpretar um XML grande a cada execução. Na
+primeira carga, o grafo é salvo em um diretório de snapshot ao lado do
+arquivo original, contendo:
+
+- os arrays do GrafoCSR em arquivos .npy, mapeados em memória nas cargas
+  seguintes (e compartilhados entre processos);
+- o grafo completo do NetworkX serializado com pickle, para plotagem;
+- um meta.json com o hash SHA-256, o tamanho e a data de modificação do
+  GraphML de origem, e o hash do pickle.
+
+O snapshot só é usado se corresponder ao arquivo de origem; caso contrário,
+ele é refeito. Como ler um pickle pode executar código, o grafo do NetworkX
+só é lido de um snapshot confiável: escrito pelo próprio usuário, sem
+permissão de escrita para outros e com o pickle igual ao registrado.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from utils.grafo_csr import GrafoCSR
+
+VERSAO_FORMATO = 3
+
+
+# Caminho do diretório de snapshot de um arquivo GraphML
+def diretorio_snapshot(graphml_file):
+    return graphml_file + ".snapshot"
+
+
+# Calcula o hash SHA-256 de um arquivo, lendo-o em blocos
+def hash_arquivo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def validar_snapshot(graphml_file, weight="length"):
+    '''
+    Verifica se existe um snapshot válido para o arquivo GraphML.
+
+    Se o tamanho e a data de modificação do arquivo forem os registrados, o
+    snapshot é aceito sem reler o arquivo. Se não forem, o hash é recalculado
+    e comparado com o registrado.
+
+    Args:
+        graphml_file: caminho do arquivo GraphML de origem
+        weight: atributo de custo com que o GrafoCSR foi compilado (opcional)
+
+    Returns:
+        str: hash do arquivo de origem, ou None se o snapshot não existir ou estiver desatualizado
+    '''
+    try:
+        with open(os.path.join(diretorio_snapshot(graphml_file), "meta.json")) as f:
+            meta = json.load(f)
+        stat = os.stat(graphml_file)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("versao_formato") != VERSAO_FORMATO or meta.get("weight") != weight:
+        return None
+
+    if meta.get("tamanho") == stat.st_size and meta.get("mtime_ns") == stat.st_mtime_ns:
+        return meta["hash"]
+
+    if meta.get("tamanho") == stat.st_size and hash_arquivo(graphml_file) == meta["hash"]:
+        # Conteúdo igual com data diferente: registra a nova data para não recalcular o hash
+        meta["mtime_ns"] = stat.st_mtime_ns
+        try:
+            with open(os.path.join(diretorio_snapshot(graphml_file), "meta.json"), "w") as f:
+                json.dump(meta, f)
+        except OSError:
+            pass
+        return meta["hash"]
+
+    return None
+
+
+def salvar_snapshot(graphml_file, grafo, csr, weight="length"):
+    '''
+    Escreve o snapshot de um grafo recém-carregado do GraphML.
+
+    O snapshot é montado em um diretório temporário e só então movido para o
+    lugar, para que outro processo nunca encontre um snapshot pela metade.
+
+    Args:
+        graphml_file: caminho do arquivo GraphML de origem
+        grafo: grafo do NetworkX carregado do arquivo
+        csr: GrafoCSR compilado a partir do grafo
+        weight: atributo de custo usado na compilação (opcional)
+
+    Returns:
+        str: hash do arquivo de origem
+    '''
+    stat = os.stat(graphml_file)
+    meta = {
+        "versao_formato": VERSAO_FORMATO,
+        "hash": hash_arquivo(graphml_file),
+        "tamanho": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "weight": weight,
+    }
+
+    destino = diretorio_snapshot(graphml_file)
+    pai = os.path.dirname(os.path.abspath(destino))
+    temporario = tempfile.mkdtemp(dir=pai)
+    antigo = None
+    try:
+        csr.salvar(temporario)
+        with open(os.path.join(temporario, "grafo.pickle"), "wb") as f:
+            pickle.dump(grafo, f, protocol=pickle.HIGHEST_PROTOCOL)
+        meta["hash_pickle"] = hash_arquivo(os.path.join(temporario, "grafo.pickle"))
+        with open(os.path.join(temporario, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        # O snapshot antigo é só renomeado para o lado (e apagado no fim): entre as duas
+        # renomeações não há escrita, e uma falha na segunda o devolve ao lugar
+        if os.path.isdir(destino):
+            antigo = tempfile.mkdtemp(dir=pai)
+            os.replace(destino, antigo)
+        try:
+            os.replace(temporario, destino)
+        except OSError:
+            if antigo is not None and not os.path.exists(destino):
+                os.replace(antigo, destino)
+                antigo = None
+            raise
+    except OSError:
+        # Outro processo pode ter gravado o snapshot ao mesmo tempo; o dele vale
+        shutil.rmtree(temporario, ignore_errors=True)
+    finally:
+        if antigo is not None:
+            shutil.rmtree(antigo, ignore_errors=True)
+
+    return meta["hash"]
+
+
+# Carrega os arrays do GrafoCSR do snapshot (mapeados em memória)
+def carregar_csr(graphml_file, mmap=True):
+    return GrafoCSR.carregar(diretorio_snapshot(graphml_file), mmap=mmap)
+
+
+def carregar_grafo(graphml_file):
+    '''
+    Carrega o grafo completo do NetworkX salvo no snapshot.
+
+    O arquivo é lido com pickle, que pode executar código: só use snapshots
+    gerados por este programa. Por isso o pickle só é lido se o diretório do
+    snapshot pertencer ao usuário atual, não puder ser alterado por outros
+    usuários e o hash do arquivo for o registrado no meta.json.
+
+    Args:
+        graphml_file: caminho do arquivo GraphML de origem
+
+    Returns:
+        networkx.MultiDiGraph: o grafo, ou None se o snapshot não for confiável
+        (o chamador deve então ler o GraphML)
+    '''
+    diretorio = diretorio_snapshot(graphml_file)
+    caminho = os.path.join(diretorio, "grafo.pickle")
+    try:
+        with open(os.path.join(diretorio, "meta.json")) as f:
+            meta = json.load(f)
+        for item in (diretorio, caminho):
+            stat = os.stat(item)
+            if (hasattr(os, "getuid") and stat.st_uid != os.getuid()) or stat.st_mode & 0o002:
+                return None
+        if hash_arquivo(caminho) != meta.get("hash_pickle"):
+            return None
+        with open(caminho, "rb") as f:
+            return pickle.load(f)
+    except (OSError, ValueError):
+        return None